@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+run_bash_command 安全策略基准与回归：校验语料的拦截结果，并对比旧实现与当前 _bash_policy 的每秒校验次数。
+
+旧实现：每次调用重新读取环境变量、拼出正则列表，对原始命令文本逐条 re.search。
+新实现：holmes_tools._bash_policy.get_policy().check（按 bash 语法拆分简单命令、按命令名索引的预编译规则，
+配置不变时不重建；旧实现的原始文本匹配作为下限，只放行命中位置确认为数据的命令）。
+
+用法:
+    python scripts/bench_bash_policy.py [--corpus scripts/bash_policy_corpus.txt] [--seconds 2]
+语料中有未按预期拦截/放行的命令时退出码为 1。
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "servers"))
+
+from holmes_tools._bash_policy import DEFAULT_UNSAFE_PATTERNS, get_policy  # noqa: E402
+
+_DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bash_policy_corpus.txt")
+
+
+def legacy_check(command: str) -> bool:
+    patterns = DEFAULT_UNSAFE_PATTERNS
+    raw_pat = os.environ.get("BASH_BLOCKED_PATTERNS", "").strip()
+    if raw_pat:
+        try:
+            arr = json.loads(raw_pat)
+            if isinstance(arr, list) and all(isinstance(x, str) for x in arr):
+                patterns = arr
+        except (json.JSONDecodeError, TypeError):
+            pass
+    raw = os.environ.get("BASH_BLOCKED_COMMANDS", "").strip()
+    for cmd in [c.strip() for c in raw.split(",") if c.strip()]:
+        patterns = patterns + [r"(^|[|;&])\s*" + re.escape(cmd) + r"\b"]
+    return not any(re.search(p, command, re.IGNORECASE) for p in patterns)
+
+
+def load_corpus(path: str) -> list:
+    cases = []
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            expect, _, command = line.partition("\t")
+            if expect not in ("block", "allow") or not command:
+                raise SystemExit(f"{path}:{lineno}: 格式应为 block|allow<TAB>命令")
+            cases.append((expect == "allow", command.replace("\\n", "\n")))
+    return cases
+
+
+def _rate(fn, commands: list, seconds: float) -> float:
+    n = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        for c in commands:
+            fn(c)
+        n += len(commands)
+    return n / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=_DEFAULT_CORPUS, help="回归语料（默认 scripts/bash_policy_corpus.txt）")
+    parser.add_argument("--seconds", type=float, default=2.0, help="每种实现的计时时长（默认 2 秒）")
+    args = parser.parse_args()
+
+    cases = load_corpus(args.corpus)
+    policy = get_policy()
+    failures = 0
+    legacy_diff = 0
+    relaxed = 0
+    for allowed, command in cases:
+        ok, reason = policy.check(command)
+        if ok != allowed:
+            failures += 1
+            print(f"FAIL  期望{'放行' if allowed else '拦截'}: {command!r}  {reason}")
+        legacy_ok = legacy_check(command)
+        if legacy_ok != allowed:
+            legacy_diff += 1
+        # 旧实现的原始文本匹配是下限：当前实现只应放行命中位置确认为数据的命令（语料中标为 allow）
+        if ok and not legacy_ok:
+            relaxed += 1
+    blocked = sum(1 for allowed, _ in cases if not allowed)
+    print(f"语料 {len(cases)} 条（拦截 {blocked} / 放行 {len(cases) - blocked}），当前实现不符 {failures} 条，"
+          f"旧实现不符 {legacy_diff} 条，旧实现拦截而当前放行 {relaxed} 条；规则数 {policy.rule_count}")
+
+    commands = [c for _, c in cases]
+    legacy = _rate(legacy_check, commands, args.seconds)
+    current = _rate(lambda c: get_policy().check(c), commands, args.seconds)
+    print(f"{'实现':<8}{'checks/s':>12}")
+    print(f"{'legacy':<10}{legacy:>12,.0f}")
+    print(f"{'current':<10}{current:>12,.0f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
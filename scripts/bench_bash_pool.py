@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+run_bash_command 执行延迟基准：对比每条命令单独 subprocess.run(bash) 与常驻 bash worker 池（_bash_pool）。
+
+旧实现：subprocess.run(command, shell=True, executable=/bin/bash, capture_output=True, text=True)。
+新实现：holmes_tools._bash_pool.WorkerPool.run（预先启动的 bash 在子 shell 中 eval 命令）。
+先用一组命令核对两种实现的 stdout / stderr / 退出码一致（含 exit、kill -9 $$ 等），再分别计时。
+--ballast-mb 可让本进程先占用指定内存，模拟常驻内存较大的 server 进程（fork 成本随之变化）。
+
+用法:
+    python scripts/bench_bash_pool.py [--iterations 300] [--pool-size 2] [--ballast-mb 0] [--command CMD ...]
+两种实现的结果不一致时退出码为 1。
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "servers"))
+
+from holmes_tools._bash_pool import WorkerPool, _run_once  # noqa: E402
+
+_DEFAULT_COMMANDS = ["true", "date", "ls /", "echo a | tr a b"]
+# 两种实现应得到相同结果的命令（不依赖 $$ / PID 的值）。已知差异不在此列：命令的 shell 被其他信号杀死时，
+# 池返回 bash 的 128+N，subprocess.run 返回 -N
+_PARITY_COMMANDS = [
+    "echo hi",
+    "echo out; echo err >&2; exit 3",
+    "cd /tmp && pwd",
+    "X=1; export X; echo ${X}",
+    "printf 'a\\nb\\n' | wc -l",
+    "echo hi; kill -9 $$",
+    "echo ${__holmes_cmd-unset}",
+    "read -r line; echo \"[$line]\"",
+]
+
+
+def _percentiles(samples: list) -> tuple:
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def _measure(fn, command: str, iterations: int) -> tuple:
+    for _ in range(min(20, iterations)):
+        fn(command, 10)
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn(command, 10)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return _percentiles(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=300, help="每条命令每种实现的执行次数（默认 300）")
+    parser.add_argument("--pool-size", type=int, default=2, help="worker 池大小（默认 2）")
+    parser.add_argument("--ballast-mb", type=int, default=0, help="计时前本进程额外占用的内存 MB（默认 0）")
+    parser.add_argument("--command", action="append", help="要计时的命令（可重复；默认一组常见短命令）")
+    args = parser.parse_args()
+
+    ballast = bytearray(args.ballast_mb * 1024 * 1024)
+    for i in range(0, len(ballast), 4096):
+        ballast[i] = 1
+    pool = WorkerPool(max(1, args.pool_size), 10 ** 9)
+    pool.warm()
+
+    mismatches = 0
+    for command in _PARITY_COMMANDS:
+        old, new = _run_once(command, 10), pool.run(command, 10)
+        if (old.returncode, old.stdout, old.stderr) != (new.returncode, new.stdout, new.stderr):
+            mismatches += 1
+            print(f"DIFF  {command!r}\n  subprocess: {old.returncode} {old.stdout!r} {old.stderr!r}\n"
+                  f"  pool:       {new.returncode} {new.stdout!r} {new.stderr!r}")
+    print(f"一致性检查 {len(_PARITY_COMMANDS)} 条，不一致 {mismatches} 条")
+
+    commands = args.command or _DEFAULT_COMMANDS
+    print(f"pool_size={args.pool_size}  iterations={args.iterations}  ballast={args.ballast_mb}MB")
+    print(f"{'command':<24} {'run p50':>9} {'run p95':>9} {'pool p50':>9} {'pool p95':>9} {'speedup':>8}")
+    for command in commands:
+        old_p50, old_p95 = _measure(_run_once, command, args.iterations)
+        new_p50, new_p95 = _measure(pool.run, command, args.iterations)
+        print(
+            f"{command[:24]:<24} {old_p50:>7.2f}ms {old_p95:>7.2f}ms {new_p50:>7.2f}ms {new_p95:>7.2f}ms "
+            f"{old_p50 / new_p50 if new_p50 else 0:>7.2f}x"
+        )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
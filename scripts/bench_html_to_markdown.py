@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+fetch_webpage HTML -> Markdown 转换基准：对比旧流程与当前 _html_convert 流程的耗时与输出大小。
+
+旧流程：BeautifulSoup(html.parser) + 每种标签一次 find_all/decompose + markdownify(str(soup))。
+新流程：holmes_tools._html_convert.html_to_markdown（lxml 解析、一次遍历清理、正文提取，直接遍历 lxml 正文子树
+输出 Markdown，规则与 markdownify 一致）。
+除语料目录外，总会附带几条内置边界页面（带 XML 声明的 XHTML、空文档、只有空白的文档）；
+新流程在任一页面上抛异常时退出码为 1。
+
+用法:
+    python scripts/bench_html_to_markdown.py [语料目录] [--repeat 3]
+语料目录下的 *.html / *.htm 为保存的网页，默认使用随仓库提交的 scripts/html_corpus（runbook、大表格参考页、XHTML
+发布说明）；也可以用 curl -o 保存常用 runbook / 厂商文档页面另建目录。
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "servers"))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from markdownify import markdownify  # noqa: E402
+
+from holmes_tools._html_convert import _PARSER, html_to_markdown  # noqa: E402
+
+_DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_corpus")
+
+# lxml 对这些输入会抛 ValueError / ParserError，新流程需回退到 BeautifulSoup 路径
+EDGE_CASES = [
+    (
+        "<edge>/xhtml-xml-declaration",
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" '
+        '"http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml"><head><title>XHTML page</title></head>'
+        "<body><nav>menu</nav><h1>Runbook</h1><p>Restart the <code>api</code> deployment.</p></body></html>",
+    ),
+    ("<edge>/empty", ""),
+    ("<edge>/whitespace-only", "  \n\t \n"),
+]
+
+
+def legacy_html_to_markdown(content: str) -> str:
+    soup = BeautifulSoup(content, "html.parser")
+    for tag in ("script", "style", "nav", "header", "footer", "iframe"):
+        for el in soup.find_all(tag):
+            el.decompose()
+    return markdownify(str(soup))
+
+
+def _best_of(fn, content: str, repeat: int) -> tuple:
+    best, out = float("inf"), ""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(content)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", default=_DEFAULT_CORPUS,
+                        help="保存网页的目录（默认 scripts/html_corpus）")
+    parser.add_argument("--repeat", type=int, default=3, help="每页重复次数，取最快一次（默认 3）")
+    args = parser.parse_args()
+
+    files = sorted(
+        glob.glob(os.path.join(args.corpus, "**", "*.html"), recursive=True)
+        + glob.glob(os.path.join(args.corpus, "**", "*.htm"), recursive=True)
+    )
+    if not files:
+        print(f"语料目录中没有 .html/.htm 文件: {args.corpus}")
+        return 1
+    pages = []
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append((os.path.relpath(path, args.corpus), f.read()))
+    pages.extend(EDGE_CASES)
+
+    print(f"parser={_PARSER}  pages={len(pages)}  repeat={args.repeat}")
+    print(f"{'page':<40} {'html KB':>8} {'old ms':>8} {'new ms':>8} {'speedup':>8} {'old KB':>8} {'new KB':>8}")
+    tot = {"html": 0, "old_t": 0.0, "new_t": 0.0, "old_b": 0, "new_b": 0}
+    failures = 0
+    for name, content in pages:
+        old_t, old_md = _best_of(legacy_html_to_markdown, content, args.repeat)
+        try:
+            new_t, new_md = _best_of(html_to_markdown, content, args.repeat)
+        except Exception as e:
+            failures += 1
+            print(f"FAIL  {name}: {type(e).__name__}: {e}")
+            continue
+        old_b, new_b = len(old_md.encode("utf-8")), len(new_md.encode("utf-8"))
+        tot["html"] += len(content.encode("utf-8"))
+        tot["old_t"] += old_t
+        tot["new_t"] += new_t
+        tot["old_b"] += old_b
+        tot["new_b"] += new_b
+        name = name[-40:]
+        print(
+            f"{name:<40} {len(content) / 1024:>8.1f} {old_t * 1000:>8.1f} {new_t * 1000:>8.1f} "
+            f"{old_t / new_t if new_t else 0:>7.2f}x {old_b / 1024:>8.1f} {new_b / 1024:>8.1f}"
+        )
+    print("-" * 96)
+    print(
+        f"{'TOTAL':<40} {tot['html'] / 1024:>8.1f} {tot['old_t'] * 1000:>8.1f} {tot['new_t'] * 1000:>8.1f} "
+        f"{tot['old_t'] / tot['new_t'] if tot['new_t'] else 0:>7.2f}x "
+        f"{tot['old_b'] / 1024:>8.1f} {tot['new_b'] / 1024:>8.1f}"
+    )
+    if tot["old_b"]:
+        print(f"output size reduction: {(1 - tot['new_b'] / tot['old_b']) * 100:.1f}%")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,115 +15,37 @@ Bash / Kubectl MCP Server
 """
 
 import asyncio
+import codecs
+import functools
 import json
 import os
 import re
 import subprocess
 import shutil
+import threading
 import time
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
-from holmes_tools.mcp_logger import log_tool_call, log_tool_result, log_command
+from holmes_tools._bash_policy import get_policy
+from holmes_tools._bash_pool import CommandCancelled, OutputCallback, get_pool, run_command
+from holmes_tools.mcp_logger import get_logger, log_tool_call, log_tool_result, log_command
 
 _SERVER = "bash-mcp"
+_logger = get_logger("bash_server")
 
+# 流式输出：两次进度通知之间的最短间隔（秒）
+_STREAM_INTERVAL = 0.5
 
-# 内置危险命令/模式（命中则拒绝）。无需配置即生效。
-# 若需“额外禁止的敏感命令”，只需配置 BASH_BLOCKED_COMMANDS="rm,dd,mkfs" 这种逗号分隔即可。
-_DEFAULT_UNSAFE_PATTERNS = [
-    # rm 删除根或系统路径
-    r"\brm\s+(-rf?|-\s*rf?)\s+/",
-    r"\brm\s+(-rf?|-\s*rf?)\s+/\s",
-    # 磁盘/分区/块设备
-    r"\bmkfs\.?\w*\s",
-    r"\bdd\s+.*(if=.*of=|of=.*if=)",
-    r"\bdd\s+.*of=\s*\/dev\/",
-    r">\s*/dev/(sd|nvme|hd|loop)\w*",
-    r"\bfdisk\s",
-    r"\bparted\s+.*\b(rm|mklabel)\b",
-    r"\bwipefs\s+.*-a",
-    r"\bmkswap\s+.*/dev/",
-    r"\bsfdisk\s+.*\/dev\/",
-    r"\bblockdev\s+.*(--flushbufs|--rereadpt)\s",
-    # fork 炸弹
-    r":\s*\(\s*\)\s*\{\s*:\s*\|\s*:\s*&\s*\}",  # :(){ :|:& };:
-    # 提权/权限
-    r"\bchmod\s+[-+]?s\b",
-    r"\bchmod\s+[0-7]{3,4}\s+\/",
-    r"\bchown\s+.*\b(root|0)\s",
-    # 管道下载执行（远程代码）
-    r"\bcurl\s+[^|]*\|\s*(bash|sh)\s*$",
-    r"\bwget\s+[^|]*\|\s*(bash|sh)\s*$",
-    # 覆盖设备/关键路径
-    r"\bshred\s+.*-f.*/dev/",
-    r"\bshred\s+.*\/",
-    # 系统控制
-    r"\bsystemctl\s+(stop|restart|reboot|halt|poweroff)\s",
-    r"\binit\s+[06]",  # reboot/halt
-    r"\breboot\b",
-    r"\bhalt\b",
-    r"\bpoweroff\b",
-    r"\bshutdown\s+-(r|h|P)",
-    # 防火墙/网络
-    r"\biptables\s+(-F|--flush)\b",
-    r"\bip6tables\s+(-F|--flush)\b",
-    # 挂载危险
-    r"\bmount\s+.*-o\s+.*remount.*\/\s",
-    r"\bumount\s+\/",
-    # 用户/密码/权限
-    r"\bpasswd\s+.*(root|-u\s+0)\b",
-    r"\busermod\s+.*-o\s+-u\s+0\b",
-    r"\buserdel\s+-f\s+root\b",
-    # 覆盖系统关键文件
-    r">\s*/etc/(shadow|passwd|sudoers)",
-    r"\b:>\s*/",
-    # 内核/模块
-    r"\bsysctl\s+-w\s+kernel\.(core_pattern|sysrq)",
-    r"\bmodprobe\s+-r\s+(ext4|xfs|nfs)\b",
-    # SELinux/AppArmor 关闭
-    r"\bsetenforce\s+0\b",
-    r"\bapparmor_parser\s+-R\b",
-]
-
-
-def _get_simple_blocked_commands() -> list:
-    """
-    从环境变量 BASH_BLOCKED_COMMANDS 读取简单黑名单：逗号分隔的命令名。
-    例如: BASH_BLOCKED_COMMANDS="rm,dd,mkfs,fdisk"
-    会禁止以这些命令开头的执行（含管道/分号后的子命令）。
-    """
-    raw = os.environ.get("BASH_BLOCKED_COMMANDS", "").strip()
-    if not raw:
-        return []
-    return [c.strip() for c in raw.split(",") if c.strip()]
-
-
-def _get_blocked_patterns() -> list:
-    """
-    黑名单正则列表。
-    - 默认使用内置 _DEFAULT_UNSAFE_PATTERNS（覆盖 rm/dd/磁盘/重启等危险操作）。
-    - 若设置了 BASH_BLOCKED_COMMANDS（逗号分隔），会额外禁止以这些命令开头的执行，例如：
-      env: BASH_BLOCKED_COMMANDS: "rm,dd,mkfs,fdisk"  即可，无需写正则。
-    - 高级：BASH_BLOCKED_PATTERNS 为 JSON 数组时可完全替换内置列表（一般不推荐）。
-    """
-    base = _DEFAULT_UNSAFE_PATTERNS
-    raw_pat = os.environ.get("BASH_BLOCKED_PATTERNS", "").strip()
-    if raw_pat:
-        try:
-            arr = json.loads(raw_pat)
-            if isinstance(arr, list) and all(isinstance(x, str) for x in arr):
-                base = arr
-        except (json.JSONDecodeError, TypeError):
-            pass
 
-    # 简单配置：逗号分隔的命令名，自动转成“行首或 |;& 后出现该命令”即拒绝
-    for cmd in _get_simple_blocked_commands():
-        base = base + [r"(^|[|;&])\s*" + re.escape(cmd) + r"\b"]
-    return base
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
 
 
 NAMESPACE_RE = re.compile(r"^[a-z0-9]([-a-z0-9]*[a-z0-9])?$")
@@ -132,33 +54,25 @@ IMAGE_RE = re.compile(r"^[\w./\-:]+$")
 
 def make_command_safe(command_str: str) -> Tuple[bool, str]:
     """
-    简单安全校验。通过返回 (True, "")，不通过返回 (False, "原因")。
-    若环境变量 BASH_TOOL_UNSAFE_ALLOW_ALL=1 则放行。
+    安全校验（规则见 holmes_tools/_bash_policy.py）。通过返回 (True, "")，不通过返回 (False, "原因")。
+    - 内置危险模式默认生效；BASH_BLOCKED_COMMANDS="rm,dd,mkfs" 额外禁止这些命令（含管道、sudo、bash -c 等嵌套位置）。
+    - BASH_BLOCKED_PATTERNS 为 JSON 数组时完全替换内置正则（一般不推荐）。
+    - 若环境变量 BASH_TOOL_UNSAFE_ALLOW_ALL=1 则放行。
     """
     if os.environ.get("BASH_TOOL_UNSAFE_ALLOW_ALL") == "1":
         return True, ""
-    cmd = (command_str or "").strip()
-    if not cmd:
-        return False, "命令为空"
-    patterns = _get_blocked_patterns()
-    for pat in patterns:
-        if re.search(pat, cmd, re.IGNORECASE):
-            return False, "命令包含不允许的模式，拒绝执行"
-    return True, ""
+    return get_policy().check(command_str)
 
 
-def execute_bash_command(cmd: str, timeout: int = 60) -> dict:
-    """执行 bash 命令，返回 { "success", "stdout", "stderr", "returncode" }"""
+def execute_bash_command(cmd: str, timeout: int = 60, on_output: Optional[OutputCallback] = None,
+                         cancel: Optional[threading.Event] = None) -> dict:
+    """
+    执行 bash 命令（常驻 worker 池，见 holmes_tools/_bash_pool.py），返回 { "success", "stdout", "stderr", "returncode" }。
+    on_output 按块接收执行中的输出，cancel 置位时结束命令。
+    """
     t0 = time.monotonic()
     try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            executable="/bin/bash",
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-        )
+        result = run_command(cmd, timeout, on_output, cancel)
         elapsed = time.monotonic() - t0
         log_command(cmd, returncode=result.returncode,
                     stdout=result.stdout or "", stderr=result.stderr or "", elapsed=elapsed)
@@ -177,6 +91,15 @@ def execute_bash_command(cmd: str, timeout: int = 60) -> dict:
             "stderr": f"命令执行超时 ({timeout}秒)",
             "returncode": -1,
         }
+    except CommandCancelled:
+        elapsed = time.monotonic() - t0
+        log_command(cmd, returncode=-1, stderr="命令已取消", elapsed=elapsed)
+        return {
+            "success": False,
+            "stdout": "",
+            "stderr": "命令已取消",
+            "returncode": -1,
+        }
     except Exception as e:
         elapsed = time.monotonic() - t0
         log_command(cmd, returncode=-1, stderr=str(e), elapsed=elapsed, error=e)
@@ -188,6 +111,95 @@ def execute_bash_command(cmd: str, timeout: int = 60) -> dict:
         }
 
 
+class _ProgressStream:
+    """
+    把执行中的输出缓冲后以 MCP 进度通知（notifications/progress）推送：message 为这段时间的新输出
+    （stderr 段落以 "[stderr] " 开头），progress 为累计推送的字节数。累计超过 limit 字节后只再推送一条提示，
+    其余输出仍在最终结果中返回。
+    """
+
+    def __init__(self, session, token, request_id: str, limit: int):
+        self._session = session
+        self._token = token
+        self._request_id = request_id
+        self._limit = limit
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, str]] = []
+        self._decoders = {
+            name: codecs.getincrementaldecoder("utf-8")(errors="replace") for name in ("stdout", "stderr")
+        }
+        self._streamed = 0
+        self._capped = False
+        self._broken = False
+
+    def feed(self, stream: str, data: bytes) -> None:
+        """在执行命令的线程中调用。"""
+        with self._lock:
+            if self._capped or self._broken:
+                return
+            room = self._limit - self._streamed
+            if len(data) >= room:
+                data = data[:room]
+                self._capped = True
+            self._streamed += len(data)
+            text = self._decoders[stream].decode(data, final=self._capped)
+            if text:
+                self._pending.append((stream, text))
+            if self._capped:
+                self._pending.append(("note", f"\n[已推送 {self._limit} 字节输出，其余输出见最终结果]"))
+
+    async def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            progress = self._streamed
+        if not pending or self._broken:
+            return
+        parts = []
+        previous = "stdout"
+        for stream, text in pending:
+            if stream == "stderr" and previous != "stderr":
+                text = "[stderr] " + text
+            elif stream == "stdout" and previous == "stderr":
+                text = "[stdout] " + text
+            parts.append(text)
+            previous = stream
+        try:
+            await self._session.send_progress_notification(
+                self._token, progress, message="".join(parts), related_request_id=self._request_id,
+            )
+        except Exception as e:
+            _logger.warning(f"发送进度通知失败，停止流式输出: {e}")
+            self._broken = True
+
+
+async def execute_bash_command_streaming(cmd: str, timeout: int) -> dict:
+    """
+    客户端在请求 _meta 中带 progressToken 时，命令在线程中执行，输出每 _STREAM_INTERVAL 秒作为进度通知推送一次
+    （累计上限 BASH_STREAM_MAX_BYTES，默认 65536，0 表示不推送）。最终结果与 execute_bash_command 相同。
+
+    命令只由 timeout_seconds 结束，不支持用 notifications/cancelled 取消：mcp 1.12.2 的会话循环在任一请求
+    被取消后即退出（该连接上的后续请求不再处理）。下面的 CancelledError 分支只用于 server 关闭时清理子进程。
+    """
+    ctx = server.request_context
+    token = ctx.meta.progressToken if ctx.meta is not None else None
+    limit = _get_int_env("BASH_STREAM_MAX_BYTES", 65536)
+    if token is None or limit <= 0:
+        return execute_bash_command(cmd, timeout=timeout)
+    stream = _ProgressStream(ctx.session, token, str(ctx.request_id), limit)
+    cancel = threading.Event()
+    future = asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(execute_bash_command, cmd, timeout, stream.feed, cancel)
+    )
+    try:
+        while not future.done():
+            await asyncio.wait({future}, timeout=_STREAM_INTERVAL)
+            await stream.flush()
+        return future.result()
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
+
+
 def validate_image_and_commands(image: str, command_list: list) -> Tuple[bool, str]:
     """校验镜像名和命令列表。通过 (True, "")，不通过 (False, 原因)。"""
     if not image or not IMAGE_RE.match(image.strip()):
@@ -207,7 +219,10 @@ async def list_tools():
     return [
         Tool(
             name="run_bash_command",
-            description="在受控环境下执行一条 bash 命令。会做安全校验，危险命令会被拒绝。适用于执行只读或低风险命令（如 cat、grep、ls、date）。",
+            description="在受控环境下执行一条 bash 命令。会做安全校验，危险命令会被拒绝。适用于执行只读或低风险命令（如 cat、grep、ls、date）。"
+                        "请求带 progressToken 时，执行中的输出会以进度通知推送。"
+                        "不支持取消请求（取消会中断与 server 的会话），用 timeout_seconds 限制执行时间。"
+                        "命令在常驻 bash worker 的子 shell 中执行：$$ 是 worker 的 PID，需要命令自身的 PID 时用 $BASHPID。",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -226,7 +241,8 @@ async def list_tools():
         ),
         Tool(
             name="kubectl_run_image",
-            description="在指定 Kubernetes 命名空间中，使用给定镜像创建临时 Pod 并执行命令，执行完后自动删除（--rm --attach）。适用于跑一次性任务或调试镜像。",
+            description="在指定 Kubernetes 命名空间中，使用给定镜像创建临时 Pod 并执行命令，执行完后自动删除（--rm --attach）。适用于跑一次性任务或调试镜像。"
+                        "请求带 progressToken 时，Pod 输出会以进度通知推送。",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -276,7 +292,7 @@ async def call_tool(name: str, arguments: dict):
                 "stdout": "",
                 "stderr": "",
             }, ensure_ascii=False))]
-        out = execute_bash_command(command, timeout=timeout)
+        out = await execute_bash_command_streaming(command, timeout)
         return [TextContent(type="text", text=json.dumps(out, ensure_ascii=False))]
 
     if name == "kubectl_run_image":
@@ -328,13 +344,16 @@ async def call_tool(name: str, arguments: dict):
         if command_list:
             cmd_parts.extend(["--", *command_list])
         full_cmd = " ".join(cmd_parts)
-        out = execute_bash_command(full_cmd, timeout=timeout)
+        out = await execute_bash_command_streaming(full_cmd, timeout)
         return [TextContent(type="text", text=json.dumps(out, ensure_ascii=False))]
 
     return [TextContent(type="text", text=json.dumps({"error": f"未知工具: {name}"}, ensure_ascii=False))]
 
 
 async def main():
+    pool = get_pool()
+    if pool is not None:
+        pool.warm()
     async with stdio_server() as (read_stream, write_stream):
         await server.run(read_stream, write_stream, server.create_initialization_options())
 
@@ -2,7 +2,8 @@
 """
 Connectivity Check MCP Server
 
-仅暴露 tcp_check 工具。
+暴露 tcp_check、tcp_check_batch、latency_probe 工具。配置：可选 CONNECTIVITY_MAX_CONCURRENCY、CONNECTIVITY_MAX_TARGETS、
+CONNECTIVITY_DNS_TTL、CONNECTIVITY_MAX_ATTEMPTS。
 
 运行方式:
     python connectivity_server.py
@@ -33,7 +34,11 @@ async def call_tool(name: str, arguments: dict):
     log_tool_call(_SERVER, name, arguments)
     t0 = time.monotonic()
 
-    result = connectivity.call_tool(name, sanitize_arguments_for_tools(arguments))
+    # 模块可声明 SKIP_SANITIZE = True 以接收原始参数（tcp_check_batch 的 targets 为 list）
+    skip = getattr(connectivity, "SKIP_SANITIZE", False)
+    args = arguments if skip else sanitize_arguments_for_tools(arguments)
+    # 在线程中执行：批量探测在工作线程内运行自己的事件循环
+    result = await asyncio.to_thread(connectivity.call_tool, name, args)
     if result is None:
         result = "未知工具: {}".format(name)
 
@@ -2,7 +2,7 @@
 """
 Core Investigation MCP Server
 
-仅暴露 TodoWrite 工具（任务分解与状态追踪）。
+暴露 TodoWrite、TodoUpdate 工具（任务分解与状态追踪，支持按会话增量更新）。
 
 运行方式:
     python core_investigation_server.py
@@ -32,7 +32,7 @@ async def call_tool(name: str, arguments: dict):
     log_tool_call(_SERVER, name, arguments)
     t0 = time.monotonic()
 
-    # 注意：TodoWrite 接收 list/dict 参数，不做 sanitize
+    # 注意：TodoWrite/TodoUpdate 接收 list/dict 参数，不做 sanitize
     result = core_investigation.call_tool(name, arguments)
     if result is None:
         result = "未知工具: {}".format(name)
@@ -4,6 +4,19 @@ Helm Chart MCP Server
 
 提供 Helm 相关的核心工具能力：列出、安装、卸载、升级、回滚、搜索。
 
+helm_list_releases / helm_list 由 owner=helm Secret 的 watch 维护的内存清单直接返回
+（见 holmes_tools/_helm_releases.py，HELM_INVENTORY_WATCH=false 关闭）；清单未就绪时回退到 helm list。
+helm_values / helm_status / helm_history / helm_manifest / helm_hooks / helm_chart / helm_notes 直接解码 release
+Secret 并按 revision 缓存，一次读取供全部子视图使用；无法读取 Secret 时回退到对应的 helm 命令。
+helm_manifest 支持 inventory=true 只列出资源清单（kind/namespace/name），或按 kind / resource_name 只取指定资源。
+helm_search_repo 在进程内检索仓库 index.yaml（见 holmes_tools/_helm_repo_index.py，文件变化时重新加载），
+输出与 helm search repo -o json 相同；未配置仓库或读取失败时回退到 helm 命令。
+helm_install / helm_upgrade 的仓库 chart 先从本地归档缓存解析（按 digest 校验，缺失时下载一次入缓存，
+helm_chart_prefetch 可预热），dry_run 结果按 chart digest + 版本 + values 哈希缓存（见 holmes_tools/_helm_charts.py）。
+helm_install / helm_upgrade / helm_rollback 传 background=true 时作为后台作业执行并立即返回 job_id（chart 解析与下载
+也在作业线程中进行；前台调用的 chart 解析与 helm 命令在线程池中执行，不阻塞事件循环），
+用 helm_job_status 增量读取输出、helm_job_cancel 取消、helm_job_list 列出（见 holmes_tools/_helm_jobs.py）。
+
 运行方式:
     # 直接运行 (stdio 模式，用于调试)
     python helm_server.py
@@ -14,18 +27,31 @@ Helm Chart MCP Server
 
 import asyncio
 import json
+import os
+import re
 import subprocess
 import shutil
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
+from holmes_tools import _helm_charts, _helm_jobs, _helm_releases, _helm_repo_index
 from holmes_tools.arg_utils import sanitize_arguments_for_tools
-from holmes_tools.mcp_logger import log_tool_call, log_tool_result, log_command
+from holmes_tools.mcp_logger import get_logger, log_tool_call, log_tool_result, log_command
 
 _SERVER = "helm-mcp"
+_logger = get_logger(_SERVER)
+
+# release 清单（watch 维护）；首次调用时启动，main() 中预先启动
+_inventory = _helm_releases.HelmInventory()
+_releases = _helm_releases.ReleaseStore(_inventory)
+_repo_index = _helm_repo_index.RepoIndex()
+_jobs = _helm_jobs.JobManager()
+_render_cache = _helm_charts.RenderCache()
+_chart_cache = _helm_charts.ChartCache(_repo_index)
+_current_namespace_cache: Optional[str] = None
 
 
 # 创建 MCP Server
@@ -66,6 +92,191 @@ def run_helm_command(args: List[str], timeout: int = 120) -> Dict[str, Any]:
         return {"success": False, "error": str(e)}
 
 
+def current_namespace() -> str:
+    """与 helm 一致：HELM_NAMESPACE，否则 kubeconfig 当前上下文的命名空间，否则 default。"""
+    global _current_namespace_cache
+    if os.environ.get("HELM_NAMESPACE"):
+        return os.environ["HELM_NAMESPACE"]
+    if _current_namespace_cache is None:
+        ns = ""
+        try:
+            result = subprocess.run(
+                ["kubectl", "config", "view", "--minify", "-o", "jsonpath={..namespace}"],
+                capture_output=True, text=True, timeout=10,
+            )
+            ns = result.stdout.strip() if result.returncode == 0 else ""
+        except Exception:
+            pass
+        _current_namespace_cache = ns or "default"
+    return _current_namespace_cache
+
+
+_RELEASE_VIEWS = {
+    "helm_values": _helm_releases.render_values,
+    "helm_status": _helm_releases.render_status,
+    "helm_manifest": _helm_releases.render_manifest,
+    "helm_hooks": _helm_releases.render_hooks,
+    "helm_chart": _helm_releases.render_chart,
+    "helm_notes": _helm_releases.render_notes,
+}
+
+
+def read_release_view(name: str, release_name: str, namespace: str) -> Optional[str]:
+    """
+    原生读取 release 子视图；返回 None 表示不可用（非 Secret 驱动、无 kubectl 或读取失败），调用方回退到 helm 命令。
+    release 不存在时返回与 helm 一致的错误文本。
+    """
+    if not _helm_releases.native_enabled():
+        return None
+    try:
+        if name == "helm_history":
+            return _helm_releases.render_history(_releases.history(namespace, release_name))
+        return _RELEASE_VIEWS[name](_releases.get(namespace, release_name))
+    except LookupError as e:
+        return f"错误: {e}"
+    except Exception as e:
+        _logger.warning(f"[{name}] 原生读取 {namespace}/{release_name} 失败，回退到 helm 命令: {e}")
+        return None
+
+
+def read_manifest_resources(release_name: str, namespace: str, arguments: dict) -> str:
+    """按资源索引返回 manifest 的资源清单或选中的资源；原生读取不可用时解析 helm get manifest 的输出。"""
+    revision = arguments.get("revision")
+    try:
+        revision = int(revision) if revision not in (None, "") else None
+    except (TypeError, ValueError):
+        return "错误: revision 必须是整数"
+    resources = None
+    if _helm_releases.native_enabled():
+        try:
+            resources = _releases.resources(namespace, release_name, revision)
+        except LookupError as e:
+            return f"错误: {e}"
+        except Exception as e:
+            _logger.warning(f"[helm_manifest] 原生读取 {namespace}/{release_name} 失败，回退到 helm 命令: {e}")
+    if resources is None:
+        args = ["get", "manifest", release_name, "-n", namespace]
+        if revision is not None:
+            args.extend(["--revision", str(revision)])
+        result = run_helm_command(args)
+        if not result["success"]:
+            return f"错误: {result['error']}"
+        resources = _helm_releases.index_manifest(result["data"], namespace)
+    selected = _helm_releases.select_resources(
+        resources,
+        kind=str(arguments.get("kind") or ""),
+        name=str(arguments.get("resource_name") or ""),
+        namespace=str(arguments.get("resource_namespace") or ""),
+    )
+    if arguments.get("inventory") in (True, "true", "True"):
+        return _helm_releases.render_resource_inventory(selected)
+    if not selected:
+        return f"未找到匹配的资源（release {namespace}/{release_name} 共 {len(resources)} 个资源），可用 inventory=true 查看资源清单"
+    return _helm_releases.render_resources(selected)
+
+
+def _current_revision(namespace: str, release_name: str) -> Optional[int]:
+    revs = _inventory.revisions(namespace, release_name) if _inventory.ready() else {}
+    if revs:
+        return max(revs)
+    if _helm_releases.native_enabled():
+        try:
+            return int(_releases.get(namespace, release_name).get("version") or 0) or None
+        except Exception:
+            return None
+    return None
+
+
+def _release_exists(namespace: str, release_name: str) -> Optional[bool]:
+    """release 是否已有任何 revision；清单未就绪且无法直接读取 Secret 时返回 None（无法确定）。"""
+    if _inventory.ready():
+        return bool(_inventory.revisions(namespace, release_name))
+    if _helm_releases.native_enabled():
+        try:
+            _releases.get(namespace, release_name)
+            return True
+        except LookupError:
+            return False
+        except Exception:
+            return None
+    return None
+
+
+def local_chart(chart: str, version: Optional[str]) -> Optional[str]:
+    """仓库 chart 在本地归档缓存中的路径（缺失时下载入缓存）；不可用或失败时返回 None，由 helm 自行拉取。"""
+    if not _helm_charts.ChartCache.enabled() or not _helm_charts.is_repo_ref(chart):
+        return None
+    try:
+        resolved = _chart_cache.resolve(chart, str(version or ""))
+    except Exception as e:
+        _logger.warning(f"[chart cache] 解析 {chart} {version or ''} 失败，交由 helm 拉取: {e}")
+        return None
+    if resolved is None:
+        return None
+    _logger.info(f"[chart cache] {chart} {resolved['version']} -> {resolved['path']} ({resolved['source']})")
+    return resolved["path"]
+
+
+def run_dry_run(operation: str, arguments: dict, args: List[str], values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    经渲染缓存执行 install/upgrade --dry-run（args[2] 为 chart 引用，不含 --set 参数）。
+    命中时返回 {"success": True, "data": ..., "cached": True}。
+    upgrade 的输出依赖 release 当前状态，无法确定当前 revision 时不缓存；install 只在确认 release 不存在时
+    使用缓存（release 存在时真实的 install --dry-run 会失败：cannot re-use a name that is still in use）。
+    """
+    release_name, chart = args[1], args[2]
+    namespace = arguments.get("namespace") or current_namespace()
+    try:
+        resolved = _helm_charts.resolve_chart(chart, str(arguments.get("version") or ""), _repo_index)
+    except Exception as e:
+        _logger.warning(f"[{operation} dry-run] 解析 chart {chart} 失败，不使用渲染缓存: {e}")
+        resolved = None
+    revision = _current_revision(namespace, release_name) if resolved and operation == "upgrade" else None
+    if operation == "upgrade" and revision is None:
+        resolved = None
+    if resolved is not None and operation == "install" and _release_exists(namespace, release_name) is not False:
+        resolved = None
+    key = None
+    if resolved is not None:
+        key = _render_cache.key(operation, release_name, namespace, resolved, values, args[:2] + args[3:], revision)
+        cached = _render_cache.get(key)
+        if cached is not None:
+            return {"success": True, "data": cached, "cached": True}
+    result = run_helm_command(args + _helm_charts.set_value_args(values))
+    if result["success"] and key is not None:
+        _render_cache.put(key, result["data"])
+    return result
+
+
+def _use_local_chart(chart: str, version: Optional[str]) -> Callable[[List[str]], List[str]]:
+    """后台作业的 prepare：在作业线程中把 args[2] 的仓库 chart 换成本地缓存归档（可能需要下载）。"""
+    def prepare(args: List[str]) -> List[str]:
+        cached_chart = local_chart(chart, version)
+        return args[:2] + [cached_chart] + args[3:] if cached_chart else args
+    return prepare
+
+
+def start_job(operation: str, release_name: str, namespace: Optional[str], args: List[str],
+              prepare: Optional[Callable[[List[str]], List[str]]] = None) -> str:
+    """启动后台作业，返回 job_id 与后续查询方式；release 已有运行中的作业时返回错误。"""
+    if not shutil.which("helm"):
+        return "错误: helm 命令未找到，请确保已安装 helm"
+    try:
+        job = _jobs.start(operation, release_name, namespace or current_namespace(), args, prepare)
+    except RuntimeError as e:
+        return f"错误: {e}"
+    summary = job.summary()
+    summary["hint"] = "使用 helm_job_status(job_id, since=next_cursor, wait_seconds=N) 跟踪进度，helm_job_cancel 取消"
+    return json.dumps(summary, indent=2, ensure_ascii=False)
+
+
+def _int_arg(arguments: dict, key: str, default: int) -> int:
+    try:
+        return int(arguments.get(key) if arguments.get(key) not in (None, "") else default)
+    except (TypeError, ValueError):
+        return default
+
+
 def parse_helm_json(output: str) -> Any:
     """解析 helm JSON 输出"""
     try:
@@ -140,6 +351,10 @@ async def list_tools():
                         "type": "boolean",
                         "description": "是否等待所有资源就绪（默认: false）"
                     },
+                    "background": {
+                        "type": "boolean",
+                        "description": "是否作为后台作业执行并立即返回 job_id（配合 wait 使用长时间操作时推荐；默认: false）"
+                    },
                     "dry_run": {
                         "type": "boolean",
                         "description": "是否只模拟安装，不实际执行（默认: false）"
@@ -220,6 +435,10 @@ async def list_tools():
                         "type": "boolean",
                         "description": "是否等待所有资源就绪（默认: false）"
                     },
+                    "background": {
+                        "type": "boolean",
+                        "description": "是否作为后台作业执行并立即返回 job_id（配合 wait 使用长时间操作时推荐；默认: false）"
+                    },
                     "dry_run": {
                         "type": "boolean",
                         "description": "是否只模拟升级，不实际执行（默认: false）"
@@ -254,6 +473,10 @@ async def list_tools():
                         "type": "boolean",
                         "description": "是否等待所有资源就绪（默认: false）"
                     },
+                    "background": {
+                        "type": "boolean",
+                        "description": "是否作为后台作业执行并立即返回 job_id（配合 wait 使用长时间操作时推荐；默认: false）"
+                    },
                     "dry_run": {
                         "type": "boolean",
                         "description": "是否只模拟回滚，不实际执行（默认: false）"
@@ -279,11 +502,100 @@ async def list_tools():
                     "versions": {
                         "type": "boolean",
                         "description": "是否显示所有可用版本（默认只显示最新版本）"
+                    },
+                    "version": {
+                        "type": "string",
+                        "description": "版本约束（semver，如 ^1.2.0、~15.1、>=1.0 <2.0），同 helm search repo --version"
+                    },
+                    "devel": {
+                        "type": "boolean",
+                        "description": "是否包含预发布版本（默认: false）"
+                    },
+                    "regexp": {
+                        "type": "boolean",
+                        "description": "keyword 按正则表达式匹配（默认: false）"
                     }
                 },
                 "required": ["keyword"]
             }
         ),
+        
+        # ============================================================
+        # helm_chart_prefetch - 预热本地 chart 归档缓存
+        # ============================================================
+        Tool(
+            name="helm_chart_prefetch",
+            description=(
+                "预先下载仓库 chart 到本地归档缓存（按仓库索引 digest 校验），之后的 install/upgrade 直接使用本地归档，"
+                "适合离线（air-gapped）集群或批量部署前预热。返回每个 chart 的结果与缓存统计。"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "charts": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "chart 列表，格式 repo/name@version（版本可省略表示最新，或写版本约束如 repo/name@^1.2）"
+                    }
+                },
+                "required": ["charts"]
+            }
+        ),
+        
+        # ============================================================
+        # helm 后台作业（background=true 启动的 install / upgrade / rollback）
+        # ============================================================
+        Tool(
+            name="helm_job_status",
+            description=(
+                "查询 Helm 后台作业的状态并增量读取输出：传入上次返回的 next_cursor 作为 since 只获取新输出，"
+                "wait_seconds > 0 时等待新输出或作业结束（长轮询）。"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "作业 ID（background=true 时返回）"
+                    },
+                    "since": {
+                        "type": "integer",
+                        "description": "输出行游标，返回该行之后的输出（默认: 0）"
+                    },
+                    "max_lines": {
+                        "type": "integer",
+                        "description": "本次最多返回的行数（默认: 200）"
+                    },
+                    "wait_seconds": {
+                        "type": "integer",
+                        "description": "没有新输出时最多等待的秒数（默认: 0，最大 60）"
+                    }
+                },
+                "required": ["job_id"]
+            }
+        ),
+        Tool(
+            name="helm_job_cancel",
+            description="取消运行中的 Helm 后台作业（向 helm 发送 SIGTERM，宽限期后强制结束）。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "作业 ID"
+                    }
+                },
+                "required": ["job_id"]
+            }
+        ),
+        Tool(
+            name="helm_job_list",
+            description="列出 Helm 后台作业（运行中与最近结束的），最新的在前。",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
+        ),
         # ============================================================
         # helm/core 只读工具（与 Holmes helm/core 一致）
         # ============================================================
@@ -330,12 +642,23 @@ async def list_tools():
         ),
         Tool(
             name="helm_manifest",
-            description="Fetch the generated Kubernetes manifest for a Helm release.",
+            description=(
+                "Fetch the generated Kubernetes manifest for a Helm release. Use inventory=true for a compact "
+                "list of the resources (kind/namespace/name), or kind/resource_name to fetch only matching resources."
+            ),
             inputSchema={
                 "type": "object",
                 "properties": {
                     "release_name": {"type": "string", "description": "Release 名称"},
-                    "namespace": {"type": "string", "description": "命名空间"}
+                    "namespace": {"type": "string", "description": "命名空间"},
+                    "revision": {"type": "integer", "description": "Release revision（可选，默认最新）"},
+                    "inventory": {
+                        "type": "boolean",
+                        "description": "只返回资源清单（KIND/NAMESPACE/NAME/行数/模板路径），不返回 YAML（默认: false）"
+                    },
+                    "kind": {"type": "string", "description": "只返回该 kind 的资源（如 Deployment、configmaps）"},
+                    "resource_name": {"type": "string", "description": "只返回该名称的资源（无精确匹配时按子串匹配）"},
+                    "resource_namespace": {"type": "string", "description": "只返回该命名空间中的资源"}
                 },
                 "required": ["release_name", "namespace"]
             }
@@ -385,12 +708,24 @@ async def call_tool(name: str, arguments: dict):
     log_tool_call(_SERVER, name, arguments)
     t0 = time.monotonic()
     # MCP 入口层清洗：仅保留标量，避免误传对象导致命令注入/语法错误（与 Holmes 内置工具改造一致）
-    arguments = sanitize_arguments_for_tools(arguments or {})
+    # set_values 是对象，在各工具中从原始参数单独解析
+    raw_arguments = arguments or {}
+    arguments = sanitize_arguments_for_tools(raw_arguments)
 
     # ============================================================
     # helm_list_releases - 列出 releases
     # ============================================================
     if name == "helm_list_releases":
+        if _inventory.ready():
+            namespace = None
+            if not arguments.get("all_namespaces"):
+                namespace = arguments.get("namespace") or current_namespace()
+            try:
+                simplified = _inventory.releases(namespace, arguments.get("filter") or None)
+            except re.error as e:
+                return [TextContent(type="text", text=f"错误: filter 不是合法的正则表达式: {e}")]
+            return [TextContent(type="text", text=json.dumps(simplified, indent=2, ensure_ascii=False))]
+
         args = ["list", "--output", "json"]
         
         if arguments.get("all_namespaces"):
@@ -401,7 +736,7 @@ async def call_tool(name: str, arguments: dict):
         if arguments.get("filter"):
             args.extend(["--filter", arguments["filter"]])
         
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         
         if result["success"]:
             releases = parse_helm_json(result["data"])
@@ -450,12 +785,29 @@ async def call_tool(name: str, arguments: dict):
             args.append("--dry-run")
         
         # 处理 set values
-        set_values = arguments.get("set_values", {})
-        for key, value in set_values.items():
-            args.extend(["--set", f"{key}={value}"])
+        try:
+            values = _helm_charts.parse_set_values(raw_arguments.get("set_values"))
+        except ValueError as e:
+            return [TextContent(type="text", text=f"错误: {e}")]
         
-        result = run_helm_command(args)
+        # 仓库 chart 优先使用本地已校验的归档；解析可能需要下载，后台作业在作业线程中进行
+        if arguments.get("background") in (True, "true", "True"):
+            args.extend(_helm_charts.set_value_args(values))
+            prepare = _use_local_chart(chart, arguments.get("version"))
+            text = start_job("install", release_name, arguments.get("namespace"), args, prepare)
+            return [TextContent(type="text", text=text)]
         
+        cached_chart = await asyncio.to_thread(local_chart, chart, arguments.get("version"))
+        if cached_chart:
+            args[2] = cached_chart
+        
+        if arguments.get("dry_run"):
+            result = await asyncio.to_thread(run_dry_run, "install", arguments, args, values)
+        else:
+            result = await asyncio.to_thread(run_helm_command, args + _helm_charts.set_value_args(values))
+        
+        if result.get("cached"):
+            return [TextContent(type="text", text=f"✅ 安装成功（dry-run 渲染缓存命中）\n\n{result['data']}")]
         if result["success"]:
             return [TextContent(type="text", text=f"✅ 安装成功\n\n{result['data']}")]
         return [TextContent(type="text", text=f"❌ 安装失败: {result['error']}")]
@@ -480,7 +832,7 @@ async def call_tool(name: str, arguments: dict):
         if arguments.get("dry_run"):
             args.append("--dry-run")
         
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         
         if result["success"]:
             return [TextContent(type="text", text=f"✅ 卸载成功\n\n{result['data']}")]
@@ -517,12 +869,29 @@ async def call_tool(name: str, arguments: dict):
             args.append("--dry-run")
         
         # 处理 set values
-        set_values = arguments.get("set_values", {})
-        for key, value in set_values.items():
-            args.extend(["--set", f"{key}={value}"])
+        try:
+            values = _helm_charts.parse_set_values(raw_arguments.get("set_values"))
+        except ValueError as e:
+            return [TextContent(type="text", text=f"错误: {e}")]
         
-        result = run_helm_command(args)
+        # 仓库 chart 优先使用本地已校验的归档；解析可能需要下载，后台作业在作业线程中进行
+        if arguments.get("background") in (True, "true", "True"):
+            args.extend(_helm_charts.set_value_args(values))
+            prepare = _use_local_chart(chart, arguments.get("version"))
+            text = start_job("upgrade", release_name, arguments.get("namespace"), args, prepare)
+            return [TextContent(type="text", text=text)]
         
+        cached_chart = await asyncio.to_thread(local_chart, chart, arguments.get("version"))
+        if cached_chart:
+            args[2] = cached_chart
+        
+        if arguments.get("dry_run"):
+            result = await asyncio.to_thread(run_dry_run, "upgrade", arguments, args, values)
+        else:
+            result = await asyncio.to_thread(run_helm_command, args + _helm_charts.set_value_args(values))
+        
+        if result.get("cached"):
+            return [TextContent(type="text", text=f"✅ 升级成功（dry-run 渲染缓存命中）\n\n{result['data']}")]
         if result["success"]:
             return [TextContent(type="text", text=f"✅ 升级成功\n\n{result['data']}")]
         return [TextContent(type="text", text=f"❌ 升级失败: {result['error']}")]
@@ -551,7 +920,11 @@ async def call_tool(name: str, arguments: dict):
         if arguments.get("dry_run"):
             args.append("--dry-run")
         
-        result = run_helm_command(args)
+        if arguments.get("background") in (True, "true", "True"):
+            text = start_job("rollback", release_name, arguments.get("namespace"), args)
+            return [TextContent(type="text", text=text)]
+        
+        result = await asyncio.to_thread(run_helm_command, args)
         
         if result["success"]:
             return [TextContent(type="text", text=f"✅ 回滚成功\n\n{result['data']}")]
@@ -566,12 +939,31 @@ async def call_tool(name: str, arguments: dict):
         if not keyword:
             return [TextContent(type="text", text="错误: 缺少 keyword 参数")]
         
+        versions = arguments.get("versions") in (True, "true", "True")
+        version = str(arguments.get("version") or "").strip()
+        devel = arguments.get("devel") in (True, "true", "True")
+        regexp = arguments.get("regexp") in (True, "true", "True")
+        if _repo_index.available():
+            try:
+                charts = await asyncio.to_thread(_repo_index.search, keyword, versions, version, devel, regexp)
+                return [TextContent(type="text", text=json.dumps(charts, indent=2, ensure_ascii=False))]
+            except (ValueError, re.error) as e:
+                return [TextContent(type="text", text=f"错误: {e}")]
+            except Exception as e:
+                _logger.warning(f"[helm_search_repo] 读取仓库索引失败，回退到 helm 命令: {e}")
+        
         args = ["search", "repo", keyword, "--output", "json"]
         
-        if arguments.get("versions"):
+        if versions:
             args.append("--versions")
+        if version:
+            args.extend(["--version", version])
+        if devel:
+            args.append("--devel")
+        if regexp:
+            args.append("--regexp")
         
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         
         if result["success"]:
             charts = parse_helm_json(result["data"])
@@ -580,11 +972,54 @@ async def call_tool(name: str, arguments: dict):
             return [TextContent(type="text", text=result["data"])]
         return [TextContent(type="text", text=f"错误: {result['error']}")]
     
+    # ============================================================
+    # helm_chart_prefetch - 预热本地 chart 归档缓存
+    # ============================================================
+    elif name == "helm_chart_prefetch":
+        charts = raw_arguments.get("charts")
+        if isinstance(charts, str):
+            charts = [c for c in charts.replace(",", " ").split() if c]
+        if not isinstance(charts, list) or not charts:
+            return [TextContent(type="text", text="错误: 缺少 charts 参数（repo/name@version 列表）")]
+        if not _helm_charts.ChartCache.enabled():
+            return [TextContent(type="text", text="错误: 本地 chart 缓存已关闭（HELM_CHART_CACHE=false）")]
+        results = await asyncio.to_thread(_chart_cache.prefetch, [str(c) for c in charts])
+        payload = {"results": results, "cache": _chart_cache.stats()}
+        return [TextContent(type="text", text=json.dumps(payload, indent=2, ensure_ascii=False))]
+    
+    # ============================================================
+    # helm 后台作业
+    # ============================================================
+    elif name == "helm_job_status":
+        try:
+            status = await asyncio.to_thread(
+                _jobs.poll,
+                arguments.get("job_id") or "",
+                _int_arg(arguments, "since", 0),
+                _int_arg(arguments, "max_lines", 200),
+                _int_arg(arguments, "wait_seconds", 0),
+            )
+        except LookupError as e:
+            return [TextContent(type="text", text=f"错误: {e}")]
+        return [TextContent(type="text", text=json.dumps(status, indent=2, ensure_ascii=False))]
+    
+    elif name == "helm_job_cancel":
+        try:
+            job = _jobs.cancel(arguments.get("job_id") or "")
+        except LookupError as e:
+            return [TextContent(type="text", text=f"错误: {e}")]
+        return [TextContent(type="text", text=json.dumps(job.summary(), indent=2, ensure_ascii=False))]
+    
+    elif name == "helm_job_list":
+        return [TextContent(type="text", text=json.dumps(_jobs.list(), indent=2, ensure_ascii=False))]
+    
     # ============================================================
     # helm/core 只读工具
     # ============================================================
     elif name == "helm_list":
-        result = run_helm_command(["list", "-A"])
+        if _inventory.ready():
+            return [TextContent(type="text", text=_helm_releases.format_table(_inventory.releases()))]
+        result = await asyncio.to_thread(run_helm_command, ["list", "-A"])
         if result["success"]:
             return [TextContent(type="text", text=result["data"])]
         return [TextContent(type="text", text=f"错误: {result['error']}")]
@@ -594,8 +1029,11 @@ async def call_tool(name: str, arguments: dict):
         namespace = arguments.get("namespace")
         if not release_name or not namespace:
             return [TextContent(type="text", text="错误: 缺少 release_name 或 namespace 参数")]
+        native = await asyncio.to_thread(read_release_view, name, release_name, namespace)
+        if native is not None:
+            return [TextContent(type="text", text=native)]
         args = ["get", "values", "-a", release_name, "-n", namespace, "-o", "json"]
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         if result["success"]:
             return [TextContent(type="text", text=result["data"])]
         return [TextContent(type="text", text=f"错误: {result['error']}")]
@@ -605,8 +1043,11 @@ async def call_tool(name: str, arguments: dict):
         namespace = arguments.get("namespace")
         if not release_name or not namespace:
             return [TextContent(type="text", text="错误: 缺少 release_name 或 namespace 参数")]
+        native = await asyncio.to_thread(read_release_view, name, release_name, namespace)
+        if native is not None:
+            return [TextContent(type="text", text=native)]
         args = ["status", release_name, "-n", namespace]
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         if result["success"]:
             return [TextContent(type="text", text=result["data"])]
         return [TextContent(type="text", text=f"错误: {result['error']}")]
@@ -616,8 +1057,11 @@ async def call_tool(name: str, arguments: dict):
         namespace = arguments.get("namespace")
         if not release_name or not namespace:
             return [TextContent(type="text", text="错误: 缺少 release_name 或 namespace 参数")]
+        native = await asyncio.to_thread(read_release_view, name, release_name, namespace)
+        if native is not None:
+            return [TextContent(type="text", text=native)]
         args = ["history", release_name, "-n", namespace]
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         if result["success"]:
             return [TextContent(type="text", text=result["data"])]
         return [TextContent(type="text", text=f"错误: {result['error']}")]
@@ -627,8 +1071,15 @@ async def call_tool(name: str, arguments: dict):
         namespace = arguments.get("namespace")
         if not release_name or not namespace:
             return [TextContent(type="text", text="错误: 缺少 release_name 或 namespace 参数")]
+        if any(arguments.get(k) not in (None, "", False, "false", "False")
+               for k in ("inventory", "kind", "resource_name", "resource_namespace", "revision")):
+            return [TextContent(type="text", text=await asyncio.to_thread(
+                read_manifest_resources, release_name, namespace, arguments))]
+        native = await asyncio.to_thread(read_release_view, name, release_name, namespace)
+        if native is not None:
+            return [TextContent(type="text", text=native)]
         args = ["get", "manifest", release_name, "-n", namespace]
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         if result["success"]:
             return [TextContent(type="text", text=result["data"])]
         return [TextContent(type="text", text=f"错误: {result['error']}")]
@@ -638,8 +1089,11 @@ async def call_tool(name: str, arguments: dict):
         namespace = arguments.get("namespace")
         if not release_name or not namespace:
             return [TextContent(type="text", text="错误: 缺少 release_name 或 namespace 参数")]
+        native = await asyncio.to_thread(read_release_view, name, release_name, namespace)
+        if native is not None:
+            return [TextContent(type="text", text=native)]
         args = ["get", "hooks", release_name, "-n", namespace]
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         if result["success"]:
             return [TextContent(type="text", text=result["data"])]
         return [TextContent(type="text", text=f"错误: {result['error']}")]
@@ -649,8 +1103,11 @@ async def call_tool(name: str, arguments: dict):
         namespace = arguments.get("namespace")
         if not release_name or not namespace:
             return [TextContent(type="text", text="错误: 缺少 release_name 或 namespace 参数")]
+        native = await asyncio.to_thread(read_release_view, name, release_name, namespace)
+        if native is not None:
+            return [TextContent(type="text", text=native)]
         args = ["get", "chart", release_name, "-n", namespace]
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         if result["success"]:
             return [TextContent(type="text", text=result["data"])]
         return [TextContent(type="text", text=f"错误: {result['error']}")]
@@ -660,8 +1117,11 @@ async def call_tool(name: str, arguments: dict):
         namespace = arguments.get("namespace")
         if not release_name or not namespace:
             return [TextContent(type="text", text="错误: 缺少 release_name 或 namespace 参数")]
+        native = await asyncio.to_thread(read_release_view, name, release_name, namespace)
+        if native is not None:
+            return [TextContent(type="text", text=native)]
         args = ["get", "notes", release_name, "-n", namespace]
-        result = run_helm_command(args)
+        result = await asyncio.to_thread(run_helm_command, args)
         if result["success"]:
             return [TextContent(type="text", text=result["data"])]
         return [TextContent(type="text", text=f"错误: {result['error']}")]
@@ -674,6 +1134,9 @@ async def call_tool(name: str, arguments: dict):
 
 async def main():
     """运行服务器"""
+    # 后台预热 release 清单，首次 list 调用即可命中内存
+    _inventory.start()
+    _repo_index.warm()
     async with stdio_server() as (read_stream, write_stream):
         await server.run(read_stream, write_stream, server.create_initialization_options())
 
@@ -0,0 +1,823 @@
+"""
+run_bash_command 的命令安全策略：先按 bash 语法把命令拆成管道 / 简单命令，再用预编译、按命令名索引的规则匹配。
+
+解析：引号（'..' / ".." / $'..' 含 \\xHH 等转义）、反斜杠、$(..) / `..` / <(..) 命令替换（含 ${..} / $((..)) 内部的）、
+${IFS} 分隔、重定向、here-document（<< / <<-，正文作为数据跳过；定界符未加引号时只收集正文中的命令替换；
+heredoc / <<< 的文本经标准输入交给 shell 时——bash <<EOF、bash <<<'..'、cat <<EOF | sh——按脚本递归解析）、
+; && || | & 与 ( ) { } 分组；替换体与 bash -c / sh -c / eval / watch / su -c 的脚本递归解析。
+每条简单命令去掉前置赋值、保留字、function / coproc 与包装命令（sudo / env / time / timeout / xargs / nohup / exec ...），
+取程序名的 basename（/bin/rm、\\rm、'r'm 均归一为 rm），得到 "程序 参数... > 重定向目标" 的规范文本。
+
+规则：
+- 以 \\b<命令名> 开头的正则（内置 DEFAULT_UNSAFE_PATTERNS 或 BASH_BLOCKED_PATTERNS）：与旧实现一样对原始命令匹配，
+  作为下限；命中时只有确认该模式出现在数据位置（grep / echo / git log 等的参数、交给非解释器的 heredoc 正文）
+  才放行。另对每条规范文本匹配（可能执行参数的命令如 ssh / find -exec / python -c 匹配全部正则，只读数据的命令
+  与另行递归检查的 bash -c 只匹配以自身命令名开头的正则），以拦截引号 / 路径 / 包装混淆后的命令。
+- 其余正则对原始命令和每条规范文本匹配。
+- BASH_BLOCKED_COMMANDS 中的命令名：任一简单命令（含包装与嵌套）的程序名命中即拒绝。
+- 结构规则：下载命令经管道交给 shell / 解释器执行、shell 执行 <(curl ..)、rm 递归删除根或系统目录。
+规则只在 BASH_BLOCKED_COMMANDS / BASH_BLOCKED_PATTERNS 变化时重建（get_policy）。
+"""
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# 内置危险命令/模式（命中则拒绝）。无需配置即生效。
+DEFAULT_UNSAFE_PATTERNS = [
+    # rm 删除根或系统路径
+    r"\brm\s+(-rf?|-\s*rf?)\s+/",
+    r"\brm\s+(-rf?|-\s*rf?)\s+/\s",
+    # 磁盘/分区/块设备
+    r"\bmkfs\.?\w*\s",
+    r"\bdd\s+.*(if=.*of=|of=.*if=)",
+    r"\bdd\s+.*of=\s*\/dev\/",
+    r">\s*/dev/(sd|nvme|hd|loop)\w*",
+    r"\bfdisk\s",
+    r"\bparted\s+.*\b(rm|mklabel)\b",
+    r"\bwipefs\s+.*-a",
+    r"\bmkswap\s+.*/dev/",
+    r"\bsfdisk\s+.*\/dev\/",
+    r"\bblockdev\s+.*(--flushbufs|--rereadpt)\s",
+    # fork 炸弹
+    r":\s*\(\s*\)\s*\{\s*:\s*\|\s*:\s*&\s*\}",  # :(){ :|:& };:
+    # 提权/权限
+    r"\bchmod\s+[-+]?s\b",
+    r"\bchmod\s+[0-7]{3,4}\s+\/",
+    r"\bchown\s+.*\b(root|0)\s",
+    # 管道下载执行（远程代码）
+    r"\bcurl\s+[^|]*\|\s*(bash|sh)\s*$",
+    r"\bwget\s+[^|]*\|\s*(bash|sh)\s*$",
+    # 覆盖设备/关键路径
+    r"\bshred\s+.*-f.*/dev/",
+    r"\bshred\s+.*\/",
+    # 系统控制
+    r"\bsystemctl\s+(stop|restart|reboot|halt|poweroff)\s",
+    r"\binit\s+[06]",  # reboot/halt
+    r"\breboot\b",
+    r"\bhalt\b",
+    r"\bpoweroff\b",
+    r"\bshutdown\s+-(r|h|P)",
+    # 防火墙/网络
+    r"\biptables\s+(-F|--flush)\b",
+    r"\bip6tables\s+(-F|--flush)\b",
+    # 挂载危险
+    r"\bmount\s+.*-o\s+.*remount.*\/\s",
+    r"\bumount\s+\/",
+    # 用户/密码/权限
+    r"\bpasswd\s+.*(root|-u\s+0)\b",
+    r"\busermod\s+.*-o\s+-u\s+0\b",
+    r"\buserdel\s+-f\s+root\b",
+    # 覆盖系统关键文件
+    r">\s*/etc/(shadow|passwd|sudoers)",
+    r"\b:>\s*/",
+    # 内核/模块
+    r"\bsysctl\s+-w\s+kernel\.(core_pattern|sysrq)",
+    r"\bmodprobe\s+-r\s+(ext4|xfs|nfs)\b",
+    # SELinux/AppArmor 关闭
+    r"\bsetenforce\s+0\b",
+    r"\bapparmor_parser\s+-R\b",
+]
+
+_MAX_DEPTH = 8
+_OPERATOR_CHARS = set("|&;()<>\n")
+_PLAIN_RE = re.compile(r"[^\s|&;()<>\\'\"$`]+")
+_BLANK_RE = re.compile(r"[ \t]+")
+_HEREDOC_SPECIAL_RE = re.compile(r"[\\$`]")
+_ASSIGN_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\[[^\]]*\])?\+?=")
+_INDEX_KEY_RE = re.compile(r"^\\b([A-Za-z_][\w-]*)")
+_RESERVED = {"!", "{", "}", "if", "then", "else", "elif", "fi", "do", "done", "while", "until", "esac"}
+# 包装命令 -> (带参数值的选项, 选项之后还需跳过的位置参数个数)
+_WRAPPERS: Dict[str, Tuple[frozenset, int]] = {
+    "sudo": (frozenset({"-u", "-g", "-C", "-h", "-p", "-r", "-t", "-U", "-D", "--user", "--group"}), 0),
+    "doas": (frozenset({"-u", "-C"}), 0),
+    "env": (frozenset({"-u", "-C", "--unset", "--chdir"}), 0),
+    "nice": (frozenset({"-n", "--adjustment"}), 0),
+    "ionice": (frozenset({"-c", "-n", "-p", "-t", "--class", "--classdata"}), 0),
+    "nohup": (frozenset(), 0),
+    "command": (frozenset(), 0),
+    "builtin": (frozenset(), 0),
+    "exec": (frozenset({"-a"}), 0),
+    "time": (frozenset({"-f", "-o"}), 0),
+    "timeout": (frozenset({"-s", "--signal", "-k", "--kill-after"}), 1),
+    "stdbuf": (frozenset({"-i", "-o", "-e"}), 0),
+    "setsid": (frozenset(), 0),
+    "xargs": (frozenset({"-I", "-n", "-P", "-L", "-d", "-a", "-E", "-s", "--max-args", "--max-procs",
+                         "--delimiter", "--arg-file", "--replace"}), 0),
+    "chroot": (frozenset({"--userspec", "--groups"}), 1),
+    "busybox": (frozenset(), 0),
+    "strace": (frozenset({"-e", "-o", "-p", "-s", "-u"}), 0),
+    "flock": (frozenset({"-w", "-E", "--timeout", "--conflict-exit-code"}), 1),
+    "unshare": (frozenset(), 0),
+    "nsenter": (frozenset({"-t", "--target"}), 0),
+}
+_SHELLS = {"bash", "sh", "zsh", "dash", "ksh", "ash", "mksh", "rbash"}
+_INTERPRETERS = _SHELLS | {"python", "python2", "python3", "perl", "ruby", "node", "php"}
+_DOWNLOADERS = {"curl", "wget", "fetch", "aria2c"}
+_DOWNLOADER_RE = re.compile(r"\b(curl|wget|fetch|aria2c)\b")
+_SOURCE_COMMANDS = {"source", "."}
+_STDIN_PATHS = {"-", "/dev/stdin", "/dev/fd/0", "/proc/self/fd/0"}
+# 只把参数当数据读写、不会执行参数中命令的程序：原始命令里的模式命中若只出现在这些程序的参数中，视为误报
+_DATA_PROGRAMS = {"grep", "egrep", "fgrep", "zgrep", "echo", "printf", "journalctl", "cat", "head", "tail", "wc",
+                  "uniq", "jq"}
+_DATA_GIT_SUBCOMMANDS = {"log", "grep", "show", "diff", "blame", "status"}
+_CRITICAL_PATHS = {
+    "/", "/*", "~", "~/", "/bin", "/boot", "/dev", "/etc", "/home", "/lib", "/lib32", "/lib64", "/opt", "/proc",
+    "/root", "/run", "/sbin", "/srv", "/sys", "/usr", "/var",
+}
+
+
+class ParseError(ValueError):
+    pass
+
+
+class SimpleCommand:
+    __slots__ = ("words", "redirects", "stdin", "program", "args", "text")
+
+    def __init__(self, words: List[str], redirects: List[Tuple[str, str]], stdin: Optional[List[str]] = None):
+        self.words = words
+        self.redirects = redirects
+        # << / <<- / <<< 送入标准输入的文本（heredoc 正文在读到换行后才补入）
+        self.stdin: List[str] = stdin if stdin is not None else []
+        self.program = ""
+        self.args: List[str] = []
+        self.text = ""
+
+
+# ---------------------------------------------------------------------------
+# 词法 / 语法
+# ---------------------------------------------------------------------------
+
+
+def _ansi_c(body: str) -> str:
+    """$'..' 的转义：\\xHH \\uHHHH \\NNN \\n \\t 等。"""
+    out = []
+    i = 0
+    simple = {"n": "\n", "t": "\t", "r": "\r", "a": "\a", "b": "\b", "e": "\x1b", "E": "\x1b", "f": "\f",
+              "v": "\v", "\\": "\\", "'": "'", '"': '"', "?": "?"}
+    while i < len(body):
+        c = body[i]
+        if c != "\\" or i + 1 >= len(body):
+            out.append(c)
+            i += 1
+            continue
+        n = body[i + 1]
+        if n in simple:
+            out.append(simple[n])
+            i += 2
+        elif n == "x":
+            m = re.match(r"[0-9A-Fa-f]{1,2}", body[i + 2:])
+            out.append(chr(int(m.group(0), 16)) if m else "\\x")
+            i += 2 + (len(m.group(0)) if m else 0)
+        elif n in "uU":
+            m = re.match(r"[0-9A-Fa-f]{1,%d}" % (4 if n == "u" else 8), body[i + 2:])
+            out.append(chr(int(m.group(0), 16)) if m else "\\" + n)
+            i += 2 + (len(m.group(0)) if m else 0)
+        elif n in "01234567":
+            m = re.match(r"[0-7]{1,3}", body[i + 1:])
+            out.append(chr(int(m.group(0), 8)))
+            i += 1 + len(m.group(0))
+        else:
+            out.append("\\" + n)
+            i += 2
+    return "".join(out)
+
+
+def _read_balanced(s: str, i: int) -> int:
+    """s[i] 在 '(' 之后；返回匹配的 ')' 的下标（跳过引号与嵌套括号）。"""
+    depth = 1
+    n = len(s)
+    while i < n:
+        c = s[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "'":
+            j = s.find("'", i + 1)
+            if j < 0:
+                raise ParseError("unterminated single quote")
+            i = j + 1
+            continue
+        if c == '"':
+            i = _skip_double(s, i + 1)
+            continue
+        if c == "`":
+            j = _find_backtick(s, i + 1)
+            i = j + 1
+            continue
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ParseError("unterminated '('")
+
+
+def _skip_double(s: str, i: int) -> int:
+    """s[i] 在 '"' 之后；返回结束引号之后的下标。"""
+    n = len(s)
+    while i < n:
+        c = s[i]
+        if c == "\\":
+            i += 2
+        elif c == '"':
+            return i + 1
+        elif c == "$" and s.startswith("$(", i):
+            i = _read_balanced(s, i + 2) + 1
+        elif c == "`":
+            i = _find_backtick(s, i + 1) + 1
+        else:
+            i += 1
+    raise ParseError("unterminated double quote")
+
+
+def _read_brace(s: str, i: int, quoted: bool) -> int:
+    """s[i] 在 '${' 之后；返回匹配的 '}' 的下标（跳过引号、$(..)、`..` 与嵌套的 ${..}）。"""
+    depth = 1
+    n = len(s)
+    while i < n:
+        c = s[i]
+        if c == "\\":
+            i += 2
+        elif c == "'" and not quoted:
+            j = s.find("'", i + 1)
+            if j < 0:
+                raise ParseError("unterminated single quote")
+            i = j + 1
+        elif c == '"':
+            i = _skip_double(s, i + 1)
+        elif c == "`":
+            i = _find_backtick(s, i + 1) + 1
+        elif s.startswith("$(", i):
+            i = _read_balanced(s, i + 2) + 1
+        elif s.startswith("${", i):
+            depth += 1
+            i += 2
+        else:
+            if c == "}":
+                depth -= 1
+                if depth == 0:
+                    return i
+            i += 1
+    raise ParseError("unterminated '${'")
+
+
+def _find_backtick(s: str, i: int) -> int:
+    n = len(s)
+    while i < n:
+        if s[i] == "\\":
+            i += 2
+            continue
+        if s[i] == "`":
+            return i
+        i += 1
+    raise ParseError("unterminated backquote")
+
+
+class _Parser:
+    """把一段脚本拆成管道列表（每个管道是 SimpleCommand 列表）；命令替换体作为独立脚本收集到 nested。"""
+
+    def __init__(self, script: str):
+        self.s = script
+        self.i = 0
+        self.nested: List[str] = []
+        # 已读到 << / <<- 但正文尚未跳过的 here-document：(定界符, 是否去掉前导 tab, 定界符是否加了引号, 正文存放处)
+        self.heredocs: List[Tuple[str, bool, bool, List[str]]] = []
+
+    def _dollar(self, buf: List[str], quoted: bool) -> bool:
+        """处理 s[i] == '$'；返回 True 表示遇到未加引号的 $IFS（应作为分隔符）。"""
+        s, i = self.s, self.i
+        if s.startswith("$((", i):
+            end = _read_balanced(s, i + 3)
+            # 算术展开中的 $(..) / `..` 同样会执行
+            self._substitutions(s[i + 3:end])
+            buf.append(s[i:end + 2])
+            self.i = end + 2
+            return False
+        if s.startswith("$(", i):
+            end = _read_balanced(s, i + 2)
+            self.nested.append(s[i + 2:end])
+            buf.append("$(..)")
+            self.i = end + 1
+            return False
+        if s.startswith("${", i):
+            end = _read_brace(s, i + 2, quoted)
+            name = s[i + 2:end]
+            self.i = end + 1
+            if name == "IFS" and not quoted:
+                return True
+            # ${x:-$(..)} 等默认值 / 替换中的命令替换
+            self._substitutions(name)
+            buf.append(s[i:end + 1])
+            return False
+        if s.startswith("$'", i) and not quoted:
+            j = i + 2
+            while j < len(s) and s[j] != "'":
+                j += 2 if s[j] == "\\" else 1
+            if j >= len(s):
+                raise ParseError("unterminated $'")
+            buf.append(_ansi_c(s[i + 2:j]))
+            self.i = j + 1
+            return False
+        m = re.match(r"\$([A-Za-z_][A-Za-z0-9_]*|[0-9@*#?$!-])", s[i:])
+        if m:
+            self.i = i + len(m.group(0))
+            if m.group(1) == "IFS" and not quoted:
+                return True
+            buf.append(m.group(0))
+            return False
+        buf.append("$")
+        self.i = i + 1
+        return False
+
+    def _word(self) -> str:
+        """读取一个 word（s[i] 不是空白或操作符）；遇到未加引号的 $IFS 时提前结束。"""
+        s = self.s
+        n = len(s)
+        buf: List[str] = []
+        while self.i < n:
+            m = _PLAIN_RE.match(s, self.i)
+            if m:
+                buf.append(m.group(0))
+                self.i = m.end()
+                continue
+            c = s[self.i]
+            if c in " \t" or c in _OPERATOR_CHARS:
+                break
+            if c == "\\":
+                if self.i + 1 < n and s[self.i + 1] != "\n":
+                    buf.append(s[self.i + 1])
+                self.i += 2
+            elif c == "'":
+                j = s.find("'", self.i + 1)
+                if j < 0:
+                    raise ParseError("unterminated single quote")
+                buf.append(s[self.i + 1:j])
+                self.i = j + 1
+            elif c == '"':
+                self.i += 1
+                while True:
+                    if self.i >= n:
+                        raise ParseError("unterminated double quote")
+                    c = s[self.i]
+                    if c == '"':
+                        self.i += 1
+                        break
+                    if c == "\\" and self.i + 1 < n and s[self.i + 1] in '$`"\\\n':
+                        if s[self.i + 1] != "\n":
+                            buf.append(s[self.i + 1])
+                        self.i += 2
+                    elif c == "$":
+                        self._dollar(buf, quoted=True)
+                    elif c == "`":
+                        j = _find_backtick(s, self.i + 1)
+                        self.nested.append(s[self.i + 1:j])
+                        buf.append("$(..)")
+                        self.i = j + 1
+                    else:
+                        buf.append(c)
+                        self.i += 1
+            elif c == "$":
+                if self._dollar(buf, quoted=False):
+                    break
+            elif c == "`":
+                j = _find_backtick(s, self.i + 1)
+                self.nested.append(s[self.i + 1:j])
+                buf.append("$(..)")
+                self.i = j + 1
+            else:
+                buf.append(c)
+                self.i += 1
+        return "".join(buf)
+
+    def _substitutions(self, body: str) -> None:
+        """
+        按双引号规则扫描一段文本（未加引号定界符的 heredoc 正文、${..} / $((..)) 的内部）：
+        只把其中的 $(..) / `..` 收集到 nested，其余文本是数据。
+        """
+        if "$" not in body and "`" not in body:
+            return
+        sub = _Parser(body)
+        buf: List[str] = []
+        while True:
+            m = _HEREDOC_SPECIAL_RE.search(body, sub.i)
+            if m is None:
+                break
+            sub.i = m.start()
+            c = m.group(0)
+            if c == "\\":
+                sub.i += 2
+            elif c == "$":
+                sub._dollar(buf, quoted=True)
+            else:
+                j = _find_backtick(body, sub.i + 1)
+                sub.nested.append(body[sub.i + 1:j])
+                sub.i = j + 1
+        self.nested.extend(sub.nested)
+
+    def _skip_heredocs(self) -> None:
+        """s[i] 位于换行之后：依次跳过各 here-document 的正文与定界符行（缺少定界符时到脚本末尾为止）。"""
+        s = self.s
+        for delim, strip_tabs, quoted, into in self.heredocs:
+            start = self.i
+            while self.i < len(s):
+                j = s.find("\n", self.i)
+                end = len(s) if j < 0 else j
+                line = s[self.i:end]
+                self.i = end + 1 if j >= 0 else end
+                if (line.lstrip("\t") if strip_tabs else line) == delim:
+                    body = s[start:self.i - len(line) - (1 if j >= 0 else 0)]
+                    break
+            else:
+                body = s[start:]
+            if not quoted:
+                self._substitutions(body)
+            into.append("\n".join(ln.lstrip("\t") for ln in body.split("\n")) if strip_tabs else body)
+        self.heredocs = []
+
+    def parse(self) -> List[List[SimpleCommand]]:
+        s = self.s
+        n = len(s)
+        pipelines: List[List[SimpleCommand]] = []
+        pipeline: List[SimpleCommand] = []
+        words: List[str] = []
+        redirects: List[Tuple[str, str]] = []
+        stdin: List[str] = []
+
+        def end_command() -> None:
+            nonlocal words, redirects, stdin
+            if words or redirects:
+                pipeline.append(SimpleCommand(words, redirects, stdin))
+            words, redirects, stdin = [], [], []
+
+        def end_pipeline() -> None:
+            nonlocal pipeline
+            end_command()
+            if pipeline:
+                pipelines.append(pipeline)
+            pipeline = []
+
+        while self.i < n:
+            c = s[self.i]
+            if c in " \t":
+                self.i = _BLANK_RE.match(s, self.i).end()
+            elif c == "\\" and s.startswith("\\\n", self.i):
+                self.i += 2
+            elif c == "#" and (self.i == 0 or s[self.i - 1] in " \t\n;&|()"):
+                j = s.find("\n", self.i)
+                self.i = n if j < 0 else j
+            elif c in "<>" and s.startswith("(", self.i + 1):
+                # 进程替换 <(..) / >(..)
+                end = _read_balanced(s, self.i + 2)
+                self.nested.append(s[self.i + 2:end])
+                words.append("/dev/fd/63")
+                self.i = end + 1
+            elif c in "<>" or (c == "&" and s.startswith("&>", self.i)):
+                m = re.match(r"&>>|&>|<<<|<<-|<<|<>|>>|>&|<&|>\||>|<", s[self.i:])
+                op = m.group(0)
+                if words and words[-1].isdigit() and s[self.i - 1] not in " \t":
+                    op = words.pop() + op
+                self.i += len(m.group(0))
+                while self.i < n and s[self.i] in " \t":
+                    self.i += 1
+                start = self.i
+                target = self._word() if self.i < n and s[self.i] not in _OPERATOR_CHARS else ""
+                redirects.append((op, target))
+                if m.group(0) in ("<<", "<<-"):
+                    quoted = any(ch in s[start:self.i] for ch in "'\"\\")
+                    self.heredocs.append((target, m.group(0) == "<<-", quoted, stdin))
+                elif m.group(0) == "<<<":
+                    stdin.append(target)
+            elif c == "|":
+                if s.startswith("||", self.i):
+                    end_pipeline()
+                    self.i += 2
+                else:
+                    end_command()
+                    self.i += 2 if s.startswith("|&", self.i) else 1
+            elif c in "&;\n()":
+                end_pipeline()
+                self.i += 2 if s.startswith(("&&", ";;"), self.i) else 1
+                if c == "\n" and self.heredocs:
+                    self._skip_heredocs()
+            else:
+                start = self.i
+                word = self._word()
+                if self.i == start:
+                    self.i += 1
+                    continue
+                if word or s[start] in "'\"":
+                    words.append(word)
+        end_pipeline()
+        return pipelines
+
+
+# ---------------------------------------------------------------------------
+# 规范化
+# ---------------------------------------------------------------------------
+
+
+def _basename(word: str) -> str:
+    return word.rstrip("/").rsplit("/", 1)[-1] if "/" in word.rstrip("/") else word
+
+
+def _skip_wrapper(name: str, words: List[str]) -> List[str]:
+    with_value, positional = _WRAPPERS[name]
+    i = 0
+    while i < len(words):
+        w = words[i]
+        if w == "--":
+            i += 1
+            break
+        if name == "env" and _ASSIGN_RE.match(w):
+            i += 1
+            continue
+        if not w.startswith("-") or w == "-":
+            break
+        i += 2 if w in with_value else 1
+    return words[i + positional:]
+
+
+def _shell_script(program: str, args: List[str]) -> Optional[str]:
+    """bash -c 'script' / su -c 'script' / eval .. / watch .. 中要执行的脚本文本。"""
+    if program in _SHELLS or program == "su":
+        for i, a in enumerate(args):
+            if a == "--command" or (a.startswith("-") and not a.startswith("--") and a.endswith("c")):
+                return args[i + 1] if i + 1 < len(args) else ""
+            if program in _SHELLS and not a.startswith("-") and a not in ("+o", "+x", "+e"):
+                return None
+        return None
+    if program == "eval":
+        return " ".join(args)
+    if program == "watch":
+        i = 0
+        while i < len(args) and args[i].startswith("-"):
+            i += 2 if args[i] in ("-n", "--interval") else 1
+        return " ".join(args[i:]) or None
+    return None
+
+
+def _normalize(cmd: SimpleCommand) -> Optional[str]:
+    """填充 program / args / text；返回需要递归解析的脚本（bash -c 等）或 None。"""
+    words = cmd.words
+    while words:
+        w = words[0]
+        base = _basename(w).lower()
+        if _ASSIGN_RE.match(w) or base in _RESERVED:
+            words = words[1:]
+        elif base == "function":
+            words = words[2:]
+        elif base == "coproc":
+            # coproc NAME { ..; } / coproc cmd args
+            words = words[2:] if len(words) > 2 and words[2] == "{" else words[1:]
+        elif base in _WRAPPERS:
+            words = _skip_wrapper(base, words[1:])
+        else:
+            break
+    cmd.program = _basename(words[0]).lower() if words else ""
+    cmd.args = words[1:]
+    parts = [cmd.program] + cmd.args + [f"{op} {target}" for op, target in cmd.redirects]
+    cmd.text = " ".join(p for p in parts if p)
+    return _shell_script(cmd.program, cmd.args) if cmd.program else None
+
+
+def parse_command(command: str) -> List[List[SimpleCommand]]:
+    """整条命令 -> 管道列表（含命令替换与 bash -c 等嵌套脚本中的管道）；无法解析时抛 ParseError。"""
+    out: List[List[SimpleCommand]] = []
+    pending = [(command, 0)]
+    while pending:
+        script, depth = pending.pop()
+        if depth > _MAX_DEPTH:
+            raise ParseError("nesting too deep")
+        parser = _Parser(script)
+        pipelines = parser.parse()
+        pending.extend((body, depth + 1) for body in parser.nested)
+        for pipeline in pipelines:
+            for cmd in pipeline:
+                inner = _normalize(cmd)
+                if inner:
+                    pending.append((inner, depth + 1))
+            # shell 从标准输入读脚本时（bash <<EOF、bash <<<'..'、cat <<EOF | sh），送入的文本也是脚本
+            last_reader = max((k for k, cmd in enumerate(pipeline) if _reads_stdin_shell(cmd)), default=-1)
+            for cmd in pipeline[:last_reader + 1]:
+                pending.extend((body, depth + 1) for body in cmd.stdin)
+            out.append(pipeline)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# 策略
+# ---------------------------------------------------------------------------
+
+
+def _reads_stdin_script(cmd: SimpleCommand) -> bool:
+    """解释器是否从标准输入读取脚本（没有脚本文件 / -c / -m 参数）。"""
+    if cmd.program not in _INTERPRETERS:
+        return False
+    for a in cmd.args:
+        if a == "-":
+            return True
+        if a in ("-c", "-m", "-e", "-E", "--command") or (cmd.program in _SHELLS and a.startswith("-") and
+                                                         not a.startswith("--") and a.endswith("c")):
+            return False
+        if not a.startswith("-") and not a.startswith("+"):
+            return False
+    return True
+
+
+def _reads_stdin_shell(cmd: SimpleCommand) -> bool:
+    return cmd.program in _SHELLS and _reads_stdin_script(cmd)
+
+
+def _runs_stdin(cmd: SimpleCommand) -> bool:
+    """管道中该命令是否把标准输入当作脚本或命令行执行（解释器读 stdin、source /dev/stdin、xargs）。"""
+    if _reads_stdin_script(cmd):
+        return True
+    if (cmd.program in _INTERPRETERS or cmd.program in _SOURCE_COMMANDS) and any(a in _STDIN_PATHS for a in cmd.args):
+        return True
+    return any(_basename(w).lower() == "xargs" for w in cmd.words[:len(cmd.words) - len(cmd.args)])
+
+
+def _is_data(cmd: SimpleCommand) -> bool:
+    if cmd.program == "git":
+        return bool(cmd.args) and cmd.args[0] in _DATA_GIT_SUBCOMMANDS
+    return cmd.program in _DATA_PROGRAMS
+
+
+def _rm_critical(cmd: SimpleCommand) -> Optional[str]:
+    if cmd.program != "rm":
+        return None
+    recursive = False
+    targets = []
+    end_of_options = False
+    for a in cmd.args:
+        if not end_of_options and a == "--":
+            end_of_options = True
+        elif not end_of_options and a.startswith("--"):
+            recursive = recursive or a == "--recursive"
+        elif not end_of_options and a.startswith("-") and len(a) > 1:
+            recursive = recursive or "r" in a or "R" in a
+        else:
+            targets.append(a)
+    if not recursive:
+        return None
+    for t in targets:
+        norm = re.sub(r"/+", "/", t)
+        if norm in _CRITICAL_PATHS or norm.rstrip("/") in _CRITICAL_PATHS or norm.startswith("/*"):
+            return t
+    return None
+
+
+def _combine(patterns: List[re.Pattern]) -> Optional[re.Pattern]:
+    """多条正则合并成一个，未命中时一次 search 即可；命中后再逐条找出具体规则。"""
+    if not patterns:
+        return None
+    try:
+        return re.compile("|".join(f"(?:{p.pattern})" for p in patterns), re.IGNORECASE)
+    except re.error:
+        return None
+
+
+def _first_match(combined: Optional[re.Pattern], patterns: List[re.Pattern], text: str) -> Optional[str]:
+    if not patterns or (combined is not None and not combined.search(text)):
+        return None
+    for pat in patterns:
+        if pat.search(text):
+            return pat.pattern
+    return None
+
+
+class Policy:
+    def __init__(self, patterns: List[str], blocked_commands: List[str]):
+        self.blocked_commands = {c.lower() for c in blocked_commands}
+        self.global_patterns: List[re.Pattern] = []
+        self.indexed_patterns: List[re.Pattern] = []
+        self.indexed: Dict[str, List[re.Pattern]] = {}
+        for pat in patterns:
+            compiled = re.compile(pat, re.IGNORECASE)
+            m = _INDEX_KEY_RE.match(pat)
+            # 含管道的正则描述的是多条命令之间的关系，只能对原始命令匹配
+            if m and r"\|" not in pat:
+                self.indexed.setdefault(m.group(1).lower(), []).append(compiled)
+                self.indexed_patterns.append(compiled)
+            else:
+                self.global_patterns.append(compiled)
+        self.global_any = _combine(self.global_patterns)
+        self.indexed_any = _combine(self.indexed_patterns)
+        self.rule_count = len(patterns) + len(self.blocked_commands)
+
+    def _global_match(self, text: str) -> Optional[str]:
+        return _first_match(self.global_any, self.global_patterns, text)
+
+    def _check_command(self, sc: SimpleCommand, scoped: bool) -> Optional[str]:
+        """
+        scoped：参数只是数据（grep / echo ..）或是另行递归检查的脚本（bash -c / eval ..）时，只用以该程序名开头的规则；
+        其余命令的参数可能被执行（ssh host reboot、find -exec、python -c ..），规范文本对全部规则匹配。
+        """
+        program = sc.program
+        base = program.split(".", 1)[0]
+        if program in self.blocked_commands or base in self.blocked_commands:
+            return f"命令 {program} 已被禁止（BASH_BLOCKED_COMMANDS），拒绝执行"
+        if scoped:
+            own = self.indexed.get(program) or self.indexed.get(base) or ()
+            hit = next((pat.pattern for pat in own if pat.search(sc.text)), None)
+        else:
+            hit = _first_match(self.indexed_any, self.indexed_patterns, sc.text)
+        hit = hit or self._global_match(sc.text)
+        if hit:
+            return f"命令包含不允许的模式（{hit}），拒绝执行"
+        target = _rm_critical(sc)
+        if target is not None:
+            return f"rm 递归删除系统路径 {target}，拒绝执行"
+        return None
+
+    def check(self, command: str) -> Tuple[bool, str]:
+        cmd = (command or "").strip()
+        if not cmd:
+            return False, "命令为空"
+        hit = self._global_match(cmd)
+        if hit:
+            return False, f"命令包含不允许的模式（{hit}），拒绝执行"
+        # 下限：与旧实现一样对原始命令匹配全部规则；命中的规则只有确认出现在数据位置（grep / echo 的参数、
+        # 交给非解释器的 heredoc 正文）时才放行
+        raw_hits = []
+        if self.indexed_any is None or self.indexed_any.search(cmd):
+            raw_hits = [pat for pat in self.indexed_patterns if pat.search(cmd)]
+        try:
+            pipelines = parse_command(cmd)
+        except ParseError as e:
+            return False, f"命令无法解析（{e}），拒绝执行"
+        explained = set()
+        opaque = False
+        for pipeline in pipelines:
+            # 该位置之前的命令输出会被当作脚本 / 命令行执行（cat <<EOF | bash、echo .. | xargs）
+            executor = max((k for k, sc in enumerate(pipeline) if _runs_stdin(sc)), default=-1)
+            downloader = None
+            for k, sc in enumerate(pipeline):
+                program = sc.program
+                if not program:
+                    continue
+                data = k >= executor and _is_data(sc)
+                reason = self._check_command(sc, data or _shell_script(program, sc.args) is not None)
+                if reason:
+                    return False, reason
+                if downloader and _reads_stdin_script(sc):
+                    return False, f"{downloader} 下载的内容经管道交给 {program} 执行，拒绝执行"
+                if program in _DOWNLOADERS:
+                    downloader = program
+                if (program in _SHELLS or program in _SOURCE_COMMANDS) and sc.args and \
+                        sc.args[0].startswith("/dev/fd/") and _DOWNLOADER_RE.search(cmd):
+                    return False, f"{program} 执行进程替换中下载的内容，拒绝执行"
+                if raw_hits:
+                    # 程序名来自变量 / 命令替换时无法确认命中位置只是数据
+                    opaque = opaque or "$" in program
+                    texts = [sc.text] if data else []
+                    if k > executor and program not in _INTERPRETERS:
+                        texts.extend(sc.stdin)
+                    explained.update(pat.pattern for pat in raw_hits if any(pat.search(t) for t in texts))
+        for pat in raw_hits:
+            if opaque or pat.pattern not in explained:
+                return False, f"命令包含不允许的模式（{pat.pattern}），拒绝执行"
+        return True, ""
+
+
+def _config() -> Tuple[str, str]:
+    return os.environ.get("BASH_BLOCKED_PATTERNS", "").strip(), os.environ.get("BASH_BLOCKED_COMMANDS", "").strip()
+
+
+def build_policy(raw_patterns: str, raw_commands: str) -> Policy:
+    """
+    - 默认使用内置 DEFAULT_UNSAFE_PATTERNS。
+    - BASH_BLOCKED_COMMANDS（逗号分隔命令名）额外禁止这些命令（任意位置的简单命令，含 sudo 等包装与嵌套）。
+    - 高级：BASH_BLOCKED_PATTERNS 为 JSON 字符串数组时完全替换内置列表（一般不推荐），格式不对时忽略。
+    """
+    patterns = DEFAULT_UNSAFE_PATTERNS
+    if raw_patterns:
+        try:
+            arr = json.loads(raw_patterns)
+            if isinstance(arr, list) and all(isinstance(x, str) for x in arr):
+                patterns = arr
+        except (json.JSONDecodeError, TypeError):
+            pass
+    commands = [c.strip() for c in raw_commands.split(",") if c.strip()]
+    return Policy(patterns, commands)
+
+
+_policy_lock = threading.Lock()
+_policy: Optional[Tuple[Tuple[str, str], Policy]] = None
+
+
+def get_policy() -> Policy:
+    """当前配置对应的策略；只有环境变量变化时才重新编译。"""
+    global _policy
+    config = _config()
+    current = _policy
+    if current is not None and current[0] == config:
+        return current[1]
+    with _policy_lock:
+        if _policy is None or _policy[0] != config:
+            _policy = (config, build_policy(*config))
+        return _policy[1]
@@ -0,0 +1,389 @@
+"""
+run_bash_command 的常驻 bash worker 池：避免每条命令都 fork/exec 一个新 bash 并完成 shell 启动。
+
+每个 worker 是一个 `bash --noprofile --norc -s` 进程（独立 session，开启 job control），环境变量与工作目录
+在启动时取自 server 进程。每条命令在 worker 的子 shell 中执行（stdin 为 /dev/null、独立进程组），
+因此 cd / export / 变量 / 函数 / ulimit 等修改不会带到下一条命令；命令结束后杀掉其进程组中残留的后台进程。
+与单独 `bash -c` 的差异：$$ 是 worker 的 PID（命令自身的 PID 用 $BASHPID）。worker 为 TERM/INT/HUP 等可捕获信号
+设置了空 trap（子 shell 中恢复默认处理），`kill $$` 不会杀掉 worker；`kill -9 $$` 会杀掉 worker，此时按 bash -c
+被 SIGKILL 的情况返回退出码 -9，并杀掉该命令的进程组、回收 worker。命令的子 shell 被其他信号 N 杀死时，
+退出码为 bash 的 128+N（subprocess.run 为 -N）。
+命令文本用 $'..' 引用后整行写入，输出以每条命令随机生成的标记分帧：子 shell 在执行命令前先在 stderr 报告进程组号，
+结束时 stdout 写 "<标记> <退出码>"、stderr 写 "<标记>"。
+
+超时或调用方取消（cancel 事件）：杀掉该命令的进程组，worker 收尾后继续复用；标记在宽限期内未出现、worker 退出、命令之间出现
+不属于任何命令的输出，都视为 worker 异常，直接回收。执行 BASH_WORKER_MAX_COMMANDS 条命令后也会回收，
+空位由后台线程补齐。
+传入 on_output 时，输出在读取过程中按块回调（供 MCP 进度通知流式推送），最终结果仍完整返回。
+
+配置：BASH_WORKER_POOL_SIZE（常驻 worker 数，默认 2；0 表示不使用池，每条命令单独 subprocess.run）、
+BASH_WORKER_MAX_COMMANDS（单个 worker 最多执行的命令数，默认 200）。
+"""
+import os
+import re
+import selectors
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from .mcp_logger import get_logger
+
+_logger = get_logger("bash_pool")
+
+_BASH = "/bin/bash"
+_KILL_GRACE = 5
+_READ_SIZE = 65536
+_CANCEL_POLL = 0.2
+# worker 自身捕获（空处理）的信号：命令中 kill $$ 不会让 worker 退出；子 shell 中这些 trap 恢复为默认处理
+_TRAPPED_SIGNALS = "TERM INT HUP QUIT USR1 USR2 ALRM"
+
+OutputCallback = Callable[[str, bytes], None]
+
+
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _ansi_c_quote(text: str) -> str:
+    """把任意文本转成单行的 bash $'..' 字面量（换行、引号、控制字符都转义）。"""
+    out = ["$'"]
+    for ch in text:
+        if ch == "\\":
+            out.append("\\\\")
+        elif ch == "'":
+            out.append("\\'")
+        elif ch == "\n":
+            out.append("\\n")
+        elif ch == "\t":
+            out.append("\\t")
+        elif ch == "\x00":
+            continue
+        elif ord(ch) < 0x20 or ch == "\x7f":
+            out.append("\\x%02x" % ord(ch))
+        else:
+            out.append(ch)
+    out.append("'")
+    return "".join(out)
+
+
+def _partial_marker(buf: bytearray, mark: bytes) -> int:
+    """buf 末尾可能是尚未读完整的分帧标记的字节数（推送输出时先保留这部分）。"""
+    tail = bytes(buf[-(len(mark) + 16):])
+    for i in range(len(tail)):
+        rest = tail[i:]
+        if rest[:len(mark)] == mark[:len(rest)]:
+            return len(rest)
+    return 0
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+class CommandCancelled(Exception):
+    pass
+
+
+class _Worker:
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [_BASH, "--noprofile", "--norc", "-s"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            env=os.environ.copy(), start_new_session=True,
+        )
+        self.commands = 0
+        self.broken = False
+        self._send(f"set -m; trap : {_TRAPPED_SIGNALS}\n")
+
+    def _send(self, line: str) -> None:
+        try:
+            self.proc.stdin.write(line.encode("utf-8", errors="replace"))
+            self.proc.stdin.flush()
+        except OSError as e:
+            self.broken = True
+            raise WorkerError(f"bash worker 写入失败: {e}") from e
+
+    def healthy(self) -> bool:
+        """worker 仍在运行，且管道里没有不属于任何命令的残留输出。"""
+        if self.broken or self.proc.poll() is not None:
+            return False
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.proc.stdout, selectors.EVENT_READ)
+            sel.register(self.proc.stderr, selectors.EVENT_READ)
+            if sel.select(0):
+                self.broken = True
+                return False
+        return True
+
+    def run(self, command: str, timeout: float, on_output: Optional[OutputCallback] = None,
+            cancel: Optional[threading.Event] = None) -> subprocess.CompletedProcess:
+        """
+        执行一条命令；超时抛 subprocess.TimeoutExpired，cancel 被置位时抛 CommandCancelled，
+        worker 异常抛 WorkerError（调用方应回收 worker）。
+        on_output(stream, data) 在读取线程中按到达顺序收到 "stdout" / "stderr" 的原始字节（已去掉分帧标记）。
+        """
+        marker = "__holmes_" + uuid.uuid4().hex
+        self.commands += 1
+        # 进程组号由子 shell 在执行命令之前自己报告（$BASHPID 即 job control 下的进程组号），命令即使立刻
+        # kill -9 $$ 也已写出；eval 的参数在执行前已展开，命令开始运行时 __holmes_cmd 已被 unset，命令看不到自身文本；
+        # 被捕获的信号会打断 wait，因此等到子 shell 确实结束（kill -0 失败）为止；
+        # wait 的 stderr 丢弃，以免子 shell 被信号杀死时 job control 的 "Terminated" 通知混入命令输出
+        self._send(
+            f"__holmes_cmd={_ansi_c_quote(command)}; "
+            f"( printf '%s %d\\n' {marker} \"$BASHPID\" >&2; unset __holmes_pid __holmes_rc; "
+            f"eval \"unset __holmes_cmd; $__holmes_cmd\" ) </dev/null & "
+            f"__holmes_pid=$!; unset __holmes_cmd; "
+            f"while :; do wait \"$__holmes_pid\" 2>/dev/null; __holmes_rc=$?; "
+            f"kill -0 \"$__holmes_pid\" 2>/dev/null || break; done; "
+            f"kill -KILL -- \"-$__holmes_pid\" 2>/dev/null; "
+            f"printf '%s %d\\n' {marker} \"$__holmes_rc\"; printf '%s\\n' {marker} >&2\n"
+        )
+        mark = marker.encode()
+        start_re = re.compile(re.escape(mark) + rb" (\d+)\n")
+        end_out_re = re.compile(re.escape(mark) + rb" (-?\d+)\n$")
+        end_err = mark + b"\n"
+        hold = len(mark) + 16
+        out, err = bytearray(), bytearray()
+        sent_out = sent_err = 0
+        pgid: Optional[int] = None
+        returncode: Optional[int] = None
+        err_done = False
+        killed = ""
+        deadline = time.monotonic() + timeout
+
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.proc.stdout, selectors.EVENT_READ, out)
+            sel.register(self.proc.stderr, selectors.EVENT_READ, err)
+            while returncode is None or not err_done:
+                remaining = deadline - time.monotonic()
+                if not killed and cancel is not None and cancel.is_set():
+                    remaining = 0
+                if remaining <= 0:
+                    if killed or pgid is None:
+                        self.broken = True
+                        raise WorkerError("bash worker 未在宽限期内结束命令")
+                    killed = "cancelled" if cancel is not None and cancel.is_set() else "timeout"
+                    try:
+                        os.killpg(pgid, signal.SIGKILL)
+                    except OSError:
+                        pass
+                    deadline = time.monotonic() + _KILL_GRACE
+                    continue
+                if cancel is not None and not killed:
+                    remaining = min(remaining, _CANCEL_POLL)
+                for key, _ in sel.select(remaining):
+                    chunk = os.read(key.fileobj.fileno(), _READ_SIZE)
+                    if not chunk:
+                        self.broken = True
+                        killed_by = self._killed_by_signal()
+                        # 另一个管道中可能还有未读的进程组标记（同一次 select 中先处理了这个 EOF）
+                        self._drain(sel, key.fileobj)
+                        m = start_re.search(err) if pgid is None else None
+                        if m:
+                            pgid = int(m.group(1))
+                            del err[m.start():m.end()]
+                        if killed_by is None or pgid is None or killed:
+                            raise WorkerError("bash worker 意外退出")
+                        # 命令杀掉了 worker（如 kill -9 $$）：与 bash -c 被信号杀死时一致，返回负的信号编号
+                        try:
+                            os.killpg(pgid, signal.SIGKILL)
+                        except OSError:
+                            pass
+                        if on_output is not None and len(out) > sent_out:
+                            on_output("stdout", bytes(out[sent_out:]))
+                        if on_output is not None and len(err) > sent_err:
+                            on_output("stderr", bytes(err[sent_err:]))
+                        return subprocess.CompletedProcess(
+                            command, killed_by, out.decode("utf-8", errors="replace"),
+                            err.decode("utf-8", errors="replace"),
+                        )
+                    key.data.extend(chunk)
+                if pgid is None:
+                    m = start_re.search(err)
+                    if m:
+                        pgid = int(m.group(1))
+                        del err[m.start():m.end()]
+                if returncode is None:
+                    m = end_out_re.search(out[-hold:])
+                    if m:
+                        returncode = int(m.group(1))
+                        del out[len(out) - len(m.group(0)):]
+                if pgid is not None and not err_done and err.endswith(end_err):
+                    err_done = True
+                    del err[len(err) - len(end_err):]
+                if on_output is not None and not killed:
+                    end = len(out) if returncode is not None else len(out) - _partial_marker(out, mark)
+                    if end > sent_out:
+                        on_output("stdout", bytes(out[sent_out:end]))
+                        sent_out = end
+                    end = len(err) if err_done else (len(err) - _partial_marker(err, mark) if pgid is not None else 0)
+                    if end > sent_err:
+                        on_output("stderr", bytes(err[sent_err:end]))
+                        sent_err = end
+
+        if killed == "cancelled":
+            raise CommandCancelled(command)
+        if killed:
+            raise subprocess.TimeoutExpired(command, timeout)
+        return subprocess.CompletedProcess(
+            command, returncode, out.decode("utf-8", errors="replace"), err.decode("utf-8", errors="replace"),
+        )
+
+    @staticmethod
+    def _drain(sel: selectors.BaseSelector, closed) -> None:
+        """worker 已退出：读完管道中剩余的输出（不等待仍持有管道的残留进程）。"""
+        sel.unregister(closed)
+        while sel.get_map():
+            ready = sel.select(0.05)
+            if not ready:
+                return
+            for key, _ in ready:
+                chunk = os.read(key.fileobj.fileno(), _READ_SIZE)
+                if chunk:
+                    key.data.extend(chunk)
+                else:
+                    sel.unregister(key.fileobj)
+
+    def _killed_by_signal(self) -> Optional[int]:
+        """worker 已被信号杀死时返回负的信号编号（与 subprocess 的 returncode 一致），否则 None。"""
+        try:
+            code = self.proc.wait(timeout=_KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            return None
+        return code if code < 0 else None
+
+    def close(self) -> None:
+        self.broken = True
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.proc.stdin, self.proc.stdout, self.proc.stderr):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class WorkerPool:
+    def __init__(self, size: int, max_commands: int):
+        self.size = size
+        self.max_commands = max(1, max_commands)
+        self._lock = threading.Lock()
+        self._idle: List[_Worker] = []
+        self._refilling = False
+
+    def warm(self) -> None:
+        """把空闲 worker 补齐到 size 个。"""
+        try:
+            while True:
+                with self._lock:
+                    if len(self._idle) >= self.size:
+                        return
+                worker = _Worker()
+                with self._lock:
+                    if len(self._idle) < self.size:
+                        self._idle.append(worker)
+                        continue
+                worker.close()
+                return
+        except OSError as e:
+            _logger.warning(f"启动 bash worker 失败: {e}")
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def _refill(self) -> None:
+        with self._lock:
+            if self._refilling:
+                return
+            self._refilling = True
+        threading.Thread(target=self.warm, name="bash-pool-refill", daemon=True).start()
+
+    def _acquire(self) -> _Worker:
+        while True:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is None:
+                # 所有 worker 都在忙（或池刚清空）：临时启动一个，归还时按容量决定去留
+                return _Worker()
+            if worker.healthy():
+                return worker
+            worker.close()
+            self._refill()
+
+    def _release(self, worker: _Worker) -> None:
+        if not worker.broken and worker.commands < self.max_commands:
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(worker)
+                    return
+        worker.close()
+        self._refill()
+
+    def run(self, command: str, timeout: float, on_output: Optional[OutputCallback] = None,
+            cancel: Optional[threading.Event] = None) -> subprocess.CompletedProcess:
+        """与 subprocess.run(shell=True, capture_output=True, text=True, timeout=...) 返回/异常一致。"""
+        try:
+            worker = self._acquire()
+        except OSError as e:
+            _logger.warning(f"启动 bash worker 失败，改为单独执行: {e}")
+            return _run_once(command, timeout)
+        try:
+            return worker.run(command, timeout, on_output, cancel)
+        except WorkerError as e:
+            _logger.warning(f"bash worker 异常，已回收: {e}")
+            raise
+        finally:
+            self._release(worker)
+
+
+def _run_once(command: str, timeout: float) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        command, shell=True, executable=_BASH, capture_output=True, text=True, timeout=timeout,
+        stdin=subprocess.DEVNULL,
+    )
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[WorkerPool]:
+    """按 BASH_WORKER_POOL_SIZE 创建的进程级单例；为 0 或没有 /bin/bash 时返回 None。"""
+    global _pool
+    if _pool is None:
+        size = _get_int_env("BASH_WORKER_POOL_SIZE", 2)
+        if size <= 0 or not os.access(_BASH, os.X_OK):
+            return None
+        with _pool_lock:
+            if _pool is None:
+                _pool = WorkerPool(size, _get_int_env("BASH_WORKER_MAX_COMMANDS", 200))
+    return _pool
+
+
+def run_command(command: str, timeout: float, on_output: Optional[OutputCallback] = None,
+                cancel: Optional[threading.Event] = None) -> subprocess.CompletedProcess:
+    """
+    优先交给 worker 池执行。未启用池时：需要流式输出或取消的命令用一次性 worker 执行，其余单独 subprocess.run。
+    """
+    pool = get_pool()
+    if pool is not None:
+        return pool.run(command, timeout, on_output, cancel)
+    if on_output is None and cancel is None:
+        return _run_once(command, timeout)
+    worker = _Worker()
+    try:
+        return worker.run(command, timeout, on_output, cancel)
+    finally:
+        worker.close()
@@ -1,6 +1,7 @@
 """
 通用「命令/脚本」执行层：根据工具名与参数渲染 Jinja2 模板后执行 shell，返回标准输出。
 用于 kubernetes_core、helm 等声明式工具。来源：Holmes mcp/tools/_command_runner。
+run_command 对渲染后完全相同的并发命令做 single-flight 合并（见 _singleflight）。
 """
 import os
 import subprocess
@@ -13,9 +14,11 @@ try:
 except ImportError:
     Template = None
 
+from . import _singleflight
 from .mcp_logger import get_logger, log_command
 
 logger = get_logger("command")
+_inflight = _singleflight.group("command")
 
 
 def _render(template_str: str, params: Dict[str, Any]) -> str:
@@ -34,13 +37,17 @@ def run_command(
     arguments: dict,
     timeout: int = 120,
 ) -> str:
-    """渲染单条 command 并执行，返回 stdout+stderr。"""
+    """渲染单条 command 并执行，返回 stdout+stderr；完全相同的并发命令共享一次执行。"""
     try:
         cmd = _render(command_tpl, arguments)
     except Exception as e:
         logger.error(f"[run_command] 模板渲染失败: tpl={command_tpl!r}, args={arguments}, error={e}")
         return f"Template error: {e}"
     cmd = os.path.expandvars(cmd)
+    return _inflight.do((cmd, timeout), lambda: _execute_command(cmd, timeout))
+
+
+def _execute_command(cmd: str, timeout: int) -> str:
     logger.info(f"[run_command] 执行命令: {cmd}")
     t0 = time.monotonic()
     try:
@@ -0,0 +1,142 @@
+"""
+Server-side store for converted documents returned by fetch_webpage.
+
+Large documents are kept under a short handle so callers can read them incrementally
+(by offset or by heading) or ask for a table of contents first, without refetching or reconverting.
+Handles live in an in-memory LRU (INTERNET_DOCUMENT_HANDLES, default 32); evicted handles are
+reloaded from the on-disk fetch cache when possible.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+
+def make_handle(cache_key: str) -> str:
+    # 与 _fetch_cache 的文件名使用同一摘要，淘汰后仍可从磁盘缓存恢复
+    return hashlib.sha256(cache_key.encode("utf-8")).hexdigest()[:16]
+
+
+def build_toc(text: str) -> List[Dict[str, Any]]:
+    """Markdown ATX headings (outside code fences) with their char offsets and section lengths."""
+    toc: List[Dict[str, Any]] = []
+    offset = 0
+    in_fence = False
+    for line in text.splitlines(keepends=True):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            m = _HEADING_RE.match(line.rstrip("\n"))
+            if m:
+                toc.append({"level": len(m.group(1)), "title": m.group(2).strip(), "offset": offset})
+        offset += len(line)
+    for i, entry in enumerate(toc):
+        end = len(text)
+        for nxt in toc[i + 1:]:
+            if nxt["level"] <= entry["level"]:
+                end = nxt["offset"]
+                break
+        entry["end"] = end
+    return toc
+
+
+def find_section(toc: List[Dict[str, Any]], name: str) -> Optional[Dict[str, Any]]:
+    """Exact (case-insensitive) heading match first, then substring."""
+    q = name.strip().lower()
+    for entry in toc:
+        if entry["title"].lower() == q:
+            return entry
+    for entry in toc:
+        if q in entry["title"].lower():
+            return entry
+    return None
+
+
+def _cut(text: str, start: int, end: int, max_chars: int) -> int:
+    """Chunk end: prefer just before a heading in the second half of the window, then the last blank line."""
+    limit = min(end, start + max_chars)
+    if limit >= end:
+        return end
+    brk = text.rfind("\n#", start + max_chars // 2, limit)
+    if brk != -1:
+        return brk + 1
+    brk = text.rfind("\n\n", start + int(max_chars * 0.8), limit)
+    return brk + 2 if brk != -1 else limit
+
+
+class DocumentStore:
+    def __init__(self, capacity: Callable[[], int], loader: Callable[[str], Optional[Tuple[str, str]]]):
+        self._capacity = capacity
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._docs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def put(self, cache_key: str, source: str, text: str) -> str:
+        handle = make_handle(cache_key)
+        with self._lock:
+            self._docs[handle] = {"source": source, "text": text, "toc": None}
+            self._docs.move_to_end(handle)
+            while len(self._docs) > max(1, self._capacity()):
+                self._docs.popitem(last=False)
+        return handle
+
+    def get(self, handle: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            doc = self._docs.get(handle)
+            if doc is not None:
+                self._docs.move_to_end(handle)
+                return doc
+        loaded = self._loader(handle)
+        if loaded is None:
+            return None
+        source, text = loaded
+        with self._lock:
+            doc = {"source": source, "text": text, "toc": None}
+            self._docs[handle] = doc
+            while len(self._docs) > max(1, self._capacity()):
+                self._docs.popitem(last=False)
+        return doc
+
+    @staticmethod
+    def toc(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if doc["toc"] is None:
+            doc["toc"] = build_toc(doc["text"])
+        return doc["toc"]
+
+
+def render_toc(handle: str, doc: Dict[str, Any], toc: List[Dict[str, Any]]) -> str:
+    lines = [f"Table of contents for {doc['source']} (handle={handle}, {len(doc['text'])} chars):", ""]
+    if not toc:
+        lines.append("(no headings found; read by offset instead)")
+    for entry in toc:
+        indent = "  " * (entry["level"] - 1)
+        lines.append(f"{indent}- {entry['title']}  [offset={entry['offset']}, {entry['end'] - entry['offset']} chars]")
+    lines.append("")
+    lines.append(f'Read a part with read_fetched_document(handle="{handle}", section="<heading>") or offset=<n>.')
+    return "\n".join(lines)
+
+
+def render_page(
+    handle: str, doc: Dict[str, Any], offset: int, max_chars: int, section: Optional[Dict[str, Any]] = None
+) -> str:
+    """One chunk of the document (or of a section) plus a footer describing how to continue."""
+    text = doc["text"]
+    start, end = (section["offset"], section["end"]) if section else (0, len(text))
+    start = min(max(start, offset), end)
+    stop = _cut(text, start, end, max_chars)
+    chunk = text[start:stop]
+    scope = f"section '{section['title']}' " if section else ""
+    footer = f"[document handle={handle}: {scope}chars {start}-{stop} of {len(text)}"
+    if stop < end:
+        footer += f'; next: read_fetched_document(handle="{handle}", offset={stop}'
+        if section:
+            footer += f', section="{section["title"]}"'
+        footer += ")"
+    else:
+        footer += "; end" + (" of section" if section else "")
+    footer += '; toc=true lists headings]'
+    return f"{chunk.rstrip()}\n\n---\n{footer}"
@@ -0,0 +1,147 @@
+"""
+On-disk HTTP cache for fetch_webpage.
+Each URL is stored as <sha256>.json (validators + metadata) and <sha256>.md (converted content),
+so a cached page can be revalidated with ETag / Last-Modified and served without re-conversion.
+Config: INTERNET_CACHE_DIR (default: <tmp>/holmes-mcp-fetch-cache, empty string disables),
+INTERNET_CACHE_MAX_ENTRIES (default 500, oldest entries are pruned).
+A cache directory that cannot be created or read only disables caching; fetches still run.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def _cache_dir() -> Optional[str]:
+    raw = os.environ.get("INTERNET_CACHE_DIR")
+    if raw is None:
+        raw = os.path.join(tempfile.gettempdir(), "holmes-mcp-fetch-cache")
+    raw = raw.strip()
+    if not raw:
+        return None
+    try:
+        os.makedirs(raw, exist_ok=True)
+    except OSError:
+        # 目录不可创建（只读文件系统、权限）：本次按未启用缓存处理，抓取照常进行
+        return None
+    return raw
+
+
+def _max_entries() -> int:
+    try:
+        return int(os.environ.get("INTERNET_CACHE_MAX_ENTRIES", "500"))
+    except ValueError:
+        return 500
+
+
+def _paths(base: str, url: str) -> tuple:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(base, key + ".json"), os.path.join(base, key + ".md")
+
+
+def _atomic_write(path: str, data: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def parse_max_age(headers: Any) -> Optional[int]:
+    """Returns max-age from Cache-Control; 0 for no-cache; None for no-store (do not cache)."""
+    cc = (headers.get("cache-control") or "").lower()
+    if "no-store" in cc:
+        return None
+    if "no-cache" in cc:
+        return 0
+    m = _MAX_AGE_RE.search(cc)
+    return int(m.group(1)) if m else 0
+
+
+def load(url: str) -> Optional[Dict[str, Any]]:
+    """Returns the cached entry ({..., "content": str}) or None."""
+    base = _cache_dir()
+    if not base:
+        return None
+    meta_path, body_path = _paths(base, url)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "r", encoding="utf-8") as f:
+            meta["content"] = f.read()
+    except (OSError, ValueError):
+        return None
+    return meta if isinstance(meta, dict) and meta.get("url") == url else None
+
+
+def load_by_digest(prefix: str) -> Optional[Dict[str, Any]]:
+    """Looks up an entry by a prefix of its sha256 file name (document handles, see _documents)."""
+    base = _cache_dir()
+    if not base or not re.fullmatch(r"[0-9a-f]{8,64}", prefix or ""):
+        return None
+    try:
+        names = [e.name for e in os.scandir(base) if e.name.startswith(prefix) and e.name.endswith(".json")]
+    except OSError:
+        return None
+    if len(names) != 1:
+        return None
+    try:
+        with open(os.path.join(base, names[0]), "r", encoding="utf-8") as f:
+            url = json.load(f).get("url")
+    except (OSError, ValueError):
+        return None
+    return load(url) if url else None
+
+
+def is_fresh(entry: Dict[str, Any]) -> bool:
+    return time.time() - entry.get("fetched_at", 0) < entry.get("max_age", 0)
+
+
+def store(url: str, content: str, meta: Dict[str, Any]) -> None:
+    base = _cache_dir()
+    if not base:
+        return
+    meta_path, body_path = _paths(base, url)
+    meta = dict(meta, url=url, fetched_at=time.time())
+    _atomic_write(body_path, content)
+    _atomic_write(meta_path, json.dumps(meta, ensure_ascii=False))
+    _prune(base)
+
+
+def touch(url: str, entry: Dict[str, Any], max_age: int) -> None:
+    """Records a successful 304 revalidation (new fetched_at / max_age) without rewriting content."""
+    base = _cache_dir()
+    if not base:
+        return
+    meta_path, _ = _paths(base, url)
+    meta = {k: v for k, v in entry.items() if k != "content"}
+    meta.update(fetched_at=time.time(), max_age=max_age)
+    _atomic_write(meta_path, json.dumps(meta, ensure_ascii=False))
+
+
+def _prune(base: str) -> None:
+    limit = _max_entries()
+    try:
+        metas = [e for e in os.scandir(base) if e.name.endswith(".json")]
+    except OSError:
+        return
+    if len(metas) <= limit:
+        return
+    metas.sort(key=lambda e: e.stat().st_mtime)
+    for e in metas[: len(metas) - limit]:
+        for path in (e.path, e.path[: -len(".json")] + ".md"):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
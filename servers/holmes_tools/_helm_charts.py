@@ -0,0 +1,392 @@
+"""
+Helm chart 解析、本地归档缓存与 dry-run 渲染缓存，供 helm_server 使用。
+
+ChartCache 把仓库 chart（repo/name）的 .tgz 按 digest 保存在 HELM_CHART_CACHE_DIR（默认 <tmp>/holmes-mcp-helm-charts，
+空字符串时只复用 helm 自己的仓库缓存），写入与使用前都校验 sha256 与仓库 index.yaml 的 digest 一致，
+按最近使用时间 LRU 淘汰到 HELM_CHART_CACHE_MAX_MB（默认 1024）以内。helm install / upgrade 先从缓存解析 chart，
+缺失时下载一次入缓存再交给 helm；仓库索引不可用（离线/air-gapped）时按缓存中记录的 name + 版本查找。
+HELM_CHART_CACHE=false 关闭。
+
+resolve_chart 把 chart 引用解析为 (digest, version)：仓库 chart 取 index.yaml 中对应版本的 digest，
+本地 .tgz 与本地目录按内容计算 sha256。
+
+RenderCache 缓存成功的 dry-run 输出，键为 chart digest + 版本 + values 的规范化哈希 + 其余 helm 参数
+（以及 upgrade 时 release 的当前 revision、kube 上下文），命中时直接返回。
+配置：HELM_RENDER_CACHE_SIZE（默认 32）、HELM_RENDER_CACHE_TTL（秒，默认 600；0 关闭缓存）。
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+import yaml
+
+from . import _singleflight
+from ._helm_repo_index import Constraint, RepoIndex, repository_cache, version_key
+from .mcp_logger import get_logger
+
+_logger = get_logger("helm_charts")
+_DOWNLOAD_TIMEOUT = 120
+
+
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def parse_set_values(raw: Any) -> Dict[str, Any]:
+    """set_values 参数（对象或 JSON 字符串）-> dict；格式不对时抛 ValueError。"""
+    if raw in (None, ""):
+        return {}
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"set_values 不是合法的 JSON 对象: {e}")
+    if not isinstance(raw, dict):
+        raise ValueError("set_values 必须是 key-value 对象")
+    return raw
+
+
+def _set_literal(value: Any) -> str:
+    # --set 语法：逗号分隔多个赋值、反斜杠转义；布尔/空值写成 YAML 字面量
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    return str(value).replace("\\", "\\\\").replace(",", "\\,")
+
+
+def set_value_args(values: Dict[str, Any]) -> List[str]:
+    """values -> helm 参数：标量用 --set，对象/数组用 --set-json。"""
+    args: List[str] = []
+    for key, value in values.items():
+        if isinstance(value, (dict, list)):
+            args.extend(["--set-json", f"{key}={json.dumps(value, ensure_ascii=False)}"])
+        else:
+            args.extend(["--set", f"{key}={_set_literal(value)}"])
+    return args
+
+
+def values_hash(values: Dict[str, Any]) -> str:
+    canonical = json.dumps(values, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _dir_digest(path: str) -> str:
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d != ".git")
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            h.update(os.path.relpath(full, path).replace(os.sep, "/").encode("utf-8") + b"\0")
+            with open(full, "rb") as f:
+                h.update(f.read())
+            h.update(b"\0")
+    return h.hexdigest()
+
+
+def _local_chart_version(path: str) -> str:
+    try:
+        with open(os.path.join(path, "Chart.yaml"), "r", encoding="utf-8") as f:
+            return str((yaml.safe_load(f) or {}).get("version") or "")
+    except (OSError, yaml.YAMLError):
+        return ""
+
+
+def is_repo_ref(chart: str) -> bool:
+    """repo/name 形式的仓库 chart 引用（不是本地路径、URL 或 OCI 引用）。"""
+    chart = chart.strip()
+    return "://" not in chart and chart.count("/") == 1 and not os.path.exists(chart)
+
+
+def resolve_chart(chart: str, version: str, repo_index: RepoIndex) -> Optional[Dict[str, Any]]:
+    """
+    chart 引用 -> {"digest", "version"}。
+    无法确定内容摘要时（OCI、URL、未知仓库等）返回 None，调用方不做缓存。
+    """
+    chart = chart.strip()
+    if os.path.isdir(chart):
+        return {"digest": _dir_digest(chart), "version": _local_chart_version(chart)}
+    if os.path.isfile(chart):
+        return {"digest": file_sha256(chart), "version": version}
+    if not is_repo_ref(chart) or not repo_index.available():
+        return None
+    entry = repo_index.find(chart, version)
+    if entry is None or not entry["digest"]:
+        return None
+    return {"digest": entry["digest"], "version": entry["version"]}
+
+
+def _chart_cache_dir() -> Optional[str]:
+    raw = os.environ.get("HELM_CHART_CACHE_DIR")
+    if raw is None:
+        raw = os.path.join(tempfile.gettempdir(), "holmes-mcp-helm-charts")
+    raw = raw.strip()
+    if not raw:
+        return None
+    os.makedirs(raw, exist_ok=True)
+    return raw
+
+
+class ChartCache:
+    """按 digest 存放的 chart 归档：<dir>/<digest>.tgz + <digest>.json（name / version / url / fetched_at）。"""
+
+    def __init__(self, repo_index: RepoIndex):
+        self._repo_index = repo_index
+        self._lock = threading.Lock()
+        self._flight = _singleflight.group("helm_chart")
+        self.hits = 0
+        self.downloads = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.environ.get("HELM_CHART_CACHE", "true").strip().lower() not in ("0", "false", "no", "off")
+
+    @staticmethod
+    def _verified(path: str, digest: str) -> bool:
+        try:
+            return os.path.isfile(path) and file_sha256(path) == digest
+        except OSError:
+            return False
+
+    def _store(self, base: str, digest: str, source: str, meta: Dict[str, Any], move: bool = False) -> str:
+        """把已校验的归档放入缓存（先写临时文件再 rename），写元数据并淘汰超量的旧归档。"""
+        target = os.path.join(base, f"{digest}.tgz")
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        (shutil.move if move else shutil.copyfile)(source, tmp)
+        os.replace(tmp, target)
+        with open(os.path.join(base, f"{digest}.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(meta, digest=digest, fetched_at=time.time()), f, ensure_ascii=False)
+        self._evict(base)
+        return target
+
+    def _evict(self, base: str) -> None:
+        limit = max(1, _get_int_env("HELM_CHART_CACHE_MAX_MB", 1024)) * 1024 * 1024
+        with self._lock:
+            archives = []
+            for name in os.listdir(base):
+                if name.endswith(".tgz"):
+                    try:
+                        st = os.stat(os.path.join(base, name))
+                    except OSError:
+                        continue
+                    archives.append((st.st_mtime, st.st_size, name))
+            total = sum(a[1] for a in archives)
+            for _, size, name in sorted(archives):
+                if total <= limit:
+                    break
+                for suffix in (".tgz", ".json"):
+                    try:
+                        os.remove(os.path.join(base, name[: -len(".tgz")] + suffix))
+                    except OSError:
+                        pass
+                total -= size
+                _logger.info(f"[chart cache] 淘汰 {name}（{size} bytes）")
+
+    def lookup(self, entry: Dict[str, Any]) -> Optional[str]:
+        """已缓存且校验通过的归档路径；helm 仓库缓存中的同一归档会被校验后导入。"""
+        digest = entry["digest"]
+        base = _chart_cache_dir()
+        if base:
+            path = os.path.join(base, f"{digest}.tgz")
+            if self._verified(path, digest):
+                os.utime(path)
+                return path
+        helm_path = os.path.join(repository_cache(), f"{entry['chart']}-{entry['version']}.tgz")
+        if self._verified(helm_path, digest):
+            if not base:
+                return helm_path
+            meta = {"name": entry["name"], "version": entry["version"], "url": ""}
+            return self._store(base, digest, helm_path, meta)
+        return None
+
+    def _offline(self, chart_ref: str, version: str) -> Optional[Dict[str, Any]]:
+        """仓库索引中找不到时，按缓存元数据（name + 版本约束）查找最高的匹配版本。"""
+        base = _chart_cache_dir()
+        if not base:
+            return None
+        constraint = Constraint(version or ">0.0.0")
+        best = None
+        for name in os.listdir(base):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(base, name), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            cached_version = str(meta.get("version") or "")
+            if meta.get("name") != chart_ref or not (cached_version == version or constraint.check(cached_version)):
+                continue
+            if best is None or version_key(meta["version"]) > version_key(best["version"]):
+                best = meta
+        if best is None:
+            return None
+        path = os.path.join(base, f"{best['digest']}.tgz")
+        if not self._verified(path, best["digest"]):
+            return None
+        os.utime(path)
+        return {"path": path, "digest": best["digest"], "version": best["version"], "source": "cache (offline)"}
+
+    def _download(self, entry: Dict[str, Any]) -> str:
+        if not entry["urls"]:
+            raise LookupError(f"{entry['name']} {entry['version']} 在仓库索引中没有下载地址")
+        repo = self._repo_index.repo_config(entry["repo"])
+        repo_url = repo.get("url") or ""
+        url = urljoin(repo_url.rstrip("/") + "/", entry["urls"][0])
+        kwargs: Dict[str, Any] = {"timeout": _DOWNLOAD_TIMEOUT, "stream": True}
+        # 与 helm 一致：凭据只发给仓库所在主机，除非配置了 pass_credentials_all
+        if repo.get("username") and (
+            repo.get("pass_credentials_all") or urlparse(url).netloc == urlparse(repo_url).netloc
+        ):
+            kwargs["auth"] = (repo["username"], repo.get("password") or "")
+        if repo.get("insecure_skip_tls_verify"):
+            kwargs["verify"] = False
+        elif repo.get("caFile"):
+            kwargs["verify"] = repo["caFile"]
+        if repo.get("certFile") and repo.get("keyFile"):
+            kwargs["cert"] = (repo["certFile"], repo["keyFile"])
+        base = _chart_cache_dir() or tempfile.gettempdir()
+        fd, tmp = tempfile.mkstemp(suffix=".download", dir=base)
+        try:
+            h = hashlib.sha256()
+            with os.fdopen(fd, "wb") as f, requests.get(url, **kwargs) as resp:
+                resp.raise_for_status()
+                for block in resp.iter_content(1 << 16):
+                    h.update(block)
+                    f.write(block)
+            if h.hexdigest() != entry["digest"]:
+                raise ValueError(
+                    f"{entry['name']} {entry['version']} 的 sha256 {h.hexdigest()} 与仓库索引 digest 不一致，已丢弃"
+                )
+            self.downloads += 1
+            meta = {"name": entry["name"], "version": entry["version"], "url": url}
+            if not _chart_cache_dir():
+                # 未启用缓存目录：放到 helm 仓库缓存中与 helm 共享
+                target = os.path.join(repository_cache(), f"{entry['chart']}-{entry['version']}.tgz")
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp, target)
+                return target
+            return self._store(base, entry["digest"], tmp, meta, move=True)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def resolve(self, chart_ref: str, version: str = "", download: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        repo/name（可带版本约束）-> {"path", "digest", "version", "source"}；source 为 cache / downloaded。
+        不在缓存中且 download=False、或无法解析时返回 None；下载或校验失败时抛异常。
+        """
+        entry = self._repo_index.find(chart_ref, version) if self._repo_index.available() else None
+        if entry is None:
+            return self._offline(chart_ref, version)
+        if not entry["digest"]:
+            raise LookupError(f"{chart_ref} {entry['version']} 在仓库索引中没有 digest，无法校验")
+        path = self.lookup(entry)
+        source = "cache"
+        if path is None:
+            if not download:
+                return None
+            # 同一归档的并发请求只下载一次
+            path = self._flight.do(entry["digest"], lambda: self.lookup(entry) or self._download(entry))
+            source = "downloaded"
+        else:
+            self.hits += 1
+        return {"path": path, "digest": entry["digest"], "version": entry["version"], "source": source}
+
+    def prefetch(self, refs: List[str], concurrency: int = 4) -> List[Dict[str, Any]]:
+        """预热 "repo/name@version" 列表（版本可省略或为约束）；逐项返回结果，不因单项失败中断。"""
+        def one(ref: str) -> Dict[str, Any]:
+            chart_ref, _, version = ref.strip().partition("@")
+            out: Dict[str, Any] = {"chart": ref.strip()}
+            try:
+                res = self.resolve(chart_ref, version)
+            except Exception as e:
+                out.update(status="error", error=str(e))
+                return out
+            if res is None:
+                out.update(status="error", error="仓库索引与本地缓存中都找不到该 chart/版本")
+                return out
+            out.update(status=res["source"], version=res["version"], digest=res["digest"],
+                       size=os.path.getsize(res["path"]), path=res["path"])
+            return out
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            return list(pool.map(one, [r for r in refs if r.strip()]))
+
+    def stats(self) -> Dict[str, Any]:
+        base = _chart_cache_dir()
+        archives = [n for n in os.listdir(base) if n.endswith(".tgz")] if base else []
+        size = sum(os.path.getsize(os.path.join(base, n)) for n in archives) if base else 0
+        return {"directory": base or "", "archives": len(archives), "bytes": size,
+                "hits": self.hits, "downloads": self.downloads}
+
+
+class RenderCache:
+    """dry-run 输出的 LRU + TTL 缓存。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(operation: str, release: str, namespace: str, chart: Dict[str, Any], values: Dict[str, Any],
+            args: List[str], revision: Optional[int] = None) -> str:
+        material = {
+            "operation": operation,
+            "release": release,
+            "namespace": namespace,
+            "chart_digest": chart["digest"],
+            "chart_version": chart["version"],
+            "values": values_hash(values),
+            "args": args,
+            "revision": revision,
+            "kube": [os.environ.get("KUBECONFIG", ""), os.environ.get("HELM_KUBECONTEXT", "")],
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, output: str) -> None:
+        ttl = _get_int_env("HELM_RENDER_CACHE_TTL", 600)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(1, _get_int_env("HELM_RENDER_CACHE_SIZE", 32)):
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
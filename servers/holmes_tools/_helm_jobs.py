@@ -0,0 +1,249 @@
+"""
+Helm 变更操作（install / upgrade / rollback）的后台作业，供 helm_server 使用。
+
+helm_install / helm_upgrade / helm_rollback 传 background=true 时不再阻塞工具调用：命令在后台子进程中执行
+（自动附加 --debug，以便逐行看到资源创建与 --wait 的就绪进度），立即返回 job_id。
+helm_job_status 按行游标增量返回输出（可 wait_seconds 长轮询），helm_job_cancel 发送 SIGTERM（宽限后 SIGKILL），
+helm_job_list 列出作业。同一 namespace/release 同时只允许一个运行中的作业（helm 本身也会拒绝并发变更）。
+可传入 prepare(args) -> args 在作业线程中、启动 helm 之前执行（如把仓库 chart 解析为本地缓存归档），
+这样可能较慢的下载也不会阻塞工具调用；prepare 期间同样计入超时、可以取消。
+
+配置：HELM_JOB_TIMEOUT（单个作业最长运行秒数，默认 1800）、HELM_JOB_OUTPUT_LINES（每个作业保留的输出行数，默认 5000）、
+HELM_JOB_RETENTION（结束的作业保留秒数，默认 3600）、HELM_MAX_JOBS（保留的作业数上限，默认 100）。
+"""
+import os
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from .mcp_logger import get_logger, log_command
+
+_logger = get_logger("helm_jobs")
+
+_CANCEL_GRACE = 10
+_MAX_WAIT = 60
+_RUNNING = "running"
+_FINISHED = ("succeeded", "failed", "cancelled", "timed_out")
+
+
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+class Job:
+    def __init__(self, operation: str, release: str, namespace: str, args: List[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.operation = operation
+        self.release = release
+        self.namespace = namespace
+        self.args = args
+        self.status = _RUNNING
+        self.exit_code: Optional[int] = None
+        self.error = ""
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.proc: Optional[subprocess.Popen] = None
+        self.cancel_requested = False
+        self.timed_out = False
+        # 只保留最近 HELM_JOB_OUTPUT_LINES 行；dropped 为已丢弃的行数，游标始终是绝对行号
+        self.lines: deque = deque(maxlen=max(1, _get_int_env("HELM_JOB_OUTPUT_LINES", 5000)))
+        self.dropped = 0
+        self.changed = threading.Condition()
+
+    @property
+    def total_lines(self) -> int:
+        return self.dropped + len(self.lines)
+
+    def append(self, line: str) -> None:
+        with self.changed:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(line)
+            self.changed.notify_all()
+
+    def finish(self, status: str, exit_code: Optional[int] = None, error: str = "") -> None:
+        with self.changed:
+            self.status = status
+            self.exit_code = exit_code
+            self.error = error
+            self.finished = time.time()
+            self.changed.notify_all()
+
+    def summary(self) -> Dict[str, Any]:
+        end = self.finished or time.time()
+        out: Dict[str, Any] = {
+            "job_id": self.id,
+            "operation": self.operation,
+            "release": self.release,
+            "namespace": self.namespace or "",
+            "status": self.status,
+            "elapsed_seconds": round(end - self.started, 1),
+            "command": "helm " + " ".join(self.args),
+        }
+        if self.exit_code is not None:
+            out["exit_code"] = self.exit_code
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class JobManager:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def _prune(self) -> None:
+        """调用方持有 _lock：清理过期与超量的已结束作业（运行中的作业不清理）。"""
+        now = time.time()
+        retention = _get_int_env("HELM_JOB_RETENTION", 3600)
+        limit = max(1, _get_int_env("HELM_MAX_JOBS", 100))
+        finished = [j for j in self._jobs.values() if j.status != _RUNNING]
+        for job in finished:
+            if now - (job.finished or now) > retention:
+                del self._jobs[job.id]
+        for job in [j for j in self._jobs.values() if j.status != _RUNNING][: max(0, len(self._jobs) - limit)]:
+            del self._jobs[job.id]
+
+    def start(self, operation: str, release: str, namespace: str, args: List[str],
+              prepare: Optional[Callable[[List[str]], List[str]]] = None) -> Job:
+        """启动后台作业（helm 进程在作业线程中启动）；同一 release 已有运行中的作业时抛 RuntimeError。"""
+        if "--debug" not in args:
+            args = args + ["--debug"]
+        with self._lock:
+            self._prune()
+            for job in self._jobs.values():
+                if job.status == _RUNNING and job.release == release and job.namespace == namespace:
+                    raise RuntimeError(
+                        f"release {release} 已有运行中的作业 {job.id}（{job.operation}），请先等待完成或取消"
+                    )
+            job = Job(operation, release, namespace, args)
+            self._jobs[job.id] = job
+        threading.Thread(target=self._run, args=(job, prepare), name=f"helm-job-{job.id}", daemon=True).start()
+        return job
+
+    def _spawn(self, job: Job, prepare: Optional[Callable[[List[str]], List[str]]]) -> bool:
+        """在作业线程中执行 prepare 并启动 helm；失败、超时或已取消时结束作业并返回 False。"""
+        if prepare is not None:
+            try:
+                job.args = prepare(job.args)
+            except Exception as e:
+                job.finish("failed", error=f"准备作业失败: {e}")
+                return False
+        if job.timed_out or job.cancel_requested:
+            job.finish("timed_out" if job.timed_out else "cancelled")
+            return False
+        try:
+            job.proc = subprocess.Popen(
+                ["helm"] + job.args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                text=True, errors="replace", bufsize=1, start_new_session=True,
+            )
+        except OSError as e:
+            job.finish("failed", error=str(e))
+            return False
+        # prepare 期间收到的取消 / 超时：进程启动后立即终止
+        if job.timed_out or job.cancel_requested:
+            self._terminate(job)
+        return True
+
+    def _run(self, job: Job, prepare: Optional[Callable[[List[str]], List[str]]] = None) -> None:
+        timeout = _get_int_env("HELM_JOB_TIMEOUT", 1800)
+        timer = threading.Timer(timeout, self._expire, args=(job,))
+        timer.daemon = True
+        timer.start()
+        try:
+            if not self._spawn(job, prepare):
+                return
+            proc = job.proc
+            for line in proc.stdout:
+                job.append(line.rstrip("\n"))
+            code = proc.wait()
+        finally:
+            timer.cancel()
+        if job.timed_out:
+            job.finish("timed_out", code)
+        elif job.cancel_requested:
+            job.finish("cancelled", code)
+        else:
+            job.finish("succeeded" if code == 0 else "failed", code)
+        log_command(
+            "helm " + " ".join(job.args), returncode=code, stdout="\n".join(job.lines),
+            elapsed=job.finished - job.started,
+        )
+        _logger.info(f"[helm job {job.id}] {job.operation} {job.namespace}/{job.release} -> {job.status}")
+
+    def _terminate(self, job: Job) -> None:
+        proc = job.proc
+        if proc is None or proc.poll() is not None:
+            return
+        # helm 收到 SIGTERM 会中止等待并记录 release 状态；宽限期后仍未退出则强制结束整个进程组
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except OSError:
+            return
+
+        def force():
+            if proc.poll() is None:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+        killer = threading.Timer(_CANCEL_GRACE, force)
+        killer.daemon = True
+        killer.start()
+
+    def _expire(self, job: Job) -> None:
+        if job.status != _RUNNING:
+            return
+        job.timed_out = True
+        job.append("[job] 超过 HELM_JOB_TIMEOUT，终止 helm 进程")
+        self._terminate(job)
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job.status == _RUNNING and not job.cancel_requested:
+            job.cancel_requested = True
+            job.append("[job] 已请求取消，发送 SIGTERM")
+            self._terminate(job)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            job = self._jobs.get((job_id or "").strip())
+        if job is None:
+            raise LookupError(f"job {job_id} 不存在（可能已过期）")
+        return job
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._prune()
+            return [j.summary() for j in reversed(self._jobs.values())]
+
+    def poll(self, job_id: str, since: int = 0, max_lines: int = 200, wait: float = 0) -> Dict[str, Any]:
+        """since 之后的输出行（绝对行号游标）；wait>0 时最多等待该秒数直到有新输出或作业结束。"""
+        job = self.get(job_id)
+        since = max(0, since)
+        deadline = time.monotonic() + min(max(0.0, wait), _MAX_WAIT)
+        with job.changed:
+            while job.status == _RUNNING and job.total_lines <= since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                job.changed.wait(remaining)
+            start = min(max(since, job.dropped), job.total_lines)
+            lines = list(job.lines)[start - job.dropped: start - job.dropped + max(1, max_lines)]
+            out = job.summary()
+            out["done"] = job.status in _FINISHED
+            if start > since:
+                out["skipped_lines"] = start - since
+            out["output"] = "\n".join(lines)
+            out["next_cursor"] = start + len(lines)
+            out["more_output"] = out["next_cursor"] < job.total_lines
+        return out
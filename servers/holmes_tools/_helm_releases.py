@@ -0,0 +1,654 @@
+"""
+Helm release 存储（Secret 驱动）的解码与内存清单，供 helm_server 使用。
+
+Helm 3 把每个 release revision 存为 Secret sh.helm.release.v1.<name>.v<revision>（label owner=helm），
+data.release = base64(gzip(JSON))（外层再经 Kubernetes 的 base64）。
+HelmInventory 先 list 一次所有 owner=helm Secret，再从该 list 的 resourceVersion 开始 watch（kubectl get --raw）持续增量更新，
+helm_list_releases / helm_list 直接从内存生成结果，不再每次执行 helm list 解码全部 Secret。
+
+ReleaseStore 直接从 Kubernetes API（kubectl get secret）或本地 fixture 目录读取并解码 release revision，
+解码结果按 (namespace, name, revision, Secret uid) 缓存：同一个 Secret 的内容不变（status 以 Secret label / 清单为准覆盖），
+而 helm uninstall 后重新安装会以新的 Secret（新 uid）重建 v1，不会命中旧 release 的缓存。
+helm_values / helm_manifest / helm_hooks / helm_notes / helm_chart / helm_status / helm_history 共用同一份解码结果。
+manifest 按 YAML 文档拆分并以 kind/namespace/name 建立资源索引（index_manifest），使用相同的键缓存，
+helm_manifest 可只列出资源清单或只取指定资源。
+
+配置：HELM_INVENTORY_WATCH（默认 true；false 关闭，回退到 helm list）、
+HELM_DRIVER（非 secret/secrets 时自动关闭清单与原生解码，因为 release 不存放在 Secret 中）、
+HELM_RELEASE_CACHE_SIZE（缓存的已解码 revision 数，默认 64）、
+HELM_RELEASE_FIXTURE_DIR（从该目录的 *.json 读取 Secret / List，而不访问集群；用于离线调试）。
+"""
+import base64
+import gzip
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from .mcp_logger import get_logger
+
+_logger = get_logger("helm_releases")
+
+_GZIP_MAGIC = b"\x1f\x8b\x08"
+_SECRET_NAME_RE = re.compile(r"^sh\.helm\.release\.v1\.(.+)\.v(\d+)$")
+# helm list 默认只显示最新 revision 为 deployed 或 failed 的 release
+_LISTED_STATUSES = {"deployed", "failed"}
+_RESTART_BACKOFF = (1, 2, 5, 10, 30)
+# 清单不可用时，单个 release 的 revision 列表缓存秒数
+_LISTING_TTL = 10
+_DOC_SEP_RE = re.compile(r"^---[ \t]*(?:#.*)?$", re.MULTILINE)
+_SOURCE_RE = re.compile(r"^# Source: (.+?)\s*$", re.MULTILINE)
+# 常见集群级资源：不继承 release 命名空间
+_CLUSTER_SCOPED = {
+    "APIService", "CSIDriver", "ClusterRole", "ClusterRoleBinding", "CustomResourceDefinition", "IngressClass",
+    "MutatingWebhookConfiguration", "Namespace", "PersistentVolume", "PriorityClass", "RuntimeClass",
+    "StorageClass", "ValidatingAdmissionPolicy", "ValidatingAdmissionPolicyBinding",
+    "ValidatingWebhookConfiguration", "VolumeSnapshotClass",
+}
+
+try:
+    _YamlLoader = yaml.CSafeLoader
+except AttributeError:
+    _YamlLoader = yaml.SafeLoader
+
+
+def decode_release(encoded: str) -> Dict[str, Any]:
+    """解码 Secret data.release（Kubernetes base64 包裹的 helm base64+gzip JSON）。"""
+    raw = base64.b64decode(base64.b64decode(encoded))
+    if raw[:3] == _GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    return json.loads(raw)
+
+
+def format_updated(ts: str) -> str:
+    """RFC3339（info.last_deployed）-> helm list 的 "2006-01-02 15:04:05.999999999 -0700 MST" 形式（UTC）。"""
+    m = re.match(r"^(\d{4}-\d{2}-\d{2})T(\d{2}:\d{2}:\d{2})(\.\d+)?(Z|[+-]\d{2}:\d{2})?$", ts or "")
+    if not m:
+        return ts or ""
+    date, clock, frac, tz = m.groups()
+    if tz in (None, "Z"):
+        return f"{date} {clock}{frac or ''} +0000 UTC"
+    return f"{date} {clock}{frac or ''} {tz.replace(':', '')} {tz.replace(':', '')}"
+
+
+def _parse_time(ts: str) -> Optional[datetime]:
+    m = re.match(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(\.\d+)?(Z|[+-]\d{2}:\d{2})?$", ts or "")
+    if not m:
+        return None
+    tz = "+00:00" if m.group(3) in (None, "Z") else m.group(3)
+    return datetime.fromisoformat(m.group(1) + tz)
+
+
+def format_ansic(ts: str) -> str:
+    """RFC3339 -> Go time.ANSIC（helm status / history 的时间格式）。"""
+    dt = _parse_time(ts)
+    if dt is None:
+        return ts or ""
+    return f"{dt.strftime('%a %b')} {dt.day:>2} {dt.strftime('%H:%M:%S %Y')}"
+
+
+def summarize(release: Dict[str, Any]) -> Dict[str, Any]:
+    """与 helm list -o json 相同字段的摘要（另带 description 供 history 使用）。"""
+    info = release.get("info") or {}
+    meta = (release.get("chart") or {}).get("metadata") or {}
+    return {
+        "name": release.get("name"),
+        "namespace": release.get("namespace"),
+        "revision": str(release.get("version", "")),
+        "updated": format_updated(info.get("last_deployed", "")),
+        "status": info.get("status"),
+        "chart": f"{meta.get('name', '')}-{meta.get('version', '')}",
+        "app_version": meta.get("appVersion", ""),
+        "description": info.get("description", ""),
+        "last_deployed": info.get("last_deployed", ""),
+    }
+
+
+_LIST_FIELDS = ("name", "namespace", "revision", "updated", "status", "chart", "app_version")
+
+
+def _secret_key(secret: Dict[str, Any]) -> Optional[Tuple[str, str, int]]:
+    meta = secret.get("metadata") or {}
+    labels = meta.get("labels") or {}
+    m = _SECRET_NAME_RE.match(meta.get("name", ""))
+    if not m:
+        return None
+    return meta.get("namespace", ""), labels.get("name") or m.group(1), int(labels.get("version") or m.group(2))
+
+
+def _secret_uid(secret: Dict[str, Any]) -> str:
+    """Secret 的 metadata.uid（fixture 中可能没有，此时为空串）。"""
+    return str((secret.get("metadata") or {}).get("uid") or "")
+
+
+def _secret_driver() -> bool:
+    return os.environ.get("HELM_DRIVER", "secret").strip().lower() in ("", "secret", "secrets")
+
+
+def enabled() -> bool:
+    if os.environ.get("HELM_INVENTORY_WATCH", "true").strip().lower() in ("0", "false", "no", "off"):
+        return False
+    return _secret_driver()
+
+
+def native_enabled() -> bool:
+    """能否不经 helm 直接读取 release（Secret 驱动，且有 fixture 目录或 kubectl）。"""
+    if not _secret_driver():
+        return False
+    return bool(os.environ.get("HELM_RELEASE_FIXTURE_DIR", "").strip()) or shutil.which("kubectl") is not None
+
+
+class HelmInventory:
+    """owner=helm Secret 的内存镜像：(namespace, release) -> {revision: summary}。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revisions: Dict[Tuple[str, str], Dict[int, Dict[str, Any]]] = {}
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._proc: Optional[subprocess.Popen] = None
+        self.synced_at = 0.0
+        self.events = 0
+
+    # ---- 状态维护 ----
+
+    @staticmethod
+    def _summarize(secret: Dict[str, Any]) -> Optional[Tuple[Tuple[str, str, int], Dict[str, Any]]]:
+        key = _secret_key(secret)
+        if key is None:
+            return None
+        namespace, name, revision = key
+        try:
+            summary = summarize(decode_release((secret.get("data") or {}).get("release", "")))
+        except Exception as e:
+            _logger.warning(f"[helm_inventory] 无法解码 {namespace}/{name} v{revision}: {e}")
+            labels = (secret.get("metadata") or {}).get("labels") or {}
+            summary = {
+                "name": name, "namespace": namespace, "revision": str(revision), "updated": "",
+                "status": labels.get("status"), "chart": "", "app_version": "", "description": "",
+                "last_deployed": "",
+            }
+        summary["uid"] = _secret_uid(secret)
+        return key, summary
+
+    def _apply(self, event_type: str, secret: Dict[str, Any]) -> None:
+        if event_type == "DELETED":
+            key = _secret_key(secret)
+            if key is None:
+                return
+            namespace, name, revision = key
+            with self._lock:
+                revs = self._revisions.get((namespace, name))
+                if revs is not None:
+                    revs.pop(revision, None)
+                    if not revs:
+                        del self._revisions[(namespace, name)]
+                self.events += 1
+            return
+        entry = self._summarize(secret)
+        if entry is None:
+            return
+        (namespace, name, revision), summary = entry
+        with self._lock:
+            self._revisions.setdefault((namespace, name), {})[revision] = summary
+            self.events += 1
+
+    def _initial_list(self) -> str:
+        """list 全部 owner=helm Secret 并整体替换内存清单（list 中已不存在的 Secret 随之移除）；返回 resourceVersion。"""
+        result = subprocess.run(
+            ["kubectl", "get", "secrets", "--all-namespaces", "-l", "owner=helm", "-o", "json"],
+            capture_output=True, text=True, timeout=300,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "kubectl get secrets failed")
+        doc = json.loads(result.stdout)
+        items = doc.get("items") or []
+        revisions: Dict[Tuple[str, str], Dict[int, Dict[str, Any]]] = {}
+        for item in items:
+            entry = self._summarize(item)
+            if entry is not None:
+                (namespace, name, revision), summary = entry
+                revisions.setdefault((namespace, name), {})[revision] = summary
+        with self._lock:
+            self._revisions = revisions
+            self.events += len(items)
+        self.synced_at = time.time()
+        self._ready.set()
+        _logger.info(f"[helm_inventory] 初始同步完成: {len(items)} 个 release Secret")
+        return str((doc.get("metadata") or {}).get("resourceVersion") or "")
+
+    def _watch_once(self, resource_version: str) -> Optional[str]:
+        """
+        从 resourceVersion 开始 watch（API 不重放已有对象，list 与 watch 之间没有空档，也不会重复解码）。
+        watch 正常结束时返回最后的 resourceVersion，可直接续接；版本已过期（410 Gone）时返回 None，需重新 list。
+        """
+        path = ("/api/v1/secrets?watch=1&labelSelector=owner%3Dhelm&allowWatchBookmarks=true"
+                f"&resourceVersion={resource_version}")
+        self._proc = subprocess.Popen(
+            ["kubectl", "get", "--raw", path],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        # watch 流每行一个事件 JSON
+        for line in self._proc.stdout:
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            obj = event.get("object") if isinstance(event, dict) else None
+            if not isinstance(obj, dict):
+                continue
+            event_type = event.get("type", "MODIFIED")
+            if event_type == "ERROR":
+                _logger.info(f"[helm_inventory] watch 失效，重新 list: {obj.get('message', '')}")
+                self._proc.kill()
+                self._proc.wait()
+                return None
+            resource_version = str((obj.get("metadata") or {}).get("resourceVersion") or resource_version)
+            if event_type != "BOOKMARK":
+                self._apply(event_type, obj)
+        code = self._proc.wait()
+        if code != 0:
+            raise RuntimeError(f"kubectl watch 退出码 {code}")
+        return resource_version
+
+    def _run(self) -> None:
+        failures = 0
+        resource_version: Optional[str] = None
+        while True:
+            try:
+                if resource_version is None:
+                    resource_version = self._initial_list()
+                resource_version = self._watch_once(resource_version)
+                failures = 0
+                if resource_version is not None:
+                    # 服务端按超时结束 watch：从最后的 resourceVersion 续接，不需要重新 list
+                    continue
+            except Exception as e:
+                _logger.warning(f"[helm_inventory] 同步失败，回退到 helm list: {e}")
+                failures += 1
+                resource_version = None
+            # 需要重新 list 时可能已漏掉事件：标记为未就绪，期间由调用方回退到 helm 命令
+            self._ready.clear()
+            time.sleep(_RESTART_BACKOFF[min(failures, len(_RESTART_BACKOFF) - 1)])
+
+    def start(self) -> None:
+        if self._thread is not None or not enabled() or not shutil.which("kubectl"):
+            return
+        self._thread = threading.Thread(target=self._run, name="helm-inventory", daemon=True)
+        self._thread.start()
+
+    def ready(self, wait: float = 0.0) -> bool:
+        self.start()
+        return self._ready.wait(wait) if wait > 0 else self._ready.is_set()
+
+    # ---- 查询 ----
+
+    def releases(self, namespace: Optional[str] = None, name_filter: Optional[str] = None,
+                 statuses: Optional[set] = None) -> List[Dict[str, Any]]:
+        """每个 release 的最新 revision（与 helm list 相同的排序：按名称）。"""
+        pattern = re.compile(name_filter) if name_filter else None
+        statuses = _LISTED_STATUSES if statuses is None else statuses
+        out = []
+        with self._lock:
+            for (ns, name), revs in self._revisions.items():
+                if namespace and ns != namespace:
+                    continue
+                if pattern is not None and not pattern.search(name):
+                    continue
+                latest = revs[max(revs)]
+                if latest.get("status") in statuses:
+                    out.append({k: latest.get(k) for k in _LIST_FIELDS})
+        out.sort(key=lambda r: (r["name"] or "", r["namespace"] or ""))
+        return out
+
+    def revisions(self, namespace: str, name: str) -> Dict[int, Dict[str, Any]]:
+        """{revision: summary}（含 status/description/uid）；清单未就绪或 release 不存在时为空。"""
+        if not self._ready.is_set():
+            return {}
+        with self._lock:
+            return {rev: dict(summary) for rev, summary in self._revisions.get((namespace, name), {}).items()}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self._ready.is_set(),
+                "releases": len(self._revisions),
+                "revisions": sum(len(v) for v in self._revisions.values()),
+                "events": self.events,
+                "synced_at": self.synced_at,
+            }
+
+
+def format_table(releases: List[Dict[str, Any]], headers: Optional[List[str]] = None,
+                 keys: Optional[List[str]] = None) -> str:
+    """helm list -A 风格的表格输出（headers/keys 可替换，如 history）。"""
+    headers = headers or ["NAME", "NAMESPACE", "REVISION", "UPDATED", "STATUS", "CHART", "APP VERSION"]
+    keys = keys or list(_LIST_FIELDS)
+    rows = [[str(r.get(k) or "") for k in keys] for r in releases]
+    widths = [max([len(h)] + [len(row[i]) for row in rows]) for i, h in enumerate(headers)]
+    lines = ["\t".join(h.ljust(widths[i]) for i, h in enumerate(headers))]
+    lines.extend("\t".join(cell.ljust(widths[i]) for i, cell in enumerate(row)) for row in rows)
+    return "\n".join(line.rstrip() for line in lines)
+
+
+# ---------------------------------------------------------------------------
+# 单个 release 的原生读取
+# ---------------------------------------------------------------------------
+
+
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _load_fixture_secrets(fixture_dir: str) -> List[Dict[str, Any]]:
+    secrets: List[Dict[str, Any]] = []
+    for fname in sorted(os.listdir(fixture_dir)):
+        if not fname.endswith(".json"):
+            continue
+        with open(os.path.join(fixture_dir, fname), "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        items = doc.get("items") if isinstance(doc, dict) and "items" in doc else [doc]
+        secrets.extend(i for i in items if isinstance(i, dict) and i.get("kind", "Secret") == "Secret")
+    return secrets
+
+
+def _kubectl_json(args: List[str], timeout: int = 60) -> Dict[str, Any]:
+    result = subprocess.run(["kubectl"] + args + ["-o", "json"], capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        err = result.stderr.strip() or "kubectl failed"
+        if "NotFound" in err or "not found" in err:
+            raise LookupError(err)
+        raise RuntimeError(err)
+    return json.loads(result.stdout)
+
+
+def coalesce_values(defaults: Any, overrides: Any) -> Any:
+    """chart 默认 values 与用户 values 深度合并（与 helm get values -a 一致：用户值为 null 时删除该键）。"""
+    if not isinstance(defaults, dict) or not isinstance(overrides, dict):
+        return overrides if overrides is not None else defaults
+    merged = dict(defaults)
+    for key, value in overrides.items():
+        if value is None:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = coalesce_values(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def index_manifest(manifest: str, release_namespace: str) -> List[Dict[str, Any]]:
+    """
+    把 manifest 按 YAML 文档拆分为资源列表：kind / api_version / namespace / name / source（# Source 模板路径）/ text。
+    未写 metadata.namespace 的命名空间级资源与 helm 一样落在 release 命名空间。
+    """
+    resources: List[Dict[str, Any]] = []
+    for doc in _DOC_SEP_RE.split(manifest or ""):
+        text = doc.strip("\n")
+        if not text.strip():
+            continue
+        try:
+            obj = yaml.load(text, Loader=_YamlLoader)
+        except yaml.YAMLError:
+            obj = None
+        if not isinstance(obj, dict) or not obj.get("kind"):
+            continue
+        meta = obj.get("metadata") or {}
+        kind = str(obj["kind"])
+        source = _SOURCE_RE.search(text)
+        resources.append({
+            "kind": kind,
+            "api_version": str(obj.get("apiVersion") or ""),
+            "namespace": str(meta.get("namespace") or ("" if kind in _CLUSTER_SCOPED else release_namespace)),
+            "name": str(meta.get("name") or ""),
+            "source": source.group(1) if source else "",
+            "lines": text.count("\n") + 1,
+            "text": text,
+        })
+    return resources
+
+
+def _kind_matches(kind: str, query: str) -> bool:
+    kind, query = kind.lower(), query.strip().lower()
+    return query in (kind, kind + "s", kind + "es") or (kind.endswith("y") and query == kind[:-1] + "ies")
+
+
+def select_resources(resources: List[Dict[str, Any]], kind: str = "", name: str = "",
+                     namespace: str = "") -> List[Dict[str, Any]]:
+    """按 kind（大小写不敏感，可用复数）、namespace、name 过滤；name 无精确匹配时退化为子串匹配。"""
+    found = [
+        r for r in resources
+        if (not kind or _kind_matches(r["kind"], kind)) and (not namespace or r["namespace"] == namespace)
+    ]
+    if name:
+        exact = [r for r in found if r["name"] == name]
+        found = exact or [r for r in found if name.lower() in r["name"].lower()]
+    return found
+
+
+class ReleaseStore:
+    """已解码 release revision 的 LRU 缓存；revision 号优先取自清单，以免为找最新 revision 列出全部 Secret。"""
+
+    def __init__(self, inventory: HelmInventory):
+        self._inventory = inventory
+        self._lock = threading.Lock()
+        # 键为 (namespace, name, revision, Secret uid)：重新安装后同号 revision 是另一个 Secret
+        self._cache: "OrderedDict[Tuple[str, str, int, str], Dict[str, Any]]" = OrderedDict()
+        self._listings: Dict[Tuple[str, str], Tuple[float, Dict[int, Dict[str, Any]]]] = {}
+        # 与 _cache 同键的 index_manifest 结果，同样大小的 LRU
+        self._resources: "OrderedDict[Tuple[str, str, int, str], List[Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.fetches = 0
+
+    def _cached(self, key: Tuple[str, str, int, str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rel = self._cache.get(key)
+            if rel is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            return rel
+
+    def _put(self, key: Tuple[str, str, int, str], rel: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[key] = rel
+            self._cache.move_to_end(key)
+            while len(self._cache) > max(1, _get_int_env("HELM_RELEASE_CACHE_SIZE", 64)):
+                self._cache.popitem(last=False)
+
+    def _release_secrets(self, namespace: str, name: str, revision: Optional[int] = None) -> List[Dict[str, Any]]:
+        self.fetches += 1
+        fixture_dir = os.environ.get("HELM_RELEASE_FIXTURE_DIR", "").strip()
+        if fixture_dir:
+            found = []
+            for secret in _load_fixture_secrets(fixture_dir):
+                key = _secret_key(secret)
+                if key and key[0] == namespace and key[1] == name and (revision is None or key[2] == revision):
+                    found.append(secret)
+            return found
+        if revision is not None:
+            try:
+                return [_kubectl_json(["get", "secret", f"sh.helm.release.v1.{name}.v{revision}", "-n", namespace])]
+            except LookupError:
+                return []
+        return _kubectl_json(["get", "secrets", "-n", namespace, "-l", f"owner=helm,name={name}"]).get("items") or []
+
+    def _decode(self, secret: Dict[str, Any]) -> Dict[str, Any]:
+        key = _secret_key(secret) + (_secret_uid(secret),)
+        rel = self._cached(key)
+        if rel is None:
+            rel = decode_release((secret.get("data") or {}).get("release", ""))
+            self._put(key, rel)
+        return rel
+
+    @staticmethod
+    def _with_status(rel: Dict[str, Any], status: Optional[str]) -> Dict[str, Any]:
+        # 升级后旧 revision 的 status 会被 helm 改写（deployed -> superseded），以最新 label 为准
+        if not status or (rel.get("info") or {}).get("status") == status:
+            return rel
+        return dict(rel, info=dict(rel.get("info") or {}, status=status))
+
+    def _revision_info(self, namespace: str, name: str) -> Dict[int, Dict[str, Any]]:
+        """
+        {revision: {"status", "uid"}}。清单就绪时取自内存；否则列出该 release 的 Secret（结果缓存
+        _LISTING_TTL 秒，连续查看同一 release 的多个子视图只列一次），并顺带解码缓存最新 revision。
+        """
+        revs = self._inventory.revisions(namespace, name)
+        if revs:
+            return {rev: {"status": s.get("status"), "uid": s.get("uid", "")} for rev, s in revs.items()}
+        now = time.monotonic()
+        with self._lock:
+            memo = self._listings.get((namespace, name))
+        if memo is not None and memo[0] > now:
+            return memo[1]
+        info: Dict[int, Dict[str, Any]] = {}
+        latest = None
+        for sec in self._release_secrets(namespace, name):
+            key = _secret_key(sec)
+            if key is None:
+                continue
+            status = ((sec.get("metadata") or {}).get("labels") or {}).get("status")
+            info[key[2]] = {"status": status, "uid": _secret_uid(sec)}
+            if latest is None or key[2] > latest[0]:
+                latest = (key[2], sec)
+        if latest is not None:
+            self._decode(latest[1])
+        with self._lock:
+            self._listings[(namespace, name)] = (now + _LISTING_TTL, info)
+        return info
+
+    def _get(self, namespace: str, name: str, revision: Optional[int]) -> Tuple[Dict[str, Any], str]:
+        """(release, Secret uid)；release 的 status 已按最新 label 覆盖。"""
+        info = self._revision_info(namespace, name)
+        if revision is None:
+            if not info:
+                raise LookupError(f"release: not found ({namespace}/{name})")
+            revision = max(info)
+        known = info.get(revision)
+        rel = self._cached((namespace, name, revision, known["uid"])) if known is not None else None
+        if rel is None:
+            secrets = self._release_secrets(namespace, name, revision)
+            if not secrets:
+                raise LookupError(f"release: not found ({namespace}/{name} revision {revision})")
+            labels = (secrets[0].get("metadata") or {}).get("labels") or {}
+            known = {"status": (known or {}).get("status") or labels.get("status"), "uid": _secret_uid(secrets[0])}
+            rel = self._decode(secrets[0])
+        return self._with_status(rel, known["status"]), known["uid"]
+
+    def get(self, namespace: str, name: str, revision: Optional[int] = None) -> Dict[str, Any]:
+        """返回指定（默认最新）revision 的完整 release；不存在时抛 LookupError。"""
+        return self._get(namespace, name, revision)[0]
+
+    def resources(self, namespace: str, name: str, revision: Optional[int] = None) -> List[Dict[str, Any]]:
+        """指定（默认最新）revision 的 manifest 资源索引；与解码结果同键缓存，不存在时抛 LookupError。"""
+        rel, uid = self._get(namespace, name, revision)
+        key = (namespace, name, int(rel.get("version") or 0), uid)
+        with self._lock:
+            index = self._resources.get(key)
+            if index is not None:
+                self._resources.move_to_end(key)
+                return index
+        index = index_manifest(rel.get("manifest") or "", rel.get("namespace") or namespace)
+        with self._lock:
+            self._resources[key] = index
+            while len(self._resources) > max(1, _get_int_env("HELM_RELEASE_CACHE_SIZE", 64)):
+                self._resources.popitem(last=False)
+        return index
+
+    def history(self, namespace: str, name: str) -> List[Dict[str, Any]]:
+        revs = self._inventory.revisions(namespace, name)
+        if not revs:
+            info = self._revision_info(namespace, name)
+            missing = [r for r, i in info.items() if self._cached((namespace, name, r, i["uid"])) is None]
+            if missing:
+                for sec in self._release_secrets(namespace, name):
+                    key = _secret_key(sec)
+                    if key and key[2] in missing:
+                        self._decode(sec)
+            for rev, i in info.items():
+                rel = self._cached((namespace, name, rev, i["uid"]))
+                if rel is not None:
+                    revs[rev] = summarize(self._with_status(rel, i["status"]))
+        if not revs:
+            raise LookupError(f"release: not found ({namespace}/{name})")
+        return [revs[r] for r in sorted(revs)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cached_revisions": len(self._cache), "hits": self.hits, "fetches": self.fetches}
+
+
+def render_values(rel: Dict[str, Any], all_values: bool = True) -> str:
+    config = rel.get("config") or {}
+    values = coalesce_values((rel.get("chart") or {}).get("values") or {}, config) if all_values else config
+    return json.dumps(values, ensure_ascii=False)
+
+
+def render_manifest(rel: Dict[str, Any]) -> str:
+    return (rel.get("manifest") or "").strip()
+
+
+def render_resource_inventory(resources: List[Dict[str, Any]]) -> str:
+    return format_table(
+        resources,
+        ["KIND", "NAMESPACE", "NAME", "API VERSION", "LINES", "SOURCE"],
+        ["kind", "namespace", "name", "api_version", "lines", "source"],
+    )
+
+
+def render_resources(resources: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"---\n{r['text']}" for r in resources)
+
+
+def render_hooks(rel: Dict[str, Any]) -> str:
+    return "\n".join(
+        f"---\n# Source: {h.get('path', '')}\n{(h.get('manifest') or '').strip()}" for h in rel.get("hooks") or []
+    )
+
+
+def render_notes(rel: Dict[str, Any]) -> str:
+    notes = ((rel.get("info") or {}).get("notes") or "").strip()
+    return f"NOTES:\n{notes}" if notes else ""
+
+
+def render_chart(rel: Dict[str, Any]) -> str:
+    meta = (rel.get("chart") or {}).get("metadata") or {}
+    return yaml.safe_dump(meta, sort_keys=False, allow_unicode=True).strip()
+
+
+def render_status(rel: Dict[str, Any]) -> str:
+    info = rel.get("info") or {}
+    lines = [
+        f"NAME: {rel.get('name', '')}",
+        f"LAST DEPLOYED: {format_ansic(info.get('last_deployed', ''))}",
+        f"NAMESPACE: {rel.get('namespace', '')}",
+        f"STATUS: {info.get('status', '')}",
+        f"REVISION: {rel.get('version', '')}",
+    ]
+    test_hooks = [h for h in rel.get("hooks") or [] if "test" in (h.get("events") or [])]
+    lines.append("TEST SUITE: None" if not test_hooks else f"TEST SUITE: {len(test_hooks)} hook(s)")
+    notes = render_notes(rel)
+    if notes:
+        lines.append(notes)
+    return "\n".join(lines)
+
+
+def render_history(history: List[Dict[str, Any]]) -> str:
+    rows = [dict(h, updated=format_ansic(h.get("last_deployed", ""))) for h in history]
+    return format_table(
+        rows,
+        ["REVISION", "UPDATED", "STATUS", "CHART", "APP VERSION", "DESCRIPTION"],
+        ["revision", "updated", "status", "chart", "app_version", "description"],
+    )
@@ -0,0 +1,369 @@
+"""
+helm search repo 的进程内实现：仓库 index.yaml 只解析一次并压缩为内存结构，按文件 mtime/size 变化重新加载。
+
+仓库列表来自 repositories.yaml（HELM_REPOSITORY_CONFIG），索引文件为 <HELM_REPOSITORY_CACHE>/<repo>-index.yaml，
+默认路径与 helm 相同（HELM_CONFIG_HOME / HELM_CACHE_HOME / XDG_*）。
+匹配、打分、排序与版本约束语义对齐 helm（search.Index + Masterminds semver）：
+每个 chart 的检索行为 "name\\vrepo/name\\vdescription\\vkeywords"（小写），命中位置所在字段序号即得分（越小越好），
+按 (得分, 名称, 版本降序) 排序，再按约束（未指定 version 时为 >0.0.0，devel 时包含预发布版本）取每个 chart 第一个满足的版本。
+
+大仓库的 index.yaml 解析耗时数秒：压缩结果按 (路径, mtime, size) 落盘到 HELM_REPO_INDEX_CACHE_DIR
+（默认 <tmp>/holmes-mcp-helm-index，空字符串关闭），进程重启后直接读取；warm() 供服务启动时在后台预热。
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+try:
+    _Loader = yaml.CSafeLoader
+except AttributeError:
+    _Loader = yaml.SafeLoader
+
+_SEP = "\v"
+_MAX_SCORE = 25
+_VERSION_RE = re.compile(
+    r"^v?(\d+|[xX*])(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$"
+)
+
+
+# ---------------------------------------------------------------------------
+# semver
+# ---------------------------------------------------------------------------
+
+
+def _pre_key(pre: str) -> Tuple:
+    # 预发布版本低于正式版本；标识符逐段比较，数字段小于字母段
+    if not pre:
+        return (1,)
+    return (0,) + tuple((0, int(p), "") if p.isdigit() else (1, 0, p) for p in pre.split("."))
+
+
+def parse_version(text: str) -> Optional[Tuple[int, int, int, str]]:
+    m = _VERSION_RE.match((text or "").strip())
+    if not m or not all((g or "0").isdigit() for g in m.group(1, 2, 3)):
+        return None
+    return int(m.group(1)), int(m.group(2) or 0), int(m.group(3) or 0), m.group(4) or ""
+
+
+def version_key(text: str) -> Tuple:
+    v = parse_version(text)
+    if v is None:
+        return (-1, -1, -1, (0,))
+    return v[0], v[1], v[2], _pre_key(v[3])
+
+
+def _bound(text: str) -> Tuple[Tuple[int, int, int, str], int]:
+    """约束中的版本（允许通配/省略），返回 (版本, 明确给出的段数)。"""
+    m = _VERSION_RE.match(text.strip())
+    if not m:
+        raise ValueError(f"invalid version in constraint: {text!r}")
+    nums = [0, 0, 0]
+    given = 0
+    for p in (m.group(1), m.group(2), m.group(3)):
+        if p is None or not p.isdigit():
+            break
+        nums[given] = int(p)
+        given += 1
+    return (nums[0], nums[1], nums[2], m.group(4) or ""), given
+
+
+def _bump(v: Tuple[int, int, int, str], index: int) -> Tuple[int, int, int, str]:
+    nums = [v[0], v[1], v[2]]
+    nums[index] += 1
+    for i in range(index + 1, 3):
+        nums[i] = 0
+    return nums[0], nums[1], nums[2], ""
+
+
+def _cmp(a: Tuple[int, int, int, str], b: Tuple[int, int, int, str]) -> int:
+    ka = (a[0], a[1], a[2], _pre_key(a[3]))
+    kb = (b[0], b[1], b[2], _pre_key(b[3]))
+    return (ka > kb) - (ka < kb)
+
+
+def _expand(op: str, text: str) -> List[Tuple[str, Tuple[int, int, int, str]]]:
+    """单个约束 -> 基本比较列表（与 Masterminds semver 的 ~ ^ 通配语义一致）。"""
+    v, given = _bound(text)
+    if given == 0:
+        # "*" / "x"：任意版本
+        return [(">=", (0, 0, 0, ""))]
+    if op in ("", "=") and given < 3:
+        op = "~"
+    if op == "~":
+        return [(">=", v), ("<", _bump(v, 1 if given >= 2 else 0))]
+    if op == "^":
+        if v[0] > 0 or given == 1:
+            return [(">=", v), ("<", _bump(v, 0))]
+        if v[1] > 0 or given == 2:
+            return [(">=", v), ("<", _bump(v, 1))]
+        return [(">=", v), ("<", _bump(v, 2))]
+    if op == ">" and given < 3:
+        return [(">=", _bump(v, given - 1))]
+    if op == "<=" and given < 3:
+        return [("<", _bump(v, given - 1))]
+    return [(op or "=", v)]
+
+
+class Constraint:
+    """Masterminds 风格约束：'||' 分隔 OR 组，组内以逗号/空格分隔 AND；支持 = != > < >= <= ~ ^ 通配与 a - b 区间。"""
+
+    _TERM_RE = re.compile(r"(!=|>=|<=|=>|=<|>|<|=|~>|~|\^)?\s*(v?[0-9xX*][0-9A-Za-z.+*-]*)")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.groups: List[List[Tuple[str, Tuple[int, int, int, str]]]] = []
+        self.allows_pre = "-" in re.sub(r"\s-\s", " ", text)
+        for group in text.split("||"):
+            group = re.sub(r"(\S+)\s+-\s+(\S+)", r">=\1 <=\2", group.strip())
+            terms: List[Tuple[str, Tuple[int, int, int, str]]] = []
+            pos = 0
+            for m in self._TERM_RE.finditer(group):
+                if group[pos:m.start()].strip(" ,"):
+                    raise ValueError(f"invalid constraint: {text!r}")
+                op = {"=>": ">=", "=<": "<=", "~>": "~"}.get(m.group(1) or "", m.group(1) or "")
+                terms.extend(_expand(op, m.group(2)))
+                pos = m.end()
+            if group[pos:].strip(" ,") or not terms:
+                raise ValueError(f"invalid constraint: {text!r}")
+            self.groups.append(terms)
+
+    def check(self, version: str) -> bool:
+        v = parse_version(version)
+        if v is None:
+            return False
+        if v[3] and not self.allows_pre:
+            return False
+        for terms in self.groups:
+            ok = True
+            for op, bound in terms:
+                c = _cmp(v, bound)
+                if not {"=": c == 0, "!=": c != 0, ">": c > 0, "<": c < 0, ">=": c >= 0, "<=": c <= 0}[op]:
+                    ok = False
+                    break
+            if ok:
+                return True
+        return False
+
+
+# ---------------------------------------------------------------------------
+# 仓库索引
+# ---------------------------------------------------------------------------
+
+
+def _home(env: str, xdg: str, fallback: str) -> str:
+    if os.environ.get(env):
+        return os.environ[env]
+    base = os.environ.get(xdg) or os.path.join(os.path.expanduser("~"), fallback)
+    return os.path.join(base, "helm")
+
+
+def repository_config() -> str:
+    return os.environ.get("HELM_REPOSITORY_CONFIG") or os.path.join(
+        _home("HELM_CONFIG_HOME", "XDG_CONFIG_HOME", ".config"), "repositories.yaml"
+    )
+
+
+def repository_cache() -> str:
+    return os.environ.get("HELM_REPOSITORY_CACHE") or os.path.join(
+        _home("HELM_CACHE_HOME", "XDG_CACHE_HOME", ".cache"), "repository"
+    )
+
+
+def _stat_sig(path: str) -> Optional[Tuple[float, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def _compact_index(repo: str, doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """index.yaml -> [{name, chart, versions: [(version, app_version, description, digest, urls, keywords)]}]，版本降序。"""
+    charts = []
+    for name, entries in ((doc or {}).get("entries") or {}).items():
+        versions = []
+        for e in entries or []:
+            if not isinstance(e, dict) or not e.get("version"):
+                continue
+            versions.append((
+                str(e.get("version")), str(e.get("appVersion") or ""), e.get("description") or "",
+                e.get("digest") or "", tuple(e.get("urls") or ()), " ".join(map(str, e.get("keywords") or ())),
+            ))
+        if not versions:
+            continue
+        versions.sort(key=lambda v: version_key(v[0]), reverse=True)
+        charts.append({"name": f"{repo}/{name}", "chart": name, "versions": versions})
+    return charts
+
+
+def _disk_cache_path(path: str, sig: Tuple[float, int]) -> Optional[str]:
+    raw = os.environ.get("HELM_REPO_INDEX_CACHE_DIR")
+    if raw is None:
+        raw = os.path.join(tempfile.gettempdir(), "holmes-mcp-helm-index")
+    raw = raw.strip()
+    if not raw:
+        return None
+    key = hashlib.sha256(f"{os.path.abspath(path)}|{sig[0]}|{sig[1]}".encode("utf-8")).hexdigest()[:24]
+    return os.path.join(raw, f"{os.path.basename(path)}.{key}.json")
+
+
+def _load_index_file(repo: str, path: str, sig: Tuple[float, int]) -> List[Dict[str, Any]]:
+    """优先读取落盘的压缩结果；否则解析 index.yaml 并写回（同一 index 旧签名的文件一并清理）。"""
+    cached = _disk_cache_path(path, sig)
+    if cached and os.path.isfile(cached):
+        try:
+            with open(cached, "rb") as f:
+                raw = f.read()
+            charts = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            for c in charts:
+                c["versions"] = [tuple(v[:4]) + (tuple(v[4]), v[5]) for v in c["versions"]]
+            return charts
+        except (OSError, ValueError, KeyError, IndexError, TypeError):
+            pass
+    with open(path, "r", encoding="utf-8") as f:
+        charts = _compact_index(repo, yaml.load(f, Loader=_Loader))
+    if cached:
+        try:
+            directory = os.path.dirname(cached)
+            os.makedirs(directory, exist_ok=True)
+            prefix = os.path.basename(path) + "."
+            for name in os.listdir(directory):
+                if name.startswith(prefix) and name.endswith(".json"):
+                    os.remove(os.path.join(directory, name))
+            tmp = f"{cached}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(orjson.dumps(charts) if orjson is not None else json.dumps(charts).encode("utf-8"))
+            os.replace(tmp, cached)
+        except OSError:
+            pass
+    return charts
+
+
+class RepoIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config_sig: Optional[Tuple[float, int]] = None
+        self._repos: List[Tuple[str, str]] = []
+        # repositories.yaml 中每个仓库的完整配置（url / username / password / caFile / insecure_skip_tls_verify ...）
+        self._repo_configs: Dict[str, Dict[str, Any]] = {}
+        # repo -> (index 文件签名, 压缩后的 chart 列表)
+        self._indexes: Dict[str, Tuple[Optional[Tuple[float, int]], List[Dict[str, Any]]]] = {}
+        self.loads = 0
+
+    def available(self) -> bool:
+        return os.path.isfile(repository_config())
+
+    def _refresh(self) -> None:
+        config = repository_config()
+        sig = _stat_sig(config)
+        if sig != self._config_sig:
+            entries: List[Dict[str, Any]] = []
+            if sig is not None:
+                with open(config, "r", encoding="utf-8") as f:
+                    doc = yaml.load(f, Loader=_Loader) or {}
+                entries = [r for r in doc.get("repositories") or [] if isinstance(r, dict) and r.get("name")]
+            self._repos = [(r["name"], r.get("url", "")) for r in entries]
+            self._repo_configs = {r["name"]: r for r in entries}
+            self._config_sig = sig
+        cache = repository_cache()
+        names = {name for name, _ in self._repos}
+        for name in list(self._indexes):
+            if name not in names:
+                del self._indexes[name]
+        for name, _ in self._repos:
+            path = os.path.join(cache, f"{name}-index.yaml")
+            sig = _stat_sig(path)
+            current = self._indexes.get(name)
+            if current is not None and current[0] == sig:
+                continue
+            charts: List[Dict[str, Any]] = []
+            if sig is not None:
+                charts = _load_index_file(name, path, sig)
+                self.loads += 1
+            self._indexes[name] = (sig, charts)
+
+    def warm(self) -> None:
+        """后台预热（服务启动时调用），首个搜索不必等待解析。"""
+        def run():
+            try:
+                self.charts()
+            except Exception:
+                pass
+
+        if self.available():
+            threading.Thread(target=run, name="helm-repo-index", daemon=True).start()
+
+    def repo_config(self, repo: str) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return dict(self._repo_configs.get(repo) or {})
+
+    def charts(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return [c for name, _ in self._repos for c in self._indexes.get(name, (None, []))[1]]
+
+    def search(self, keyword: str, all_versions: bool = False, version: str = "", devel: bool = False,
+               regexp: bool = False) -> List[Dict[str, str]]:
+        """与 helm search repo -o json 相同的结果（name / version / app_version / description）。"""
+        # 与 helm 相同：默认约束非空，因此总是索引全部版本，再按约束为每个 chart 选出第一个满足的版本
+        constraint = Constraint(version or (">0.0.0-0" if devel else ">0.0.0"))
+        # 与 helm 相同：仅非正则模式大小写不敏感；正则模式按原样匹配原始行
+        term = (keyword or "").strip()
+        pattern = re.compile(term) if regexp and term else None
+        if pattern is None:
+            term = term.lower()
+        hits = []
+        for chart in self.charts():
+            for entry in chart["versions"]:
+                score = 0
+                if term:
+                    line = _SEP.join((chart["chart"], chart["name"], entry[2], entry[5]))
+                    if pattern is not None:
+                        m = pattern.search(line)
+                        pos = m.start() if m else -1
+                    else:
+                        line = line.lower()
+                        pos = line.find(term)
+                    if pos == -1:
+                        continue
+                    score = line.count(_SEP, 0, pos)
+                    if score >= _MAX_SCORE:
+                        continue
+                hits.append((score, chart["name"], entry))
+        # helm SortScore：得分升序、名称升序、同名按版本降序（两次稳定排序）
+        hits.sort(key=lambda h: version_key(h[2][0]), reverse=True)
+        hits.sort(key=lambda h: (h[0], h[1]))
+        out: List[Dict[str, str]] = []
+        seen = set()
+        for _, name, entry in hits:
+            if not all_versions and name in seen:
+                continue
+            if constraint.check(entry[0]):
+                out.append({"name": name, "version": entry[0], "app_version": entry[1], "description": entry[2]})
+                seen.add(name)
+        return out
+
+    def find(self, chart_ref: str, version: str = "", devel: bool = False) -> Optional[Dict[str, Any]]:
+        """repo/chart 在索引中满足版本约束的最新版本：{name, repo, chart, version, digest, urls}。"""
+        repo, _, chart = chart_ref.partition("/")
+        constraint = Constraint(version or (">0.0.0-0" if devel else ">0.0.0"))
+        for c in self.charts():
+            if c["name"] != chart_ref:
+                continue
+            for entry in c["versions"]:
+                if entry[0] == version or constraint.check(entry[0]):
+                    return {"name": chart_ref, "repo": repo, "chart": chart, "version": entry[0],
+                            "digest": entry[3], "urls": list(entry[4])}
+        return None
@@ -0,0 +1,460 @@
+"""
+HTML -> Markdown conversion for fetch_webpage.
+
+With lxml installed, the page is parsed in C, boilerplate is dropped in one walk over the lxml tree and
+the main content subtree is emitted as Markdown by walking the same tree (_LxmlMarkdown follows
+markdownify's rules, so no serialise + BeautifulSoup re-parse of the subtree is needed). Pages lxml cannot
+parse (e.g. empty documents) fall back to the BeautifulSoup(html.parser) + markdownify path, which is
+also used when lxml is not installed.
+"""
+import re
+from typing import Any, Callable, List, Optional
+
+try:
+    from bs4 import BeautifulSoup
+    from markdownify import MarkdownConverter
+except ImportError:
+    BeautifulSoup = None
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    _PARSER = "lxml"
+except ImportError:
+    lxml_html = None
+    _PARSER = "html.parser"
+
+_STRIP_TAGS = {
+    "script", "style", "nav", "header", "footer", "iframe", "noscript", "svg", "canvas",
+    "form", "button", "aside", "template", "link", "meta",
+}
+# 整页模式（main_content=false）只去掉与旧实现相同的标签
+_FULL_PAGE_STRIP_TAGS = {"script", "style", "nav", "header", "footer", "iframe"}
+# class/id 命中这些词的块视为页面框架（侧栏、菜单、cookie 提示等）
+_BOILERPLATE_RE = re.compile(
+    r"(^|[\s_-])(sidebar|side-bar|menu|navbar|nav|breadcrumbs?|cookie|banner|footer|header|toc|"
+    r"share|social|advert|ads?|promo|popup|modal|subscribe|related|comments?|skip-link)($|[\s_-])",
+    re.IGNORECASE,
+)
+_KEEP_TAGS = {"html", "body", "main", "article"}
+# 只有块级容器按 class/id 判定为框架；行内元素（如标题里 class="header" 的锚点）不受影响
+_CONTAINER_TAGS = {"div", "section", "ul", "ol", "dl", "table", "details", "p"}
+# (tag, attribute, value) 依次尝试；attribute 为 None 表示只匹配标签名
+_MAIN_CANDIDATES = (
+    ("main", None, None), ("article", None, None), ("*", "role", "main"),
+    ("*", "id", "main-content"), ("*", "id", "content"), ("*", "id", "main"),
+    ("*", "class", "markdown-body"), ("*", "class", "rst-content"), ("*", "class", "content"),
+    ("*", "class", "main-content"), ("*", "class", "post-content"),
+)
+_MIN_MAIN_TEXT = 200
+# lxml 不接受带 encoding 声明的 str（XHTML 页面常见），解析前去掉 XML 声明
+_XML_DECL_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+# 以下与 markdownify 1.2 的同名规则一致（_LxmlMarkdown 使用）
+_HEADING_RE = re.compile(r"h(\d+)")
+_WS_BLOCK_TAGS = frozenset({
+    "p", "blockquote", "article", "div", "section", "ol", "ul", "li", "dl", "dt", "dd",
+    "table", "thead", "tbody", "tfoot", "tr", "td", "th",
+})
+_NEWLINE_WS_RE = re.compile(r"[\t \r\n]*[\r\n][\t \r\n]*")
+_WS_RE = re.compile(r"[\t ]+")
+_ALL_WS_RE = re.compile(r"[\t \r\n]+")
+_EXTRACT_NEWLINES_RE = re.compile(r"^(\n*)((?:.*[^\n])?)(\n*)$", re.DOTALL)
+_LINE_RE = re.compile(r"^(.*)", re.MULTILINE)
+_PRE_LSTRIP_RE = re.compile(r"^[ \n]*\n")
+_PRE_RSTRIP_RE = re.compile(r"[ \n]*$")
+_BACKTICKS_RE = re.compile(r"`+")
+_BULLETS = "*+-"
+
+
+def _is_boilerplate(name: str, ident: str, aria_hidden: Optional[str], hidden: bool) -> bool:
+    if name in _STRIP_TAGS:
+        return True
+    if name in _KEEP_TAGS:
+        return False
+    if aria_hidden == "true" or hidden:
+        return True
+    if name not in _CONTAINER_TAGS:
+        return False
+    return bool(ident.strip()) and _BOILERPLATE_RE.search(ident) is not None
+
+
+def _should_drop(name: str, text_len: Callable[[], int], has_h1: Callable[[], bool], root_len: int) -> bool:
+    """class/id 命中但包含过半正文的块（如 "page has-sidebar" 包装层）以及带 h1 的 header 保留。"""
+    if name == "header" and has_h1():
+        return False
+    if name not in _STRIP_TAGS and text_len() * 2 > root_len:
+        return False
+    return True
+
+
+def _lxml_main(doc: Any) -> Any:
+    for tag, attr, value in _MAIN_CANDIDATES:
+        if attr is None:
+            xpath = f"//{tag}"
+        elif attr == "class":
+            xpath = f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {value} ')]"
+        else:
+            xpath = f"//{tag}[@{attr}='{value}']"
+        for el in doc.xpath(xpath):
+            if len(el.text_content().strip()) >= _MIN_MAIN_TEXT:
+                return el
+    body = doc.find("body")
+    return body if body is not None else doc
+
+
+def _lxml_clean(content: str, main_content: bool) -> tuple:
+    """lxml 路径：返回 (title, 已清理的正文子树根元素)。"""
+    doc = lxml_html.document_fromstring(_XML_DECL_RE.sub("", content, count=1))
+    title = (doc.findtext(".//title") or "").strip()
+    root = _lxml_main(doc) if main_content else doc
+    root_len = len(root.text_content()) or 1
+    drop = []
+    for el in root.iter():
+        if not isinstance(el.tag, str):
+            if isinstance(el, etree._Comment):
+                drop.append(el)
+            continue
+        name = el.tag.lower()
+        if not main_content:
+            if name in _FULL_PAGE_STRIP_TAGS:
+                drop.append(el)
+            continue
+        if el is root:
+            continue
+        ident = (el.get("class") or "") + " " + (el.get("id") or "")
+        if _is_boilerplate(name, ident, el.get("aria-hidden"), el.get("hidden") is not None) and _should_drop(
+            name, lambda: len(el.text_content()), lambda: bool(el.xpath(".//h1")), root_len
+        ):
+            drop.append(el)
+    for el in drop:
+        if el.getparent() is not None:
+            el.drop_tree()
+    return title, root
+
+
+def _ws_inside(name: Optional[str]) -> bool:
+    return name is not None and (name in _WS_BLOCK_TAGS or _HEADING_RE.match(name) is not None)
+
+
+def _ws_outside(name: Optional[str]) -> bool:
+    return name == "pre" or _ws_inside(name)
+
+
+def _chomp(text: str) -> tuple:
+    prefix = " " if text and text[0] == " " else ""
+    suffix = " " if text and text[-1] == " " else ""
+    return prefix, suffix, text.strip()
+
+
+def _colspan(cell: Any) -> int:
+    value = cell.get("colspan")
+    return max(1, min(1000, int(value))) if value is not None and value.isdigit() else 1
+
+
+class _LxmlMarkdown:
+    """
+    直接在 lxml 树上输出 Markdown，规则逐条对应 MarkdownConverter(heading_style="ATX")（其余为默认选项）的
+    process_tag / process_text / convert_*。节点序列是 el.text 与各子元素及其 tail；根元素之外的祖先与兄弟
+    不参与判断，与把子树单独重新解析时一致。
+    """
+
+    def __init__(self, root: Any):
+        self.root = root
+
+    def convert(self) -> str:
+        return self._tag(self.root, frozenset())
+
+    # ---- 树结构 ----
+
+    @staticmethod
+    def _name(node: Any) -> Optional[str]:
+        return None if node is None or isinstance(node, str) else node.tag
+
+    def _prev_element(self, el: Any) -> Any:
+        if el is self.root:
+            return None
+        return next((sib for sib in el.itersiblings(preceding=True) if isinstance(sib.tag, str)), None)
+
+    def _next_content(self, el: Any) -> Any:
+        """之后第一个元素或非空白文本（markdownify 的 _next_block_content_sibling）。"""
+        if el is self.root:
+            return None
+        node = el
+        while node is not None:
+            if node.tail and node.tail.strip():
+                return node.tail
+            node = node.getnext()
+            if node is not None and isinstance(node.tag, str):
+                return node
+        return None
+
+    def _parent(self, el: Any) -> Any:
+        return None if el is self.root else el.getparent()
+
+    # ---- 遍历 ----
+
+    def _tag(self, el: Any, parent_tags: frozenset) -> str:
+        name = el.tag
+        nodes: List[Any] = [el.text] if el.text else []
+        for child in el:
+            if isinstance(child.tag, str):
+                nodes.append(child)
+            if child.tail:
+                nodes.append(child.tail)
+        inside = _ws_inside(name)
+        child_tags = parent_tags | {name}
+        if _HEADING_RE.match(name) or name in ("td", "th"):
+            child_tags |= {"_inline"}
+        if name in ("pre", "code", "kbd", "samp"):
+            child_tags |= {"_noformat"}
+
+        strings = []
+        last = len(nodes) - 1
+        for k, node in enumerate(nodes):
+            prev = nodes[k - 1] if k else None
+            nxt = nodes[k + 1] if k < last else None
+            if isinstance(node, str):
+                if not node.strip() and ((inside and (prev is None or nxt is None)) or
+                                         _ws_outside(self._name(prev)) or _ws_outside(self._name(nxt))):
+                    continue
+                text = self._text(node, prev, nxt, inside, child_tags)
+            else:
+                text = self._tag(node, child_tags)
+            if text:
+                strings.append(text)
+
+        if name != "pre" and "pre" not in parent_tags:
+            # 子节点边界处的换行合并为较多的一方（最多 2 个）
+            collapsed = [""]
+            for string in strings:
+                leading, content, trailing = _EXTRACT_NEWLINES_RE.match(string).groups()
+                if collapsed[-1] and leading:
+                    leading = "\n" * min(2, max(len(collapsed.pop()), len(leading)))
+                collapsed.extend((leading, content, trailing))
+            strings = collapsed
+        return self._convert(el, name, "".join(strings), parent_tags)
+
+    def _text(self, text: str, prev: Any, nxt: Any, parent_inside: bool, tags: frozenset) -> str:
+        if "pre" not in tags:
+            text = _WS_RE.sub(" ", _NEWLINE_WS_RE.sub("\n", text))
+        if "_noformat" not in tags:
+            text = text.replace("*", r"\*").replace("_", r"\_")
+        if _ws_outside(self._name(prev)) or (parent_inside and prev is None):
+            text = text.lstrip(" \t\r\n")
+        if _ws_outside(self._name(nxt)) or (parent_inside and nxt is None):
+            text = text.rstrip()
+        return text
+
+    # ---- 各标签的转换 ----
+
+    def _convert(self, el: Any, name: str, text: str, tags: frozenset) -> str:
+        inline = "_inline" in tags
+        if name in ("b", "strong", "em", "i", "del", "s", "sub", "sup"):
+            if "_noformat" in tags:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ""
+            markup = {"b": "**", "strong": "**", "em": "*", "i": "*", "del": "~~", "s": "~~"}.get(name, "")
+            return f"{prefix}{markup}{text}{markup}{suffix}"
+        if name in ("code", "kbd", "samp"):
+            if "_noformat" in tags:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ""
+            ticks = max((len(run) for run in _BACKTICKS_RE.findall(text)), default=0)
+            if ticks:
+                text = f" {text} "
+            return f"{prefix}{'`' * (ticks + 1)}{text}{'`' * (ticks + 1)}{suffix}"
+        if name == "a":
+            if "_noformat" in tags:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ""
+            href, title = el.get("href"), el.get("title")
+            if text.replace(r"\_", "_") == href and not title:
+                return f"<{href}>"
+            title_part = ' "%s"' % title.replace('"', r'\"') if title else ""
+            return f"{prefix}[{text}]({href}{title_part}){suffix}" if href else text
+        if name in ("div", "article", "section", "dl"):
+            if inline:
+                return " " + text.strip() + " "
+            text = text.strip()
+            return f"\n\n{text}\n\n" if text else ""
+        if name == "p":
+            if inline:
+                return " " + text.strip(" \t\r\n") + " "
+            text = text.strip(" \t\r\n")
+            return f"\n\n{text}\n\n" if text else ""
+        m = _HEADING_RE.match(name)
+        if m:
+            if inline:
+                return text
+            text = _ALL_WS_RE.sub(" ", text.strip())
+            return f"\n\n{'#' * max(1, min(6, int(m.group(1))))} {text}\n\n"
+        if name in ("ul", "ol"):
+            nxt = self._next_content(el)
+            before_paragraph = nxt is not None and self._name(nxt) not in ("ul", "ol")
+            if "li" in tags:
+                return "\n" + text.rstrip()
+            return "\n\n" + text + ("\n" if before_paragraph else "")
+        if name == "li":
+            return self._li(el, text)
+        if name == "pre":
+            if not text:
+                return ""
+            text = _PRE_RSTRIP_RE.sub("", _PRE_LSTRIP_RE.sub("", text))
+            return f"\n\n```\n{text}\n```\n\n"
+        if name == "blockquote":
+            text = text.strip(" \t\r\n")
+            if inline:
+                return " " + text + " "
+            if not text:
+                return "\n"
+            return "\n" + _LINE_RE.sub(lambda lm: "> " + lm.group(1) if lm.group(1) else ">", text) + "\n\n"
+        if name == "br":
+            return " " if inline else "  \n"
+        if name == "hr":
+            return "\n\n---\n\n"
+        if name in ("td", "th"):
+            return " " + text.strip().replace("\n", " ") + " |" * _colspan(el)
+        if name == "tr":
+            return self._tr(el, text)
+        if name == "table":
+            return "\n\n" + text.strip() + "\n\n"
+        if name == "caption":
+            return text.strip() + "\n\n"
+        if name == "figcaption":
+            return "\n\n" + text.strip() + "\n\n"
+        if name == "img":
+            alt, src, title = el.get("alt") or "", el.get("src") or "", el.get("title") or ""
+            if inline:
+                return alt
+            title_part = ' "%s"' % title.replace('"', r'\"') if title else ""
+            return f"![{alt}]({src}{title_part})"
+        if name == "dt":
+            text = _ALL_WS_RE.sub(" ", (text or "").strip())
+            if inline:
+                return " " + text + " "
+            return f"\n\n{text}\n" if text else "\n"
+        if name == "dd":
+            text = (text or "").strip()
+            if inline:
+                return " " + text + " "
+            if not text:
+                return "\n"
+            text = _LINE_RE.sub(lambda lm: "    " + lm.group(1) if lm.group(1) else "", text)
+            return ":" + text[1:] + "\n"
+        if name == "q":
+            return '"' + text + '"'
+        if name in ("script", "style"):
+            return ""
+        if name == "video":
+            if inline:
+                return text
+            src = el.get("src") or next((s.get("src") for s in el.iter("source") if s.get("src") is not None), "")
+            poster = el.get("poster") or ""
+            if src and poster:
+                return f"[![{text}]({poster})]({src})"
+            if src:
+                return f"[{text}]({src})"
+            return f"![{text}]({poster})" if poster else text
+        return text
+
+    def _li(self, el: Any, text: str) -> str:
+        text = (text or "").strip()
+        if not text:
+            return "\n"
+        parent = self._parent(el)
+        if parent is not None and parent.tag == "ol":
+            start = parent.get("start") or ""
+            number = int(start) if start.isdigit() else 1
+            bullet = f"{number + sum(1 for _ in el.itersiblings('li', preceding=True))}. "
+        else:
+            depth = -1
+            node = el
+            while node is not None:
+                if node.tag == "ul":
+                    depth += 1
+                node = self._parent(node)
+            bullet = _BULLETS[depth % len(_BULLETS)] + " "
+        indent = " " * len(bullet)
+        text = _LINE_RE.sub(lambda lm: indent + lm.group(1) if lm.group(1) else "", text)
+        return bullet + text[len(bullet):] + "\n"
+
+    def _tr(self, el: Any, text: str) -> str:
+        cells = list(el.iterdescendants("td", "th"))
+        parent = self._parent(el)
+        parent_name = parent.tag if parent is not None else ""
+        first_row = self._prev_element(el) is None
+        head_row = all(cell.tag == "th" for cell in cells) or (
+            parent_name == "thead" and sum(1 for _ in parent.iterdescendants("tr")) == 1
+        )
+        if parent_name == "tbody":
+            scope = parent if parent is self.root else parent.getparent()
+            head_missing = first_row and next(scope.iterdescendants("thead"), None) is None
+        else:
+            head_missing = first_row
+        columns = sum(_colspan(cell) for cell in cells)
+        separator = "| " + " | ".join(["---"] * columns) + " |\n"
+        if head_row and first_row:
+            return "|" + text + "\n" + separator
+        if head_missing or (first_row and (parent_name == "table" or (
+                parent_name == "tbody" and self._prev_element(parent) is None))):
+            return "| " + " | ".join([""] * columns) + " |\n" + separator + "|" + text + "\n"
+        return "|" + text + "\n"
+
+
+def _bs4_clean(content: str, main_content: bool) -> tuple:
+    """无 lxml 时的回退路径：返回 (title, 已清理的 soup 子树)。"""
+    soup = BeautifulSoup(content, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    if not main_content:
+        for el in soup.find_all(list(_FULL_PAGE_STRIP_TAGS)):
+            if not el.decomposed:
+                el.decompose()
+        return title, soup
+    root = soup.body or soup
+    for tag, attr, value in _MAIN_CANDIDATES:
+        found = soup.find_all(tag) if attr is None else soup.find_all(attrs={attr: value})
+        el = next((e for e in found if len(e.get_text(" ", strip=True)) >= _MIN_MAIN_TEXT), None)
+        if el is not None:
+            root = el
+            break
+    root_len = len(root.get_text(" ", strip=True)) or 1
+
+    def match(tag: Any) -> bool:
+        ident = " ".join(tag.get("class") or []) + " " + (tag.get("id") or "")
+        return _is_boilerplate(tag.name, ident, tag.get("aria-hidden"), tag.get("hidden") is not None)
+
+    for el in root.find_all(match):
+        if not el.decomposed and _should_drop(
+            el.name, lambda: len(el.get_text(" ", strip=True)), lambda: el.find("h1") is not None, root_len
+        ):
+            el.decompose()
+    return title, root
+
+
+def html_to_markdown(content: str, main_content: bool = True) -> str:
+    root = None
+    if lxml_html is not None:
+        try:
+            title, root = _lxml_clean(content, main_content)
+        except (ValueError, etree.LxmlError):
+            root = None
+    if root is not None:
+        md = _LxmlMarkdown(root).convert()
+        has_h1 = next(root.iter("h1"), None) is not None
+    elif BeautifulSoup is None:
+        return content
+    else:
+        title, soup = _bs4_clean(content, main_content)
+        md = MarkdownConverter(heading_style="ATX").convert_soup(soup)
+        has_h1 = soup.find("h1") is not None
+    md = _BLANK_LINES_RE.sub("\n\n", md).strip()
+    if title and main_content and not has_h1:
+        md = f"# {title}\n\n{md}"
+    return md
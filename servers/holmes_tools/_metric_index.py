@@ -0,0 +1,164 @@
+"""
+Prometheus 指标目录的本地索引：缓存 metric 名、label 名与 metadata（HELP/TYPE），
+支持子串/前缀/三元组（trigram）模糊搜索，只返回最相关的若干条，而不是整个目录。
+
+索引按 TTL 刷新：首次搜索时同步加载，过期后在后台线程刷新，刷新期间继续使用旧索引。
+"""
+import json
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+try:
+    from .mcp_logger import get_logger
+except ImportError:
+    from mcp_logger import get_logger
+
+_logger = get_logger("prometheus.metric_index")
+
+_TERM_SPLIT_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _terms(query: str) -> List[str]:
+    return [t for t in _TERM_SPLIT_RE.split(query.lower()) if t]
+
+
+class MetricIndex:
+    """
+    fetch(path, params) 与 prometheus._do_get 签名一致，返回 Prometheus API 的 JSON 文本。
+    """
+
+    def __init__(self, fetch: Callable[..., str], ttl: Callable[[], int]):
+        self._fetch = fetch
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._loaded_at = 0.0
+        self._names: List[str] = []
+        self._labels: List[str] = []
+        self._metadata: Dict[str, Dict[str, str]] = {}
+        self._trigram_index: Dict[str, Set[int]] = {}
+
+    def _get_data(self, path: str) -> Any:
+        body = json.loads(self._fetch(path))
+        if body.get("status") != "success":
+            raise RuntimeError(body.get("error", f"{path} failed"))
+        return body.get("data")
+
+    def refresh(self) -> None:
+        """重新拉取目录并重建索引；metadata 获取失败不影响名字索引。"""
+        t0 = time.monotonic()
+        names = sorted(self._get_data("api/v1/label/__name__/values") or [])
+        labels = sorted(self._get_data("api/v1/labels") or [])
+        metadata: Dict[str, Dict[str, str]] = {}
+        try:
+            for name, entries in (self._get_data("api/v1/metadata") or {}).items():
+                if entries:
+                    metadata[name] = {"type": entries[0].get("type", ""), "help": entries[0].get("help", "")}
+        except (RuntimeError, ValueError, AttributeError) as e:
+            _logger.warning(f"[metric_index] metadata 获取失败，仅索引名字: {e}")
+        trigram_index: Dict[str, Set[int]] = {}
+        for i, name in enumerate(names):
+            for tg in _trigrams(name.lower()):
+                trigram_index.setdefault(tg, set()).add(i)
+        with self._lock:
+            self._names, self._labels, self._metadata = names, labels, metadata
+            self._trigram_index = trigram_index
+            self._loaded_at = time.monotonic()
+        _logger.info(
+            f"[metric_index] 索引刷新完成 ({time.monotonic() - t0:.2f}s): "
+            f"{len(names)} metrics, {len(labels)} labels, {len(metadata)} metadata"
+        )
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            _logger.warning(f"[metric_index] 后台刷新失败，继续使用旧索引: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def ensure_fresh(self) -> None:
+        """未加载时同步加载；已过期时启动一次后台刷新（同一时刻至多一个）。"""
+        with self._lock:
+            loaded = self._loaded_at > 0
+            stale = time.monotonic() - self._loaded_at > self._ttl()
+            start_bg = loaded and stale and not self._refreshing
+            if start_bg:
+                self._refreshing = True
+        if not loaded:
+            self.refresh()
+        elif start_bg:
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def _score(self, name: str, query: str, terms: List[str], query_trigrams: Set[str]) -> float:
+        lname = name.lower()
+        help_text = self._metadata.get(name, {}).get("help", "").lower()
+        score = 0.0
+        if lname == query:
+            score += 100
+        elif lname.startswith(query):
+            score += 50
+        elif query in lname:
+            score += 30
+        for t in terms:
+            if t in lname:
+                score += 10 + (5 if lname.startswith(t) else 0)
+            elif t in help_text:
+                score += 3
+        if query_trigrams:
+            name_trigrams = _trigrams(lname)
+            score += 10 * len(query_trigrams & name_trigrams) / len(query_trigrams | name_trigrams)
+        return score
+
+    def search(self, query: str, limit: int = 20, metric_type: Optional[str] = None) -> Dict[str, Any]:
+        self.ensure_fresh()
+        with self._lock:
+            names, labels, trigram_index = self._names, self._labels, self._trigram_index
+        q = query.strip().lower()
+        terms = _terms(q)
+        q_compact = "_".join(terms)
+        query_trigrams = _trigrams(q_compact) if q_compact else set()
+        # 候选集：与查询共享任一 trigram 的名字（覆盖子串/模糊匹配）；短词另外做一次全量子串扫描
+        candidates: Set[int] = set()
+        for tg in query_trigrams:
+            candidates |= trigram_index.get(tg, set())
+        if any(len(t) < 3 for t in terms) or not candidates:
+            candidates |= {i for i, n in enumerate(names) if any(t in n.lower() for t in terms)}
+        if self._metadata and terms:
+            candidates |= {
+                i for i, n in enumerate(names)
+                if any(t in self._metadata.get(n, {}).get("help", "").lower() for t in terms)
+            }
+        scored = []
+        for i in candidates:
+            name = names[i]
+            meta = self._metadata.get(name, {})
+            if metric_type and meta.get("type") != metric_type:
+                continue
+            score = self._score(name, q_compact, terms, query_trigrams)
+            if score >= 3:
+                scored.append((score, name))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        matches = []
+        for score, name in scored[:limit]:
+            entry: Dict[str, Any] = {"name": name, "score": round(score, 2)}
+            meta = self._metadata.get(name)
+            if meta:
+                entry.update({k: v for k, v in meta.items() if v})
+            matches.append(entry)
+        return {
+            "query": query,
+            "total_metrics": len(names),
+            "total_matches": len(scored),
+            "matches": matches,
+            "labels": [lb for lb in labels if any(t in lb.lower() for t in terms)][:limit],
+            "index_age_seconds": round(time.monotonic() - self._loaded_at, 1),
+        }
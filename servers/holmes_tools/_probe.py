@@ -0,0 +1,277 @@
+"""
+Async network probes for the connectivity tools.
+
+Each tool call runs its own event loop (tool calls already execute in worker threads), with a
+semaphore capping concurrent sockets. Name resolution goes through a process-wide DNS cache
+(CONNECTIVITY_DNS_TTL seconds, default 30) and concurrent lookups of the same host share one query.
+
+latency_probe times DNS, TCP connect, TLS handshake and HTTP time-to-first-byte separately over
+several sequential attempts; its DNS lookups bypass the cache so every attempt measures the resolver.
+"""
+import asyncio
+import ipaddress
+import math
+import socket
+import ssl
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_dns_lock = threading.Lock()
+_dns_cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class Resolver:
+    """Per-call resolver: shared TTL cache plus in-flight de-duplication within the call's loop."""
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._inflight: Dict[Tuple[str, int], "asyncio.Future"] = {}
+
+    async def resolve(self, host: str, port: int, use_cache: bool = True) -> Tuple[List[str], bool]:
+        """Returns (addresses, from_cache). Raises OSError on resolution failure."""
+        if _is_ip(host):
+            return [host], True
+        key = (host, port)
+        if use_cache and self._ttl > 0:
+            with _dns_lock:
+                hit = _dns_cache.get(key)
+            if hit and hit[0] > time.monotonic():
+                return hit[1], True
+            if key in self._inflight:
+                return await asyncio.shield(self._inflight[key]), True
+        fut = asyncio.get_running_loop().create_future()
+        if use_cache:
+            self._inflight[key] = fut
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            addrs = list(dict.fromkeys(info[4][0] for info in infos))
+            if self._ttl > 0:
+                with _dns_lock:
+                    _dns_cache[key] = (time.monotonic() + self._ttl, addrs)
+            fut.set_result(addrs)
+            return addrs, False
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # 标记已取回，避免无人等待时的告警
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+async def _connect(
+    addrs: List[str], port: int, timeout: float
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, str, float]:
+    """Tries each address in turn within the remaining budget; returns (reader, writer, address, connect_seconds)."""
+    deadline = time.monotonic() + timeout
+    last_error: Optional[BaseException] = None
+    for addr in addrs:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        t0 = time.monotonic()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(addr, port), remaining)
+            return reader, writer, addr, time.monotonic() - t0
+        except (OSError, asyncio.TimeoutError) as e:
+            last_error = e
+    if isinstance(last_error, asyncio.TimeoutError) or last_error is None:
+        raise socket.timeout("timed out after {}s".format(timeout))
+    raise last_error
+
+
+async def _close(writer: asyncio.StreamWriter) -> None:
+    writer.close()
+    try:
+        await asyncio.wait_for(writer.wait_closed(), 1.0)
+    except Exception:
+        pass
+
+
+async def tcp_probe(resolver: Resolver, host: str, port: int, timeout: float) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {"target": "{}:{}".format(host, port), "host": host, "port": port}
+    t0 = time.monotonic()
+    if _is_ip(host):
+        addrs = [host]
+    else:
+        try:
+            addrs, cached = await asyncio.wait_for(resolver.resolve(host, port), timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            entry.update(ok=False, stage="dns", error=str(e) or "dns timeout")
+            return entry
+        entry["dns_ms"] = _ms(time.monotonic() - t0)
+        entry["dns_cached"] = cached
+    try:
+        _, writer, addr, connect_s = await _connect(addrs, port, max(0.001, timeout - (time.monotonic() - t0)))
+    except (OSError, asyncio.TimeoutError) as e:
+        entry.update(ok=False, stage="connect", error=str(e) or type(e).__name__)
+        return entry
+    await _close(writer)
+    entry.update(ok=True, address=addr, connect_ms=_ms(connect_s))
+    return entry
+
+
+async def _bounded(sem: asyncio.Semaphore, coro) -> Dict[str, Any]:
+    async with sem:
+        return await coro
+
+
+async def _tcp_batch(
+    targets: List[Tuple[str, int]], timeout: float, concurrency: int, dns_ttl: float
+) -> List[Dict[str, Any]]:
+    resolver = Resolver(dns_ttl)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    return await asyncio.gather(*(_bounded(sem, tcp_probe(resolver, h, p, timeout)) for h, p in targets))
+
+
+def run_tcp_batch(
+    targets: List[Tuple[str, int]], timeout: float, concurrency: int, dns_ttl: float
+) -> List[Dict[str, Any]]:
+    return asyncio.run(_tcp_batch(targets, timeout, concurrency, dns_ttl))
+
+
+_PHASES = ("dns", "connect", "tls", "ttfb", "total")
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    # nearest-rank 百分位：小样本下 p99 即最大值，不做插值
+    return {
+        "min": _ms(ordered[0]),
+        "median": _ms(statistics.median(ordered)),
+        "p99": _ms(ordered[max(0, math.ceil(0.99 * len(ordered)) - 1)]),
+        "max": _ms(ordered[-1]),
+        "samples": len(ordered),
+    }
+
+
+async def _latency_attempt(
+    resolver: Resolver, host: str, port: int, tls: bool, http: Optional[Dict[str, str]], insecure: bool
+) -> Dict[str, Any]:
+    """One attempt; returns {"phases": {phase: seconds}, ...} or {"error", "stage", "phases"}."""
+    loop = asyncio.get_running_loop()
+    phases: Dict[str, float] = {}
+    result: Dict[str, Any] = {"phases": phases}
+    stage = "dns"
+    sock = None
+    writer = None
+    start = time.monotonic()
+    try:
+        if _is_ip(host):
+            addrs = [host]
+        else:
+            t0 = time.monotonic()
+            addrs, _ = await resolver.resolve(host, port, use_cache=False)
+            phases["dns"] = time.monotonic() - t0
+
+        stage = "connect"
+        addr = addrs[0]
+        family = socket.AF_INET6 if ":" in addr else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        t0 = time.monotonic()
+        await loop.sock_connect(sock, (addr, port))
+        phases["connect"] = time.monotonic() - t0
+        result["address"] = addr
+
+        stage = "tls" if tls else "http"
+        ctx = None
+        if tls:
+            ctx = ssl.create_default_context()
+            if insecure:
+                ctx.check_hostname = False
+                ctx.verify_mode = ssl.CERT_NONE
+        t0 = time.monotonic()
+        reader, writer = await asyncio.open_connection(
+            sock=sock, ssl=ctx, server_hostname=host if tls else None
+        )
+        sock = None
+        if tls:
+            phases["tls"] = time.monotonic() - t0
+            ssl_obj = writer.get_extra_info("ssl_object")
+            if ssl_obj is not None:
+                result["tls_version"] = ssl_obj.version()
+
+        if http is not None:
+            stage = "http"
+            request = (
+                "{method} {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: holmes-mcp-latency-probe\r\n"
+                "Accept: */*\r\nConnection: close\r\n\r\n"
+            ).format(**http)
+            t0 = time.monotonic()
+            writer.write(request.encode("latin-1"))
+            await writer.drain()
+            status_line = await reader.readline()
+            phases["ttfb"] = time.monotonic() - t0
+            parts = status_line.decode("latin-1").split()
+            if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+                raise OSError("invalid HTTP status line: {!r}".format(status_line[:80]))
+            result["status"] = int(parts[1])
+        phases["total"] = time.monotonic() - start
+    except (OSError, ssl.SSLError, ValueError) as e:
+        result.update(stage=stage, error=str(e) or type(e).__name__)
+    finally:
+        if writer is not None:
+            await _close(writer)
+        if sock is not None:
+            sock.close()
+    return result
+
+
+async def _latency(
+    host: str, port: int, tls: bool, http: Optional[Dict[str, str]], attempts: int, interval: float,
+    timeout: float, insecure: bool,
+) -> Dict[str, Any]:
+    resolver = Resolver(0)
+    samples: Dict[str, List[float]] = {phase: [] for phase in _PHASES}
+    errors: List[Dict[str, Any]] = []
+    statuses: Dict[str, int] = {}
+    extra: Dict[str, Any] = {}
+    for i in range(attempts):
+        if i and interval > 0:
+            await asyncio.sleep(interval)
+        try:
+            res = await asyncio.wait_for(_latency_attempt(resolver, host, port, tls, http, insecure), timeout)
+        except asyncio.TimeoutError:
+            res = {"stage": "timeout", "error": "attempt timed out after {}s".format(timeout), "phases": {}}
+        if "error" in res:
+            errors.append({"attempt": i + 1, "stage": res["stage"], "error": res["error"]})
+            continue
+        for phase, value in res["phases"].items():
+            samples[phase].append(value)
+        if "status" in res:
+            statuses[str(res["status"])] = statuses.get(str(res["status"]), 0) + 1
+        for key in ("address", "tls_version"):
+            if key in res:
+                extra[key] = res[key]
+    out: Dict[str, Any] = {
+        "attempts": attempts,
+        "succeeded": attempts - len(errors),
+        "phases_ms": {phase: _stats(values) for phase, values in samples.items() if values},
+    }
+    out.update(extra)
+    if statuses:
+        out["http_status"] = statuses
+    if errors:
+        out["errors"] = errors
+    return out
+
+
+def run_latency_probe(
+    host: str, port: int, tls: bool, http: Optional[Dict[str, str]], attempts: int, interval: float,
+    timeout: float, insecure: bool,
+) -> Dict[str, Any]:
+    return asyncio.run(_latency(host, port, tls, http, attempts, interval, timeout, insecure))
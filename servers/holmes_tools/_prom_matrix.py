@@ -0,0 +1,283 @@
+"""
+Prometheus matrix 结果的向量化处理：将 range query 的 JSON 解析为 NumPy 数组，
+输出逐序列统计摘要（summary）、LTTB 降采样（downsample）或列式编码（columnar），
+显著减少返回给 LLM 的文本量。
+依赖：numpy（未安装时由调用方返回错误提示，raw 模式不受影响）；orjson 可选，存在时用于快速解析/序列化。
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+OUTPUT_MODES = ("raw", "summary", "downsample", "columnar")
+INSTANT_OUTPUT_MODES = ("raw", "columnar")
+DEFAULT_MAX_POINTS = 100
+
+# 斜率相对均值的变化小于该比例（按整个窗口计）时视为 flat
+_FLAT_RATIO = 0.05
+
+
+def loads(text: str) -> Any:
+    """解析 Prometheus 响应；orjson 可用时走快速路径（其 JSONDecodeError 是 json.JSONDecodeError 的子类）。"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _num(v: float) -> Any:
+    """JSON 友好的数值：NaN -> None，±Inf -> 字符串，其余保留 6 位有效数字。"""
+    if v != v:
+        return None
+    if v in (float("inf"), float("-inf")):
+        return "+Inf" if v > 0 else "-Inf"
+    return float(f"{v:.6g}")
+
+
+def _ts(v: float) -> Any:
+    """时间戳保留毫秒精度，整秒输出为 int。"""
+    v = round(float(v), 3)
+    return int(v) if v.is_integer() else v
+
+
+def parse_matrix(result: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], "np.ndarray", "np.ndarray"]:
+    """
+    将 matrix result 对齐到共享时间轴：
+    返回 (metrics, timestamps[T], values[N, T])，缺失点为 NaN。
+    Prometheus 的值是字符串（含 "NaN"/"+Inf"），由 NumPy 一次性转换为 float。
+    """
+    metrics = [s.get("metric") or {} for s in result]
+    per_series = [s.get("values") or [] for s in result]
+    lengths = np.fromiter((len(v) for v in per_series), dtype=np.int64, count=len(per_series))
+    total = int(lengths.sum())
+    if total == 0:
+        return metrics, np.empty(0), np.empty((len(metrics), 0))
+    flat = [p for values in per_series for p in values]
+    ts = np.fromiter((p[0] for p in flat), dtype=np.float64, count=total)
+    vals = np.array([p[1] for p in flat], dtype=np.float64)
+    timestamps, col = np.unique(ts, return_inverse=True)
+    row = np.repeat(np.arange(len(metrics)), lengths)
+    grid = np.full((len(metrics), len(timestamps)), np.nan)
+    grid[row, col] = vals
+    return metrics, timestamps, grid
+
+
+def summarize(timestamps: "np.ndarray", grid: "np.ndarray") -> List[Dict[str, Any]]:
+    """逐序列 min/max/mean/p95/last 与线性趋势，全部按行向量化计算。"""
+    n_series = grid.shape[0]
+    if grid.shape[1] == 0:
+        return [{"count": 0} for _ in range(n_series)]
+    finite = np.isfinite(grid)
+    count = finite.sum(axis=1)
+    masked = np.where(finite, grid, np.nan)
+    has = count > 0
+    safe = np.where(has[:, None], masked, 0.0)  # 避免全 NaN 行触发 RuntimeWarning
+    mins = np.where(has, np.nanmin(safe, axis=1), np.nan)
+    maxs = np.where(has, np.nanmax(safe, axis=1), np.nan)
+    means = np.where(has, np.nanmean(safe, axis=1), np.nan)
+    p95 = np.where(has, np.nanpercentile(safe, 95, axis=1), np.nan)
+    last_idx = grid.shape[1] - 1 - np.argmax(finite[:, ::-1], axis=1)
+    last = np.where(has, grid[np.arange(n_series), last_idx], np.nan)
+    last_ts = np.where(has, timestamps[last_idx], np.nan)
+
+    # 最小二乘斜率（每秒），仅使用有限值
+    t = timestamps - timestamps[0]
+    w = finite.astype(np.float64)
+    n = np.maximum(count, 1)
+    t_mean = (w * t).sum(axis=1) / n
+    dt = np.where(finite, t[None, :] - t_mean[:, None], 0.0)
+    dv = np.where(finite, grid - np.where(has, means, 0.0)[:, None], 0.0)
+    denom = (dt * dt).sum(axis=1)
+    slope = np.where(denom > 0, (dt * dv).sum(axis=1) / np.where(denom > 0, denom, 1.0), 0.0)
+    window = t[-1] if len(t) else 0.0
+    change = slope * window
+    scale = np.maximum(np.abs(means), np.abs(maxs - mins))
+    flat = np.abs(change) <= _FLAT_RATIO * np.where(np.isfinite(scale) & (scale > 0), scale, np.inf)
+
+    out = []
+    for i in range(n_series):
+        if not has[i]:
+            out.append({"count": 0})
+            continue
+        out.append({
+            "count": int(count[i]),
+            "min": _num(mins[i]),
+            "max": _num(maxs[i]),
+            "mean": _num(means[i]),
+            "p95": _num(p95[i]),
+            "last": _num(last[i]),
+            "last_ts": _ts(last_ts[i]),
+            "trend": "flat" if flat[i] else ("rising" if slope[i] > 0 else "falling"),
+            "slope_per_hour": _num(slope[i] * 3600),
+        })
+    return out
+
+
+def lttb(x: "np.ndarray", y: "np.ndarray", max_points: int) -> "np.ndarray":
+    """Largest-Triangle-Three-Buckets 降采样，返回保留点的下标；每个桶内的三角形面积向量化计算。"""
+    n = len(x)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 3:
+        return np.linspace(0, n - 1, max(max_points, 1)).astype(np.int64)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(timestamps: "np.ndarray", grid: "np.ndarray", max_points: int) -> List[List[List[Any]]]:
+    """逐序列丢弃非有限值后做 LTTB，返回 [[ts, value], ...] 列表（值为数字而非字符串）。"""
+    out = []
+    for row in grid:
+        mask = np.isfinite(row)
+        x, y = timestamps[mask], row[mask]
+        idx = lttb(x, y, max_points)
+        out.append([[_ts(x[j]), _num(y[j])] for j in idx])
+    return out
+
+
+def _factor_labels(metrics: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """提取所有序列共有的 label（common），每条序列只保留差异部分。"""
+    if not metrics:
+        return {}, []
+    common = dict(metrics[0])
+    for m in metrics[1:]:
+        for k in list(common):
+            if m.get(k) != common[k]:
+                del common[k]
+    return common, [{k: v for k, v in m.items() if k not in common} for m in metrics]
+
+
+def _encode_timestamps(timestamps: List[float]) -> Any:
+    """等间隔时间轴压缩为 {start, step, count}，否则输出完整列表。"""
+    if len(timestamps) > 2:
+        step = round(timestamps[1] - timestamps[0], 3)
+        if step > 0 and all(
+            abs(timestamps[i + 1] - timestamps[i] - step) < 1e-6 for i in range(len(timestamps) - 1)
+        ):
+            return {"start": _ts(timestamps[0]), "step": _ts(step), "count": len(timestamps)}
+    return [_ts(t) for t in timestamps]
+
+
+def _column(row: "np.ndarray") -> List[Any]:
+    """一条序列的值列：非有限值（缺失/NaN/Inf）输出 null。"""
+    col = row.astype(object)
+    col[~np.isfinite(row)] = None
+    return col.tolist()
+
+
+def _columnar_matrix(result: List[Dict[str, Any]]) -> Dict[str, Any]:
+    metrics, timestamps, grid = parse_matrix(result)
+    common, labels = _factor_labels(metrics)
+    return {
+        "common_labels": common,
+        "labels": labels,
+        "timestamps": _encode_timestamps(timestamps.tolist()),
+        "values": [_column(row) for row in grid],
+    }
+
+
+def _columnar_vector(result: List[Dict[str, Any]]) -> Dict[str, Any]:
+    metrics = [s.get("metric") or {} for s in result]
+    common, labels = _factor_labels(metrics)
+    samples = [s.get("value") or [None, None] for s in result]
+    ts = {p[0] for p in samples}
+    out: Dict[str, Any] = {"common_labels": common, "labels": labels}
+    if len(ts) == 1:
+        out["timestamp"] = _ts(next(iter(ts)))
+    else:
+        out["timestamps"] = [_ts(p[0]) for p in samples]
+    values: List[Any] = []
+    for p in samples:
+        try:
+            v = float(p[1])
+        except (TypeError, ValueError):
+            values.append(None)
+            continue
+        values.append(v if v - v == 0 else None)
+    out["values"] = values
+    return out
+
+
+def render(body: Dict[str, Any], mode: str, max_points: Optional[int] = None) -> Dict[str, Any]:
+    """
+    将 Prometheus 成功响应按 mode 转换；不适用的 resultType 或错误响应原样返回。
+    summary：每条序列一行统计；downsample：每条序列至多 max_points 个点；
+    columnar：共享时间列 + 每序列一列值 + 公共 label 提取（matrix 与 vector 均支持）。
+    """
+    data = body.get("data") or {}
+    result_type = data.get("resultType")
+    if body.get("status") != "success":
+        return body
+    if mode == "columnar" and result_type == "vector":
+        out = {"status": "success", "output": mode, "resultType": result_type}
+        out.update(_columnar_vector(data.get("result") or []))
+    elif result_type != "matrix":
+        return body
+    elif np is None:
+        return {"error": f"install 'numpy' to use output={mode}."}
+    elif mode == "columnar":
+        out = {"status": "success", "output": mode, "resultType": result_type}
+        out.update(_columnar_matrix(data.get("result") or []))
+    else:
+        out = _render_stats(data.get("result") or [], mode, max_points)
+    for key in ("warnings", "partial"):
+        if key in body:
+            out[key] = body[key]
+    return out
+
+
+def _render_stats(result: List[Dict[str, Any]], mode: str, max_points: Optional[int]) -> Dict[str, Any]:
+    metrics, timestamps, grid = parse_matrix(result)
+    out: Dict[str, Any] = {
+        "status": "success",
+        "output": mode,
+        "resultType": "matrix",
+        "series_count": len(metrics),
+        "points": int(np.isfinite(grid).sum()),
+    }
+    if len(timestamps):
+        out["start"], out["end"] = _ts(timestamps[0]), _ts(timestamps[-1])
+    if mode == "summary":
+        out["series"] = [dict(metric=m, **s) for m, s in zip(metrics, summarize(timestamps, grid))]
+    else:
+        budget = max_points or DEFAULT_MAX_POINTS
+        out["max_points"] = budget
+        out["series"] = [
+            {"metric": m, "values": v} for m, v in zip(metrics, downsample(timestamps, grid, budget))
+        ]
+    return out
+
+
+def render_text(text: str, mode: str, max_points: Optional[int] = None) -> str:
+    """render 的字符串版本：解析失败（如错误信息）时原样返回。"""
+    try:
+        body = loads(text)
+    except json.JSONDecodeError:
+        return text
+    if not isinstance(body, dict):
+        return text
+    return dumps(render(body, mode, max_points))
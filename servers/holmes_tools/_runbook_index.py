@@ -0,0 +1,292 @@
+"""
+In-memory runbook index for the runbook tools.
+
+Markdown files under every RUNBOOK_SEARCH_PATH directory are discovered (recursively when the caller
+enables it, hidden and vendor directories skipped, at most RUNBOOK_MAX_FILES files), their contents cached
+and indexed for BM25 search. Nothing is scanned until the first lookup; after that the tree is rescanned
+at most every RUNBOOK_INDEX_TTL seconds (default 10); only files whose mtime or size changed are reread
+and re-indexed. Each entry also carries its heading/section index (see sections()).
+"""
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ._documents import build_toc
+
+_SKIP_DIRS = {"node_modules", "__pycache__", "venv", ".venv", "site-packages"}
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9_.-]*[a-z0-9]|[a-z0-9]|[一-鿿]+")
+_H1_RE = re.compile(r"^#\s+(.+?)\s*#*\s*$", re.MULTILINE)
+# BM25 参数；标题和路径中的词按 _TITLE_BOOST 倍计入词频
+_K1 = 1.2
+_B = 0.75
+_TITLE_BOOST = 3
+
+
+def _bm25_term(tf: int, df: int, n: int, length: int, avg_len: float) -> float:
+    idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+    return idf * tf * (_K1 + 1) / (tf + _K1 * (1 - _B + _B * length / avg_len))
+
+
+def tokenize(text: str) -> List[str]:
+    """小写英文/数字词（含 a.b-c 形式拆出的子词）；连续汉字按二元组切分。"""
+    tokens: List[str] = []
+    for word in _WORD_RE.findall(text.lower()):
+        if "一" <= word[0] <= "鿿":
+            tokens.extend(word if len(word) == 1 else (word[i:i + 2] for i in range(len(word) - 1)))
+            continue
+        tokens.append(word)
+        parts = re.split(r"[_.-]+", word)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+
+def _build_sections(content: str) -> List[Dict[str, Any]]:
+    """
+    Headings with breadcrumb path, subtree span (offset..end) and own-text span (offset..body_end),
+    plus a preamble pseudo-section for text before the first heading.
+    """
+    toc = build_toc(content)
+    sections: List[Dict[str, Any]] = []
+    if not toc or toc[0]["offset"] > 0 and content[: toc[0]["offset"]].strip():
+        end = toc[0]["offset"] if toc else len(content)
+        sections.append(
+            {"level": 0, "title": "(preamble)", "path": "(preamble)", "offset": 0, "end": end, "body_end": end,
+             "line": 1}
+        )
+    stack: List[Dict[str, Any]] = []
+    for i, h in enumerate(toc):
+        while stack and stack[-1]["level"] >= h["level"]:
+            stack.pop()
+        stack.append(h)
+        body_end = toc[i + 1]["offset"] if i + 1 < len(toc) else len(content)
+        sections.append(
+            {
+                "level": h["level"],
+                "title": h["title"],
+                "path": " > ".join(x["title"] for x in stack),
+                "offset": h["offset"],
+                "end": h["end"],
+                "body_end": body_end,
+                "line": content.count("\n", 0, h["offset"]) + 1,
+            }
+        )
+    return sections
+
+
+def find_section(sections: List[Dict[str, Any]], name: str) -> Optional[Dict[str, Any]]:
+    """Exact title or breadcrumb match (case-insensitive) first, then substring."""
+    q = name.strip().lower()
+    for sec in sections:
+        if sec["title"].lower() == q or sec["path"].lower() == q:
+            return sec
+    for sec in sections:
+        if q in sec["path"].lower():
+            return sec
+    return None
+
+
+def rank_sections(entry: Dict[str, Any], query: str, limit: int) -> List[Tuple[float, Dict[str, Any]]]:
+    """BM25 over a runbook's sections (own text + breadcrumb); section term counts are cached on the entry."""
+    sections = entry["sections"]
+    if "section_tf" not in entry:
+        content = entry["content"]
+        entry["section_tf"] = [
+            Counter(tokenize(content[sec["offset"]:sec["body_end"]] + " " + sec["path"])) for sec in sections
+        ]
+    tfs = entry["section_tf"]
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not sections or not terms:
+        return []
+    n = len(sections)
+    lengths = [sum(tf.values()) or 1 for tf in tfs]
+    avg_len = sum(lengths) / n
+    scores = [0.0] * n
+    for term in terms:
+        df = sum(1 for tf in tfs if term in tf)
+        if not df:
+            continue
+        for i, tf in enumerate(tfs):
+            if term in tf:
+                scores[i] += _bm25_term(tf[term], df, n, lengths[i], avg_len)
+    ranked = sorted((i for i in range(n) if scores[i] > 0), key=lambda i: -scores[i])[:limit]
+    return [(scores[i], sections[i]) for i in ranked]
+
+
+class RunbookIndex:
+    def __init__(
+        self,
+        search_paths: Callable[[], List[str]],
+        ttl: Callable[[], int],
+        max_files: Callable[[], int],
+        recursive: Callable[[], bool] = lambda: True,
+    ):
+        self._search_paths = search_paths
+        self._ttl = ttl
+        self._max_files = max_files
+        self._recursive = recursive
+        self._lock = threading.Lock()
+        self._paths: Tuple[str, ...] = ()
+        self._walk_recursive = True
+        self._scanned_at = 0.0
+        # key: (base, rel) -> entry
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[Tuple[str, str], int]] = {}
+        self._total_len = 0
+
+    # ---- 扫描与增量索引 ----
+
+    def _walk(self, base: str, limit: int, recursive: bool) -> Dict[str, os.stat_result]:
+        found: Dict[str, os.stat_result] = {}
+        for root, dirs, files in os.walk(base, followlinks=False):
+            if recursive:
+                dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in _SKIP_DIRS)
+            else:
+                dirs[:] = []
+            for name in sorted(files):
+                if not name.endswith(".md") or name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                # 与 _resolve_runbook_path 一致：指向搜索目录之外的符号链接不收录
+                if not os.path.realpath(path).startswith(base + os.sep):
+                    continue
+                try:
+                    found[os.path.relpath(path, base).replace(os.sep, "/")] = os.stat(path)
+                except OSError:
+                    continue
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def _unindex(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for term in entry["tf"]:
+            docs = self._postings.get(term)
+            if docs is not None:
+                docs.pop(key, None)
+                if not docs:
+                    del self._postings[term]
+        self._total_len -= entry["length"]
+
+    def _index(self, key: Tuple[str, str], st: os.stat_result) -> None:
+        base, rel = key
+        path = os.path.join(base, rel)
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
+        except OSError:
+            return
+        m = _H1_RE.search(content)
+        title = m.group(1).strip() if m else os.path.splitext(os.path.basename(rel))[0]
+        tf = Counter(tokenize(content))
+        for term in tokenize(title + " " + rel.replace("/", " ")):
+            tf[term] += _TITLE_BOOST
+        length = sum(tf.values())
+        entry = {
+            "id": rel, "base": base, "path": path, "title": title, "content": content,
+            "mtime": st.st_mtime, "size": st.st_size, "tf": tf, "length": length,
+            "sections": _build_sections(content),
+        }
+        self._entries[key] = entry
+        for term, count in tf.items():
+            self._postings.setdefault(term, {})[key] = count
+        self._total_len += length
+
+    def refresh(self, force: bool = False) -> None:
+        paths = tuple(self._search_paths())
+        recursive = bool(self._recursive())
+        with self._lock:
+            fresh = self._scanned_at and time.monotonic() - self._scanned_at < self._ttl()
+            if not force and paths == self._paths and recursive == self._walk_recursive and fresh:
+                return
+            if paths != self._paths or recursive != self._walk_recursive:
+                self._entries.clear()
+                self._postings.clear()
+                self._total_len = 0
+                self._paths = paths
+                self._walk_recursive = recursive
+            seen = set()
+            remaining = self._max_files()
+            for base in paths:
+                if remaining <= 0:
+                    break
+                found = self._walk(base, remaining, recursive)
+                remaining -= len(found)
+                for rel, st in found.items():
+                    key = (base, rel)
+                    seen.add(key)
+                    entry = self._entries.get(key)
+                    if entry is not None and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+                        continue
+                    self._unindex(key)
+                    self._index(key, st)
+            for key in [k for k in self._entries if k not in seen]:
+                self._unindex(key)
+            self._scanned_at = time.monotonic()
+
+    # ---- 查询 ----
+
+    def entries(self) -> List[Dict[str, Any]]:
+        self.refresh()
+        with self._lock:
+            return [self._entries[k] for k in sorted(self._entries, key=lambda k: (self._paths.index(k[0]), k[1]))]
+
+    def get(self, runbook_id: str) -> Optional[Dict[str, Any]]:
+        """Exact relative path in search-path order, then a unique match on file name."""
+        self.refresh()
+        rel = runbook_id.strip().lstrip("/").replace(os.sep, "/")
+        with self._lock:
+            for base in self._paths:
+                entry = self._entries.get((base, rel))
+                if entry is not None:
+                    return entry
+            by_name = [e for e in self._entries.values() if e["id"].rsplit("/", 1)[-1] == rel]
+        return by_name[0] if len(by_name) == 1 else None
+
+    def search(self, query: str, limit: int) -> List[Tuple[float, Dict[str, Any]]]:
+        self.refresh()
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            n = len(self._entries)
+            if not n or not terms:
+                return []
+            avg_len = self._total_len / n
+            scores: Dict[Tuple[str, str], float] = {}
+            for term in terms:
+                docs = self._postings.get(term)
+                if not docs:
+                    continue
+                for key, tf in docs.items():
+                    score = _bm25_term(tf, len(docs), n, self._entries[key]["length"], avg_len)
+                    scores[key] = scores.get(key, 0.0) + score
+            ranked = sorted(scores.items(), key=lambda kv: -kv[1])[:limit]
+            return [(score, self._entries[key]) for key, score in ranked]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "runbooks": len(self._entries),
+                "terms": len(self._postings),
+                "search_paths": list(self._paths),
+                "age_seconds": round(time.monotonic() - self._scanned_at, 1) if self._scanned_at else None,
+            }
+
+
+def snippet(content: str, query: str, width: int = 200) -> str:
+    """The line sharing the most terms with the query, trimmed to width."""
+    terms = set(tokenize(query))
+    best, best_hits = "", 0
+    for line in content.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        hits = len(terms.intersection(tokenize(stripped)))
+        if hits > best_hits:
+            best, best_hits = stripped, hits
+    return best if len(best) <= width else best[: width - 3] + "..."
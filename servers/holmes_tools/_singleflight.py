@@ -0,0 +1,88 @@
+"""
+Single-flight 请求合并：同一 key 的并发调用只执行一次，其余调用者等待并共享同一结果（含异常）。
+只合并「正在执行中」的请求，执行结束即移除，不做结果缓存。
+用于 prometheus._do_get/_do_post 与 _command_runner.run_command；合并命中数可通过 stats() 获取。
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+try:
+    from .mcp_logger import get_logger
+except ImportError:
+    from mcp_logger import get_logger
+
+_logger = get_logger("singleflight")
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            _logger.info(f"[singleflight:{self.name}] 合并到进行中的请求 (累计命中 {self.coalesced}): {key!r:.200}")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def group(name: str) -> SingleFlight:
+    """按名字获取（或创建）一个合并组，同名调用方共享同一组。"""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """所有合并组的执行次数、合并命中数与当前进行中的请求数。"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
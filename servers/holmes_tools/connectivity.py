@@ -1,12 +1,35 @@
 """
 connectivity_check: tcp_check - check TCP connectivity to host:port.
+tcp_check_batch - check many host:port targets concurrently (asyncio, see _probe).
+latency_probe - DNS / TCP / TLS / HTTP phase timings over repeated attempts (min/median/p99).
+
+Config: CONNECTIVITY_MAX_CONCURRENCY (default 100, cap on concurrent connects per call),
+CONNECTIVITY_MAX_TARGETS (default 1000), CONNECTIVITY_DNS_TTL (default 30 seconds, 0 disables the DNS cache),
+CONNECTIVITY_MAX_ATTEMPTS (default 50, cap on latency_probe attempts).
 """
 import json
+import os
 import socket
-from typing import Optional
+import time
+from typing import Any, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 from mcp.types import Tool
 
+from . import _probe
+from .arg_utils import sanitize_arguments_for_tools
+
+# tcp_check_batch 接收 list 参数，模块跳过入口层 sanitize，在 call_tool 中按工具清洗
+SKIP_SANITIZE = True
+_RAW_ARGUMENT_TOOLS = {"tcp_check_batch"}
+
+
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
 
 def _run_tcp_check(arguments: dict) -> str:
     host = arguments.get("host")
@@ -26,6 +49,112 @@ def _run_tcp_check(arguments: dict) -> str:
         return json.dumps({"ok": False, "error": str(e)})
 
 
+def _parse_target(item: Any, default_port: Optional[int]) -> Tuple[str, int]:
+    """"host:port"、"[v6]:port"、"host"（使用 default_port）或 {host, port}。"""
+    if isinstance(item, dict):
+        host, port = str(item.get("host") or "").strip(), item.get("port", default_port)
+    else:
+        text = str(item).strip()
+        if text.startswith("["):
+            host, _, rest = text[1:].partition("]")
+            port = rest.lstrip(":") or default_port
+        elif text.count(":") == 1:
+            host, port = text.split(":")
+        else:
+            host, port = text, default_port
+    if not host:
+        raise ValueError("empty host in target {!r}".format(item))
+    if port in (None, ""):
+        raise ValueError("no port for target {!r} (use host:port or set port)".format(item))
+    port = int(port)
+    if not (1 <= port <= 65535):
+        raise ValueError("invalid port in target {!r} (must be 1-65535)".format(item))
+    return host, port
+
+
+def _parse_targets(raw: Any, default_port: Optional[int]) -> List[Tuple[str, int]]:
+    """targets 可为 list 或 JSON 字符串，也接受逗号/空白分隔的 host:port 字符串。"""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            raw = raw.replace(",", " ").split()
+    if not isinstance(raw, list):
+        raise ValueError("targets must be a list")
+    return list(dict.fromkeys(_parse_target(item, default_port) for item in raw))
+
+
+def _run_tcp_check_batch(arguments: dict) -> str:
+    try:
+        default_port = arguments.get("port")
+        default_port = int(default_port) if default_port not in (None, "") else None
+        targets = _parse_targets(arguments.get("targets"), default_port)
+        timeout = float(arguments.get("timeout") or 3.0)
+        cap = _get_int_env("CONNECTIVITY_MAX_CONCURRENCY", 100)
+        concurrency = min(int(arguments.get("concurrency") or cap), cap)
+    except (TypeError, ValueError) as e:
+        return json.dumps({"ok": False, "error": str(e)})
+    if not targets:
+        return json.dumps({"ok": False, "error": "targets is required"})
+    max_targets = _get_int_env("CONNECTIVITY_MAX_TARGETS", 1000)
+    if len(targets) > max_targets:
+        return json.dumps({"ok": False, "error": "too many targets ({} > {})".format(len(targets), max_targets)})
+
+    t0 = time.monotonic()
+    results = _probe.run_tcp_batch(targets, timeout, concurrency, _get_int_env("CONNECTIVITY_DNS_TTL", 30))
+    reachable = sum(1 for r in results if r["ok"])
+    return json.dumps(
+        {
+            "ok": reachable == len(results),
+            "total": len(results),
+            "reachable": reachable,
+            "unreachable": len(results) - reachable,
+            "elapsed_ms": round((time.monotonic() - t0) * 1000, 1),
+            "results": results,
+        }
+    )
+
+
+def _run_latency_probe(arguments: dict) -> str:
+    url = str(arguments.get("url") or "").strip()
+    http = None
+    try:
+        if url:
+            parts = urlsplit(url if "://" in url else "http://" + url)
+            if parts.scheme not in ("http", "https") or not parts.hostname:
+                raise ValueError("url must be http(s)://host[:port][/path]")
+            host = parts.hostname
+            tls = parts.scheme == "https"
+            port = parts.port or (443 if tls else 80)
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+            host_header = parts.netloc.rsplit("@", 1)[-1]
+            method = str(arguments.get("method") or "GET").upper()
+            http = {"method": method, "path": path, "host": host_header}
+        else:
+            host = str(arguments.get("host") or "").strip()
+            if not host:
+                raise ValueError("url or host is required")
+            if arguments.get("port") in (None, ""):
+                raise ValueError("port is required when probing host")
+            port = int(arguments["port"])
+            tls = arguments.get("tls") in (True, "true", "True", 1)
+        if not (1 <= port <= 65535):
+            raise ValueError("invalid port (must be 1-65535)")
+        attempts = max(1, min(int(arguments.get("attempts") or 5), _get_int_env("CONNECTIVITY_MAX_ATTEMPTS", 50)))
+        interval = max(0.0, float(arguments.get("interval") or 0.0))
+        timeout = float(arguments.get("timeout") or 5.0)
+    except (TypeError, ValueError) as e:
+        return json.dumps({"ok": False, "error": str(e)})
+    insecure = arguments.get("insecure") in (True, "true", "True", 1)
+
+    result = _probe.run_latency_probe(host, port, tls, http, attempts, interval, timeout, insecure)
+    out = {"ok": result["succeeded"] > 0, "target": url or "{}:{}".format(host, port), "tls": tls}
+    out.update(result)
+    return json.dumps(out)
+
+
 TOOLS = [
     Tool(
         name="tcp_check",
@@ -40,10 +169,77 @@ TOOLS = [
             "required": ["host", "port"],
         },
     ),
+    Tool(
+        name="tcp_check_batch",
+        description=(
+            "Check TCP connectivity to many host:port targets concurrently (e.g. all endpoints of a service). "
+            "Returns per-target ok/error, DNS and connect latency; the whole batch takes about one timeout."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "targets": {
+                    "type": "array",
+                    "items": {
+                        "oneOf": [
+                            {"type": "string", "description": "host:port, [ipv6]:port, or host (uses port)"},
+                            {
+                                "type": "object",
+                                "properties": {"host": {"type": "string"}, "port": {"type": "integer"}},
+                                "required": ["host"],
+                            },
+                        ]
+                    },
+                    "description": "Targets to probe; duplicates are checked once.",
+                },
+                "port": {"type": "integer", "description": "Default port for targets given without one"},
+                "timeout": {"type": "number", "description": "Per-target timeout in seconds (default: 3.0)"},
+                "concurrency": {
+                    "type": "integer",
+                    "description": "Maximum concurrent connects (default and cap: CONNECTIVITY_MAX_CONCURRENCY, 100)",
+                },
+            },
+            "required": ["targets"],
+        },
+    ),
+    Tool(
+        name="latency_probe",
+        description=(
+            "Measure connection latency broken down by phase (DNS lookup, TCP connect, TLS handshake, "
+            "HTTP time-to-first-byte, total) over several attempts; returns min/median/p99/max per phase. "
+            "Use to tell slow DNS from slow network from slow TLS from slow server."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "url": {
+                    "type": "string",
+                    "description": "http:// or https:// URL; enables the HTTP phase (only the status line is read)",
+                },
+                "host": {"type": "string", "description": "Hostname or IP (when no url is given)"},
+                "port": {"type": "integer", "description": "Port (when no url is given)"},
+                "tls": {"type": "boolean", "description": "Perform a TLS handshake after connecting (host/port mode)"},
+                "method": {"type": "string", "description": "HTTP method for url probes (default: GET)"},
+                "attempts": {
+                    "type": "integer",
+                    "description": "Number of sequential attempts (default: 5, max CONNECTIVITY_MAX_ATTEMPTS)",
+                },
+                "interval": {"type": "number", "description": "Seconds to wait between attempts (default: 0)"},
+                "timeout": {"type": "number", "description": "Per-attempt timeout in seconds (default: 5.0)"},
+                "insecure": {"type": "boolean", "description": "Skip TLS certificate verification (default: false)"},
+            },
+        },
+    ),
 ]
 
 
 def call_tool(name: str, arguments: dict) -> Optional[str]:
-    if name != "tcp_check":
-        return None
-    return _run_tcp_check(arguments)
+    if name not in _RAW_ARGUMENT_TOOLS:
+        arguments = sanitize_arguments_for_tools(arguments)
+    if name == "tcp_check":
+        return _run_tcp_check(arguments)
+    if name == "tcp_check_batch":
+        return _run_tcp_check_batch(arguments)
+    if name == "latency_probe":
+        return _run_latency_probe(arguments)
+    return None
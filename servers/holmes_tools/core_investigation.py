@@ -1,10 +1,18 @@
 """
-core_investigation 工具：TodoWrite
+core_investigation 工具：TodoWrite、TodoUpdate
 移植自 holmes/mcp/tools/core_investigation_tools.py
 与 Holmes 内置 core_investigation 行为一致：接收任务列表，格式化后返回供 LLM 使用。
+
+带 session_id 时任务列表保存在服务端（按会话），TodoUpdate 以增量操作（add/update/remove）修改，
+通过 expected_version 做乐观并发控制，只返回变更摘要；需要完整视图时传 view=true。
+配置：TODO_SESSION_TTL（会话闲置过期秒数，默认 86400）、TODO_MAX_SESSIONS（默认 256）。
 """
 import json
-from typing import Any, Dict, List, Optional
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 from mcp.types import Tool
 
@@ -14,8 +22,19 @@ STATUS_ICONS = {"pending": "[ ]", "in_progress": "[~]", "completed": "[✓]", "f
 # 此模块接收含 list/dict 的参数，跳过 sanitize_arguments_for_tools
 SKIP_SANITIZE = True
 
+_sessions_lock = threading.Lock()
+# session_id -> {"version": int, "tasks": OrderedDict[id, task], "touched": float}
+_sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
 
-def _format_tasks(tasks: List[Dict[str, Any]]) -> str:
+
+def _format_tasks(tasks: List[Dict[str, Any]], session_id: str = "", version: int = 0) -> str:
     if not tasks:
         return ""
     lines = ["# CURRENT INVESTIGATION TASKS", ""]
@@ -31,21 +50,156 @@ def _format_tasks(tasks: List[Dict[str, Any]]) -> str:
         content = t.get("content", "")
         lines.append(f"{icon} [{tid}] {content}")
     lines.append("")
-    lines.append("**Instructions**: Use TodoWrite tool to update task status as you work.")
+    if session_id:
+        lines.append(
+            f"**Instructions**: Record progress with TodoUpdate(session_id=\"{session_id}\", ops=[...], "
+            f"expected_version={version}); use TodoWrite only to replace the whole plan."
+        )
+    else:
+        lines.append(
+            "**Instructions**: Call TodoWrite once with a session_id, then record progress with TodoUpdate "
+            "(ops + expected_version) instead of resending the whole list."
+        )
     return "\n".join(lines)
 
 
-def _run_todo_write(arguments: dict) -> str:
-    raw = arguments.get("todos")
+def _parse_list_arg(arguments: dict, key: str) -> Tuple[Optional[list], Optional[str]]:
+    raw = arguments.get(key)
     if raw is None:
-        return json.dumps({"error": "missing parameter: todos"})
+        return None, f"missing parameter: {key}"
     if isinstance(raw, str):
         try:
             raw = json.loads(raw)
         except json.JSONDecodeError as e:
-            return json.dumps({"error": f"todos is not valid JSON: {e}"})
+            return None, f"{key} is not valid JSON: {e}"
     if not isinstance(raw, list):
-        return json.dumps({"error": "todos must be a list"})
+        return None, f"{key} must be a list"
+    return raw, None
+
+
+def _session(session_id: str, create: bool = True) -> Optional[Dict[str, Any]]:
+    """取（或创建）会话；create=False 且会话不存在（或已过期）时返回 None。
+    调用方需持有 _sessions_lock。顺带清理过期与超量会话。"""
+    now = time.time()
+    ttl = _get_int_env("TODO_SESSION_TTL", 86400)
+    for sid in [sid for sid, st in _sessions.items() if now - st["touched"] > ttl]:
+        del _sessions[sid]
+    state = _sessions.get(session_id)
+    if state is None:
+        if not create:
+            return None
+        state = {"version": 0, "tasks": OrderedDict(), "touched": now}
+        _sessions[session_id] = state
+    state["touched"] = now
+    _sessions.move_to_end(session_id)
+    while len(_sessions) > max(1, _get_int_env("TODO_MAX_SESSIONS", 256)):
+        _sessions.popitem(last=False)
+    return state
+
+
+def _status_counts(tasks: "OrderedDict[str, Dict[str, Any]]") -> str:
+    counts = {status: 0 for status in STATUS_ORDER}
+    for t in tasks.values():
+        counts[t["status"]] = counts.get(t["status"], 0) + 1
+    text = f"{counts['completed']} completed, {counts['in_progress']} in progress, {counts['pending']} pending"
+    return text + (f", {counts['failed']} failed" if counts["failed"] else "")
+
+
+def _apply_ops(tasks: "OrderedDict[str, Dict[str, Any]]", ops: list) -> List[str]:
+    """在 tasks（副本）上应用操作，返回 diff 行；任一操作非法时抛 ValueError，调用方整体丢弃。"""
+    diff: List[str] = []
+    for i, op in enumerate(ops):
+        if not isinstance(op, dict):
+            raise ValueError(f"ops[{i}] must be an object")
+        kind = str(op.get("op") or "").lower()
+        tid = str(op.get("id") or "").strip()
+        status = op.get("status")
+        if status is not None and status not in STATUS_ORDER:
+            raise ValueError(f"ops[{i}]: invalid status {status!r}")
+        if kind == "add":
+            if not tid:
+                numeric = [int(k) for k in tasks if k.isdigit()]
+                tid = str(max(numeric, default=0) + 1)
+            if tid in tasks:
+                raise ValueError(f"ops[{i}]: task {tid} already exists")
+            content = str(op.get("content") or "").strip()
+            if not content:
+                raise ValueError(f"ops[{i}]: add requires content")
+            tasks[tid] = {"id": tid, "content": content, "status": status or "pending"}
+            diff.append(f"+ [{tid}] {content} ({tasks[tid]['status']})")
+        elif kind == "update":
+            task = tasks.get(tid)
+            if task is None:
+                raise ValueError(f"ops[{i}]: unknown task {tid!r}")
+            changes = []
+            if status is not None and status != task["status"]:
+                changes.append(f"{task['status']} -> {status}")
+                task["status"] = status
+            content = op.get("content")
+            if content is not None and str(content).strip() and str(content).strip() != task["content"]:
+                task["content"] = str(content).strip()
+                changes.append(f"content: {task['content']}")
+            if changes:
+                diff.append(f"~ [{tid}] " + "; ".join(changes))
+        elif kind == "remove":
+            if tasks.pop(tid, None) is None:
+                raise ValueError(f"ops[{i}]: unknown task {tid!r}")
+            diff.append(f"- [{tid}]")
+        else:
+            raise ValueError(f"ops[{i}]: op must be add, update or remove")
+    return diff
+
+
+def _run_todo_update(arguments: dict) -> str:
+    session_id = str(arguments.get("session_id") or "").strip()
+    if not session_id:
+        return json.dumps({"error": "missing parameter: session_id"})
+    ops: list = []
+    if arguments.get("ops") is not None:
+        ops, error = _parse_list_arg(arguments, "ops")
+        if error:
+            return json.dumps({"error": error})
+    expected = arguments.get("expected_version")
+    view = arguments.get("view") in (True, "true", "True", 1)
+
+    with _sessions_lock:
+        state = _session(session_id, create=False)
+        if state is None:
+            return json.dumps({
+                "error": f"unknown session: {session_id}",
+                "hint": "create the plan with TodoWrite(session_id=...) first; sessions expire after inactivity",
+            })
+        if expected not in (None, "") and str(expected) != str(state["version"]):
+            return json.dumps({
+                "error": "version conflict",
+                "session_id": session_id,
+                "expected_version": expected,
+                "current_version": state["version"],
+                "hint": "re-read with view=true and retry against current_version",
+            })
+        tasks = OrderedDict((tid, dict(t)) for tid, t in state["tasks"].items())
+        try:
+            diff = _apply_ops(tasks, ops)
+        except ValueError as e:
+            return json.dumps({"error": str(e), "session_id": session_id, "current_version": state["version"]})
+        if diff:
+            state["tasks"] = tasks
+            state["version"] += 1
+        version = state["version"]
+        snapshot = list(state["tasks"].values())
+
+    lines = [f"Todo session '{session_id}' v{version}: {_status_counts(tasks)}"]
+    lines.extend(diff if diff else ["(no changes)"])
+    if view:
+        formatted = _format_tasks(snapshot, session_id, version)
+        lines.extend(["", formatted if formatted else "No tasks in the investigation plan."])
+    return "\n".join(lines)
+
+
+def _run_todo_write(arguments: dict) -> str:
+    raw, error = _parse_list_arg(arguments, "todos")
+    if error:
+        return json.dumps({"error": error})
     tasks: List[Dict[str, Any]] = []
     for item in raw:
         if isinstance(item, dict):
@@ -56,19 +210,36 @@ def _run_todo_write(arguments: dict) -> str:
             })
         else:
             tasks.append({"id": "", "content": str(item), "status": "pending"})
-    formatted = _format_tasks(tasks)
-    return (
-        f"Investigation plan updated with {len(tasks)} tasks.\n\n"
-        f"{formatted if formatted else 'No tasks in the investigation plan.'}"
-    )
+    session_id = str(arguments.get("session_id") or "").strip()
+    version = 0
+    header = f"Investigation plan updated with {len(tasks)} tasks."
+    if session_id:
+        # 完整列表替换会话状态，之后可用 TodoUpdate 增量修改
+        stored: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for i, t in enumerate(tasks, 1):
+            tid = str(t["id"] or i).strip()
+            if tid in stored:
+                return json.dumps({"error": f"duplicate task id: {tid}", "session_id": session_id})
+            status = t["status"] if t["status"] in STATUS_ORDER else "pending"
+            stored[tid] = {"id": tid, "content": str(t["content"]), "status": status}
+        with _sessions_lock:
+            state = _session(session_id)
+            state["tasks"] = stored
+            state["version"] += 1
+            version = state["version"]
+        header += f" Session '{session_id}' is now at version {version}; use TodoUpdate for changes."
+    formatted = _format_tasks(tasks, session_id, version)
+    return f"{header}\n\n{formatted if formatted else 'No tasks in the investigation plan.'}"
 
 
 TOOLS: List[Tool] = [
     Tool(
         name="TodoWrite",
         description=(
-            "Save investigation tasks to break down complex problems into manageable sub-tasks. "
-            "ALWAYS provide the COMPLETE list of all tasks, not just the ones being updated."
+            "Create or replace the investigation plan: break complex problems into manageable sub-tasks and send "
+            "the full task list. Pass a session_id to keep the list on the server. Use this tool only for the "
+            "initial plan or to replace the whole plan; record status changes, new tasks and removals with "
+            "TodoUpdate (ops + expected_version) instead of resending the list."
         ),
         inputSchema={
             "type": "object",
@@ -76,7 +247,7 @@ TOOLS: List[Tool] = [
                 "todos": {
                     "type": "array",
                     "description": (
-                        "COMPLETE list of ALL tasks. Each task: id (string), "
+                        "All tasks of the new plan (replaces any existing list). Each task: id (string), "
                         "content (string), status (pending/in_progress/completed/failed)"
                     ),
                     "items": {
@@ -91,15 +262,59 @@ TOOLS: List[Tool] = [
                         },
                         "required": ["id", "content", "status"],
                     },
-                }
+                },
+                "session_id": {
+                    "type": "string",
+                    "description": "Optional investigation session id; stores the list server-side for TodoUpdate",
+                },
             },
             "required": ["todos"],
         },
     ),
+    Tool(
+        name="TodoUpdate",
+        description=(
+            "Incrementally update the server-side task list of an investigation session: add, update "
+            "(status/content) or remove individual tasks without resending the whole list. Returns the new "
+            "version and a compact diff; pass view=true to also get the full formatted task list. "
+            "Use expected_version to detect concurrent changes (the call fails with a version conflict)."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "session_id": {"type": "string", "description": "Investigation session id"},
+                "ops": {
+                    "type": "array",
+                    "description": "Operations applied atomically in order (all or none)",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "op": {"type": "string", "enum": ["add", "update", "remove"]},
+                            "id": {"type": "string", "description": "Task id (optional for add: auto-assigned)"},
+                            "content": {"type": "string"},
+                            "status": {
+                                "type": "string",
+                                "enum": ["pending", "in_progress", "completed", "failed"],
+                            },
+                        },
+                        "required": ["op"],
+                    },
+                },
+                "expected_version": {
+                    "type": "integer",
+                    "description": "Version the changes are based on; rejected if the session has moved on",
+                },
+                "view": {"type": "boolean", "description": "Also return the full formatted task list"},
+            },
+            "required": ["session_id"],
+        },
+    ),
 ]
 
 
 def call_tool(name: str, arguments: dict) -> Optional[str]:
-    if name != "TodoWrite":
-        return None
-    return _run_todo_write(arguments)
+    if name == "TodoWrite":
+        return _run_todo_write(arguments)
+    if name == "TodoUpdate":
+        return _run_todo_update(arguments)
+    return None
@@ -1,63 +1,277 @@
 """
 internet: fetch_webpage - fetch URL and convert HTML to Markdown.
-Requires: requests, beautifulsoup4, markdownify.
+Requires: requests, beautifulsoup4, markdownify (lxml optional, used as the faster parser).
+
+Downloads are streamed through a pooled session and capped at INTERNET_MAX_BYTES (default 5 MiB).
+Converted content is cached on disk (see _fetch_cache) and revalidated with ETag / Last-Modified,
+so repeat fetches cost a 304 or nothing.
+
+Documents longer than INTERNET_PAGE_CHARS (default 20000) are returned one page at a time under a
+handle (see _documents); read_fetched_document pages through them by offset or heading, or returns
+the table of contents, without refetching.
 """
 import os
+import threading
 from typing import Optional
 
 from mcp.types import Tool
 
+from . import _documents, _fetch_cache
+from ._html_convert import html_to_markdown
+from .mcp_logger import get_logger
+
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     requests = None
 
+_logger = get_logger("internet")
 
-def _run_fetch_webpage(arguments: dict) -> str:
-    if requests is None:
-        return "Error: install requests to use fetch_webpage."
-    url = arguments.get("url")
-    if not url:
-        return "Error: parameter url is required."
+_HEADERS = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64; holmes-mcp) Gecko/20100101 Firefox/128.0"}
+_CHUNK_SIZE = 64 * 1024
+# 分页大小下限：过小（尤其是 0）的 max_chars 会让 next offset 停在原地，按 next 翻页的客户端会死循环
+_MIN_PAGE_CHARS = 1000
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update(_HEADERS)
+            _session = s
+        return _session
+
+
+def _get_max_bytes() -> int:
+    try:
+        return int(os.environ.get("INTERNET_MAX_BYTES", str(5 * 1024 * 1024)))
+    except ValueError:
+        return 5 * 1024 * 1024
+
+
+def _get_page_chars() -> int:
+    try:
+        return max(_MIN_PAGE_CHARS, int(os.environ.get("INTERNET_PAGE_CHARS", "20000")))
+    except ValueError:
+        return 20000
+
+
+def _get_document_handles() -> int:
+    try:
+        return int(os.environ.get("INTERNET_DOCUMENT_HANDLES", "32"))
+    except ValueError:
+        return 32
+
+
+def _load_cached_document(handle: str) -> Optional[tuple]:
+    entry = _fetch_cache.load_by_digest(handle)
+    if entry is None:
+        return None
+    url = entry["url"]
+    return (url[len("full:"):] if url.startswith("full:") else url), entry["content"]
+
+
+_documents_store = _documents.DocumentStore(_get_document_handles, _load_cached_document)
+
+
+def _is_html(content: str, ct: str) -> bool:
+    return "text/html" in ct or (not ct and content.strip().lower().startswith("<!doctype")) or "<html" in content[:500].lower()
+
+
+def _read_capped(r, max_bytes: int) -> tuple:
+    """Reads the streamed body up to max_bytes. Returns (bytes, truncated)."""
+    buf = bytearray()
+    for chunk in r.iter_content(chunk_size=_CHUNK_SIZE):
+        if not chunk:
+            continue
+        buf.extend(chunk)
+        if len(buf) > max_bytes:
+            return bytes(buf[:max_bytes]), True
+    return bytes(buf), False
+
+
+def _fetch_document(url: str, main_content: bool, cache_key: str) -> tuple:
+    """Returns (content, None) or (None, error text)."""
     timeout = int(os.environ.get("INTERNET_TIMEOUT_SECONDS", "30"))
-    headers = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64; holmes-mcp) Gecko/20100101 Firefox/128.0"}
+    max_bytes = _get_max_bytes()
+
+    cached = _fetch_cache.load(cache_key)
+    if cached and _fetch_cache.is_fresh(cached):
+        _logger.info(f"[fetch_webpage] cache hit (fresh): {url}")
+        return cached["content"], None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
     try:
-        r = requests.get(url, headers=headers, timeout=timeout)
-        r.raise_for_status()
-        content = r.text
-        ct = r.headers.get("content-type", "")
+        with _get_session().get(url, headers=headers, timeout=timeout, stream=True) as r:
+            if r.status_code == 304 and cached:
+                _logger.info(f"[fetch_webpage] cache hit (304 revalidated): {url}")
+                max_age = _fetch_cache.parse_max_age(r.headers)
+                try:
+                    _fetch_cache.touch(cache_key, cached, max_age or 0)
+                except OSError as e:
+                    _logger.warning(f"[fetch_webpage] cache update failed: {e}")
+                return cached["content"], None
+            r.raise_for_status()
+            raw, truncated = _read_capped(r, max_bytes)
+            ct = r.headers.get("content-type", "")
+            content = raw.decode(r.encoding or "utf-8", errors="replace")
+            meta = {
+                "etag": r.headers.get("etag"),
+                "last_modified": r.headers.get("last-modified"),
+                "content_type": ct,
+                "max_age": _fetch_cache.parse_max_age(r.headers),
+            }
     except Exception as e:
-        return "Error fetching {}: {}".format(url, e)
-    if "text/html" in ct or (not ct and content.strip().lower().startswith("<!doctype")) or "<html" in content[:500].lower():
+        return None, "Error fetching {}: {}".format(url, e)
+
+    if _is_html(content, ct):
         try:
-            from bs4 import BeautifulSoup
-            from markdownify import markdownify
-            soup = BeautifulSoup(content, "html.parser")
-            for tag in ("script", "style", "nav", "header", "footer", "iframe"):
-                for el in soup.find_all(tag):
-                    el.decompose()
-            content = markdownify(str(soup))
-        except ImportError:
-            pass
+            content = html_to_markdown(content, main_content=main_content)
         except Exception as e:
             content = content + "\n\n(HTML-to-Markdown failed: {})".format(e)
-    return content
+    if truncated:
+        content += "\n\n(Truncated: response exceeded {} bytes.)".format(max_bytes)
+    # 截断的内容不缓存：INTERNET_MAX_BYTES 调大后或下次抓取时应重新获取完整页面
+    if meta["max_age"] is not None and not truncated:
+        try:
+            _fetch_cache.store(cache_key, content, meta)
+        except OSError as e:
+            _logger.warning(f"[fetch_webpage] cache write failed: {e}")
+    return content, None
+
+
+def _int_arg(arguments: dict, key: str, default: int) -> int:
+    try:
+        return max(0, int(arguments.get(key, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _is_true(value) -> bool:
+    return value in (True, "true", "True", 1, "1")
+
+
+def _render_document(handle: str, doc: dict, arguments: dict) -> str:
+    """Whole document when it fits, otherwise the TOC / a section / one page with a continuation footer."""
+    max_chars = max(_MIN_PAGE_CHARS, _int_arg(arguments, "max_chars", _get_page_chars()))
+    offset = _int_arg(arguments, "offset", 0)
+    if _is_true(arguments.get("toc")):
+        return _documents.render_toc(handle, doc, _documents_store.toc(doc))
+    section = None
+    if arguments.get("section"):
+        section = _documents.find_section(_documents_store.toc(doc), str(arguments["section"]))
+        if section is None:
+            return "Error: no heading matching {!r} in document {}. Use toc=true to list headings.".format(
+                arguments["section"], handle
+            )
+    if section is None and offset == 0 and len(doc["text"]) <= max_chars:
+        return doc["text"]
+    return _documents.render_page(handle, doc, offset, max_chars, section)
+
+
+def _run_fetch_webpage(arguments: dict) -> str:
+    if requests is None:
+        return "Error: install requests to use fetch_webpage."
+    url = arguments.get("url")
+    if not url:
+        return "Error: parameter url is required."
+    main_content = arguments.get("main_content", True) not in (False, "false", "False", 0)
+    # 正文提取与整页转换的结果分开缓存
+    cache_key = url if main_content else "full:" + url
+    handle = _documents.make_handle(cache_key)
+
+    # 翻页/目录/章节请求直接复用已转换的文档；普通请求照常走 HTTP 缓存校验
+    paging = _int_arg(arguments, "offset", 0) > 0 or arguments.get("section") or _is_true(arguments.get("toc"))
+    doc = _documents_store.get(handle) if paging else None
+    if doc is None:
+        content, error = _fetch_document(url, main_content, cache_key)
+        if error:
+            return error
+        _documents_store.put(cache_key, url, content)
+        doc = _documents_store.get(handle)
+    return _render_document(handle, doc, arguments)
+
+
+def _run_read_fetched_document(arguments: dict) -> str:
+    handle = str(arguments.get("handle") or "").strip()
+    if not handle:
+        return "Error: parameter handle is required."
+    doc = _documents_store.get(handle)
+    if doc is None:
+        return "Error: unknown or expired document handle {}. Call fetch_webpage again.".format(handle)
+    return _render_document(handle, doc, arguments)
+
+
+_PAGING_PROPERTIES = {
+    "max_chars": {
+        "type": "integer",
+        "description": "Page size in characters (default: INTERNET_PAGE_CHARS, 20000; minimum 1000).",
+    },
+    "offset": {"type": "integer", "description": "Character offset to start reading from (default: 0)."},
+    "section": {
+        "type": "string",
+        "description": "Return only the section under this heading (case-insensitive, substring match allowed).",
+    },
+    "toc": {"type": "boolean", "description": "Return the table of contents (headings with offsets) instead of text."},
+}
 
 
 TOOLS = [
     Tool(
         name="fetch_webpage",
-        description="Fetch a webpage. Use to fetch runbooks or docs. Returns Markdown when possible.",
+        description=(
+            "Fetch a webpage. Use to fetch runbooks or docs. Returns Markdown when possible. "
+            "By default only the main content is kept (navigation, sidebars and other boilerplate dropped). "
+            "Large documents are returned one page at a time with a handle for read_fetched_document; "
+            "pass toc=true to get the headings first."
+        ),
         inputSchema={
             "type": "object",
-            "properties": {"url": {"type": "string", "description": "The URL to fetch."}},
+            "properties": {
+                "url": {"type": "string", "description": "The URL to fetch."},
+                "main_content": {
+                    "type": "boolean",
+                    "description": "Extract only the main content (default: true); false converts the whole page.",
+                },
+                **_PAGING_PROPERTIES,
+            },
             "required": ["url"],
         },
     ),
+    Tool(
+        name="read_fetched_document",
+        description=(
+            "Read more of a document previously returned by fetch_webpage, by handle, without refetching it: "
+            "the next page (offset), one section (section) or the table of contents (toc=true)."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "handle": {"type": "string", "description": "Document handle from a fetch_webpage response."},
+                **_PAGING_PROPERTIES,
+            },
+            "required": ["handle"],
+        },
+    ),
 ]
 
 
 def call_tool(name: str, arguments: dict) -> Optional[str]:
-    if name != "fetch_webpage":
-        return None
-    return _run_fetch_webpage(arguments)
+    if name == "fetch_webpage":
+        return _run_fetch_webpage(arguments)
+    if name == "read_fetched_document":
+        return _run_read_fetched_document(arguments)
+    return None
@@ -2,12 +2,40 @@
 prometheus 工具集：查询 Prometheus API。
 对应 Holmes 的 prometheus/metrics。配置：PROMETHEUS_URL（默认 http://localhost:9090/）。
 
+长时间范围的 range query 会按时间分片并发执行后合并（见 _run_sharded_range_query），相关配置：
+  PROMETHEUS_RANGE_SHARD_THRESHOLD   — 超过该秒数的范围才分片（默认 21600，即 6h）
+  PROMETHEUS_RANGE_SHARD_CONCURRENCY — 分片并发数（默认 4）
+  PROMETHEUS_RANGE_SHARD_RETRIES     — 单个分片失败后的重试次数（默认 2）
+
+range query 支持 output=summary/downsample/columnar，instant query 支持 output=columnar，
+由 _prom_matrix 用 NumPy 压缩结果（需安装 numpy；orjson 可选，用于快速解析）。
+
+execute_prometheus_batch_query 一次执行多条 instant query（去重 + 有界并发），相关配置：
+  PROMETHEUS_BATCH_CONCURRENCY — 并发数（默认 8）
+  PROMETHEUS_BATCH_MAX_QUERIES — 单次最多查询条数（默认 50）
+
+查询前的代价预检（见 _apply_query_guard）：用 count(<query>) 探测序列数，估算点数/字节数，超限时
+拒绝（reject）或改写为 topk 形式（rewrite；range 查询按整个窗口选出 K 条序列），估算结果随响应一起返回。相关配置：
+  PROMETHEUS_QUERY_GUARD      — off / report / reject / rewrite（默认 off，可被工具参数 guard 覆盖）
+  PROMETHEUS_GUARD_MAX_SERIES — 序列数上限（默认 2000）
+  PROMETHEUS_GUARD_MAX_POINTS — 总点数上限（默认 1000000）
+  PROMETHEUS_GUARD_TOPK       — rewrite 时保留的序列数（默认 20）
+
+相同的并发 GET/POST（同一 URL 与参数）经 _singleflight 合并为一次请求，合并命中数随 batch 响应的 singleflight 字段返回。
+
+search_metrics 基于本地指标目录索引（_metric_index）搜索 metric 名/label/HELP，
+索引过期时间 PROMETHEUS_METRIC_INDEX_TTL（秒，默认 300）。
+
 重要：Prometheus API 的 POST 接口使用 form-encoded body（data=），不是 JSON body（json=）。
 Holmes 原始实现使用 requests.request(method="POST", data=payload)，此处保持一致。
 """
 import json
+import math
 import os
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Any, Callable, Dict, List, Optional
 from urllib.parse import urljoin
 
@@ -15,8 +43,16 @@ from mcp.types import Tool
 
 try:
     from .mcp_logger import get_logger, log_http_request
+    from .arg_utils import sanitize_arguments_for_tools
+    from . import _prom_matrix
+    from ._metric_index import MetricIndex
+    from . import _singleflight
 except ImportError:
     from mcp_logger import get_logger, log_http_request
+    from arg_utils import sanitize_arguments_for_tools
+    import _prom_matrix
+    from _metric_index import MetricIndex
+    import _singleflight
 
 try:
     import requests
@@ -25,6 +61,10 @@ except ImportError:
 
 _logger = get_logger("prometheus")
 
+# execute_prometheus_batch_query 接收 list 参数，模块跳过入口层 sanitize，在 call_tool 中按工具清洗
+SKIP_SANITIZE = True
+_RAW_ARGUMENT_TOOLS = {"execute_prometheus_batch_query"}
+
 
 def _get_prometheus_url() -> str:
     u = os.environ.get("PROMETHEUS_URL", "http://localhost:9090/").strip()
@@ -35,7 +75,33 @@ def _get_timeout() -> int:
     return int(os.environ.get("PROMETHEUS_TIMEOUT", "30"))
 
 
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+_inflight = _singleflight.group("prometheus")
+
+
+def _request_key(method: str, url: str, payload: Optional[Dict]) -> tuple:
+    return method, url, json.dumps(payload or {}, sort_keys=True, default=str)
+
+
 def _do_get(path: str, params: Optional[Dict] = None) -> str:
+    """GET 请求 Prometheus API；相同 URL 与参数的并发请求共享一次执行。"""
+    url = urljoin(_get_prometheus_url(), path)
+    return _inflight.do(_request_key("GET", url, params), lambda: _http_get(path, params))
+
+
+def _do_post(path: str, data: Optional[Dict] = None) -> str:
+    """POST 请求 Prometheus API；相同 URL 与参数的并发请求共享一次执行。"""
+    url = urljoin(_get_prometheus_url(), path)
+    return _inflight.do(_request_key("POST", url, data), lambda: _http_post(path, data))
+
+
+def _http_get(path: str, params: Optional[Dict] = None) -> str:
     if requests is None:
         return json.dumps({"error": "install 'requests' to use Prometheus tools."})
     url = urljoin(_get_prometheus_url(), path)
@@ -55,7 +121,7 @@ def _do_get(path: str, params: Optional[Dict] = None) -> str:
         return json.dumps({"error": str(e), "url": url})
 
 
-def _do_post(path: str, data: Optional[Dict] = None) -> str:
+def _http_post(path: str, data: Optional[Dict] = None) -> str:
     """
     POST 请求 Prometheus API。
     注意：Prometheus 的 POST 接口（如 /api/v1/query, /api/v1/query_range）
@@ -90,6 +156,28 @@ def _run_get_metric_names(arguments: dict) -> str:
     return _do_get("api/v1/label/__name__/values")
 
 
+_metric_index = MetricIndex(
+    lambda path: _do_get(path),
+    lambda: _get_int_env("PROMETHEUS_METRIC_INDEX_TTL", 300),
+)
+
+
+def _run_search_metrics(arguments: dict) -> str:
+    query = str(arguments.get("query") or "").strip()
+    if not query:
+        return json.dumps({"error": "query is required"})
+    try:
+        limit = max(1, min(int(arguments.get("limit") or 20), 200))
+    except ValueError:
+        return json.dumps({"error": "limit must be an integer"})
+    metric_type = str(arguments.get("type") or "").strip().lower() or None
+    try:
+        result = _metric_index.search(query, limit=limit, metric_type=metric_type)
+    except Exception as e:
+        return json.dumps({"error": f"metric index unavailable: {e}"})
+    return json.dumps(result, ensure_ascii=False)
+
+
 def _run_get_label_values(arguments: dict) -> str:
     label = arguments.get("label_name")
     if not label:
@@ -126,33 +214,428 @@ def _run_execute_prometheus_instant_query(arguments: dict) -> str:
     query = arguments.get("query")
     if not query:
         return json.dumps({"error": "query is required"})
-    time = arguments.get("time")
+    output = (arguments.get("output") or "raw").strip().lower()
+    if output not in _prom_matrix.INSTANT_OUTPUT_MODES:
+        return json.dumps({"error": f"output must be one of {list(_prom_matrix.INSTANT_OUTPUT_MODES)}"})
+    query_time = arguments.get("time")
+    query, _, guard_info, guard_error = _apply_query_guard(query, _get_guard_mode(arguments), query_time)
+    if guard_error:
+        return guard_error
     params = {"query": query}
-    if time:
-        params["time"] = time
-    return _do_get("api/v1/query", params=params)
+    if query_time:
+        params["time"] = query_time
+    text = _do_get("api/v1/query", params=params)
+    if output != "raw":
+        text = _prom_matrix.render_text(text, output)
+    return _attach_guard_info(text, guard_info)
+
+
+# Prometheus 单条序列最多返回 11000 个点，超过会直接拒绝查询；分片时需保证每片不超过该上限
+_MAX_POINTS_PER_SERIES = 11000
+_SHARD_SIZES = {"hour": 3600, "day": 86400}
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|y|w|d|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800, "y": 31536000}
+
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    """解析 Prometheus 接受的时间格式（unix 秒或 RFC3339），失败返回 None。"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).strip().replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _parse_duration(value: Any) -> Optional[float]:
+    """解析 step 等时长（"15s"、"1h30m" 或秒数），失败返回 None。"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    text = str(value or "").strip()
+    parts = _DURATION_RE.findall(text)
+    if not parts or "".join(n + u for n, u in parts) != text:
+        return None
+    return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+
+
+def _plan_range_shards(start: float, end: float, step: float, shard: str) -> List[tuple]:
+    """
+    按 step 网格对齐切分 [start, end]，保证各分片的求值点与整段查询完全一致、互不重叠。
+    返回 [(shard_start, shard_end), ...]；不需要分片时只返回一段。
+    """
+    span = end - start
+    if shard == "none" or span <= 0 or step <= 0:
+        return [(start, end)]
+    if shard == "auto":
+        if span <= _get_int_env("PROMETHEUS_RANGE_SHARD_THRESHOLD", 21600):
+            return [(start, end)]
+        shard = "day" if span > 2 * 86400 else "hour"
+    size = min(_SHARD_SIZES.get(shard, 86400), step * _MAX_POINTS_PER_SERIES)
+    steps_per_shard = max(1, int(size // step))
+    shards = []
+    s = start
+    while s <= end:
+        e = min(s + (steps_per_shard - 1) * step, end)
+        shards.append((s, e))
+        s = e + step
+    return shards
+
+
+def _post_range_shard(query: str, start: float, end: float, step: str, retries: int) -> Dict[str, Any]:
+    """执行单个分片，失败（HTTP 错误或 status != success）时重试，返回解析后的响应。"""
+    data = {"query": query, "start": repr(start), "end": repr(end), "step": step}
+    body: Dict[str, Any] = {}
+    for attempt in range(retries + 1):
+        try:
+            body = _prom_matrix.loads(_do_post("api/v1/query_range", data=data))
+        except json.JSONDecodeError as e:
+            body = {"error": f"invalid JSON response: {e}"}
+        if body.get("status") == "success":
+            return body
+        if attempt < retries:
+            _logger.warning(f"[range_shard] 分片 [{start}, {end}] 第 {attempt + 1} 次失败，重试: {body.get('error')}")
+            time.sleep(min(0.5 * (2 ** attempt), 5))
+    return body
+
+
+def _merge_matrix_results(bodies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按 label 集合合并各分片的 matrix 结果；分片按时间顺序传入，values 直接拼接即有序。"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for body in bodies:
+        for series in (body.get("data") or {}).get("result") or []:
+            metric = series.get("metric") or {}
+            key = json.dumps(metric, sort_keys=True)
+            entry = merged.setdefault(key, {"metric": metric, "values": []})
+            entry["values"].extend(series.get("values") or [])
+    return list(merged.values())
+
+
+def _run_sharded_range_query(query: str, shards: List[tuple], step: str) -> str:
+    concurrency = max(1, _get_int_env("PROMETHEUS_RANGE_SHARD_CONCURRENCY", 4))
+    retries = max(0, _get_int_env("PROMETHEUS_RANGE_SHARD_RETRIES", 2))
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(shards))) as pool:
+        bodies = list(pool.map(lambda se: _post_range_shard(query, se[0], se[1], step, retries), shards))
+    ok = [b for b in bodies if b.get("status") == "success"]
+    warnings: List[str] = []
+    for (s, e), body in zip(shards, bodies):
+        warnings.extend(body.get("warnings") or [])
+        if body.get("status") != "success":
+            warnings.append(f"shard [{s}, {e}] failed: {body.get('error', 'unknown error')}")
+    _logger.info(
+        f"[range_shard] {len(shards)} 个分片完成 ({time.monotonic() - t0:.2f}s, "
+        f"成功 {len(ok)}, 并发 {concurrency})"
+    )
+    if not ok:
+        return json.dumps({"status": "error", "error": "all range query shards failed", "warnings": warnings})
+    out: Dict[str, Any] = {
+        "status": "success",
+        "data": {"resultType": "matrix", "result": _merge_matrix_results(ok)},
+    }
+    if warnings:
+        out["warnings"] = warnings
+    if len(ok) < len(bodies):
+        out["partial"] = True
+    return _prom_matrix.dumps(out)
+
+
+_GUARD_MODES = ("off", "report", "reject", "rewrite")
+# 粗略的 JSON 体积估算：每个 [ts, "value"] 点约 25 字节，每条序列的 label 约 200 字节
+_BYTES_PER_POINT = 25
+_BYTES_PER_SERIES = 200
+# rewrite 模式下用于选出 topk 序列的子查询在整个窗口内求值的点数
+_GUARD_SUBQUERY_POINTS = 100
+
+
+def _get_guard_mode(arguments: dict) -> str:
+    mode = str(arguments.get("guard") or os.environ.get("PROMETHEUS_QUERY_GUARD", "off")).strip().lower()
+    return mode if mode in _GUARD_MODES else "off"
+
+
+def _guard_limits() -> Dict[str, int]:
+    return {
+        "max_series": _get_int_env("PROMETHEUS_GUARD_MAX_SERIES", 2000),
+        "max_points": _get_int_env("PROMETHEUS_GUARD_MAX_POINTS", 1000000),
+    }
+
+
+def _estimate_query_cost(
+    query: str, at: Any = None, span: float = 0.0, step: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    用 count(<query>) 在 at 时刻做一次廉价探测得到序列数，再按 span/step 推算点数与响应字节数。
+    探测失败（如 query 结果为 scalar）时返回带 error 的估算，由调用方放行。
+    """
+    params = {"query": f"count({query})"}
+    if at:
+        params["time"] = at
+    estimate: Dict[str, Any] = {"method": "count_probe"}
+    try:
+        body = _prom_matrix.loads(_do_get("api/v1/query", params=params))
+    except json.JSONDecodeError as e:
+        body = {"error": f"invalid JSON response: {e}"}
+    data = body.get("data") or {}
+    if body.get("status") != "success" or data.get("resultType") != "vector":
+        estimate["error"] = body.get("error", "count probe not applicable")
+        return estimate
+    result = data.get("result") or []
+    series = int(float(result[0]["value"][1])) if result else 0
+    points_per_series = int(span // step) + 1 if step and span > 0 else 1
+    points = series * points_per_series
+    estimate.update({
+        "series": series,
+        "points_per_series": points_per_series,
+        "points": points,
+        "bytes": series * _BYTES_PER_SERIES + points * _BYTES_PER_POINT,
+    })
+    return estimate
+
+
+def _apply_query_guard(
+    query: str, mode: str, at: Any = None, span: float = 0.0, step: Optional[float] = None
+) -> tuple:
+    """
+    查询前的代价预检，返回 (query, step, guard_info, error_text)。
+    - off：不探测；report：只附带估算；reject：超限时返回 error_text；
+    - rewrite：超限时改写为 topk(K, query)，range 查询点数仍超限时同时放大 step。
+      topk 在 range 查询中逐 step 求值，每个 step 选出的序列可能不同，结果可远超 K 条；因此 range 查询改写为
+      (query) and topk(K, max_over_time((query)[span:sub_step] @ end))：按整个窗口内的最大值一次性选出 K 条序列
+      （@ 固定在结束时刻，分片查询时各分片选出的序列也一致）。子查询步长 sub_step 取 max(step, span/100)，
+      只求约 100 个点用于排序，代价不随原 step 增长；两个采样点之间的短暂尖峰可能不参与排序。
+    """
+    if mode == "off":
+        return query, step, None, None
+    limits = _guard_limits()
+    estimate = _estimate_query_cost(query, at, span, step)
+    info: Dict[str, Any] = {"mode": mode, "estimate": estimate, "limits": limits, "action": "allowed"}
+    if "error" in estimate:
+        return query, step, info, None
+    exceeds = estimate["series"] > limits["max_series"] or estimate["points"] > limits["max_points"]
+    info["exceeds"] = exceeds
+    if not exceeds or mode == "report":
+        return query, step, info, None
+    if mode == "reject":
+        info["action"] = "rejected"
+        return query, step, info, json.dumps({
+            "error": "query rejected by cost guard: estimated result exceeds limits; "
+                     "aggregate (sum/avg by ...), use topk, narrow the selector or the time range",
+            "guard": info,
+        })
+    topk = max(1, _get_int_env("PROMETHEUS_GUARD_TOPK", 20))
+    if step and span > 0:
+        end_ts = _parse_timestamp(at) if at else None
+        pin = f"@ {end_ts:.3f}" if end_ts is not None else "@ end()"
+        # 选序列的子查询只需粗粒度：按原 step 求值时代价与被改写的查询本身相当
+        sub_step = max(int(step) or 1, int(math.ceil(span / _GUARD_SUBQUERY_POINTS)))
+        window = f"[{int(math.ceil(span))}s:{sub_step}s]"
+        new_query = f"({query}) and topk({topk}, max_over_time(({query}){window} {pin}))"
+    else:
+        new_query = f"topk({topk}, {query})"
+    new_step = step
+    if step and span > 0 and topk * (int(span // step) + 1) > limits["max_points"]:
+        new_step = float(math.ceil(span / max(1, limits["max_points"] // topk - 1)))
+    info.update({"action": "rewritten", "rewritten_query": new_query})
+    if new_step != step:
+        info["rewritten_step"] = f"{int(new_step)}s"
+    _logger.warning(f"[query_guard] 查询超限已改写: {query!r} -> {new_query!r} (estimate={estimate})")
+    return new_query, new_step, info, None
+
+
+def _attach_guard_info(text: str, guard_info: Optional[Dict[str, Any]]) -> str:
+    """将预检信息以 guard 字段附加到 JSON 响应上。"""
+    if not guard_info:
+        return text
+    try:
+        body = _prom_matrix.loads(text)
+    except json.JSONDecodeError:
+        return text
+    if not isinstance(body, dict):
+        return text
+    body["guard"] = guard_info
+    return _prom_matrix.dumps(body)
+
+
+def _run_estimate_prometheus_query_cost(arguments: dict) -> str:
+    query = arguments.get("query")
+    if not query:
+        return json.dumps({"error": "query is required"})
+    start_ts, end_ts = _parse_timestamp(arguments.get("start")), _parse_timestamp(arguments.get("end"))
+    step_s = _parse_duration(arguments.get("step") or "15s")
+    span = end_ts - start_ts if start_ts is not None and end_ts is not None else 0.0
+    at = arguments.get("end") or arguments.get("time")
+    estimate = _estimate_query_cost(query, at, span, step_s if span else None)
+    limits = _guard_limits()
+    out: Dict[str, Any] = {"query": query, "estimate": estimate, "limits": limits}
+    if "error" not in estimate:
+        out["exceeds"] = estimate["series"] > limits["max_series"] or estimate["points"] > limits["max_points"]
+    return json.dumps(out)
 
 
 def _run_execute_prometheus_range_query(arguments: dict) -> str:
     query = arguments.get("query")
     start = arguments.get("start")
     end = arguments.get("end")
-    step = arguments.get("step", "15s")
+    step = arguments.get("step") or "15s"
     if not query:
         return json.dumps({"error": "query is required"})
-    data = {"query": query, "start": start, "end": end, "step": step}
-    return _do_post("api/v1/query_range", data=data)
+    output = (arguments.get("output") or "raw").strip().lower()
+    if output not in _prom_matrix.OUTPUT_MODES:
+        return json.dumps({"error": f"output must be one of {list(_prom_matrix.OUTPUT_MODES)}"})
+    max_points = None
+    if arguments.get("max_points") not in (None, ""):
+        try:
+            max_points = int(arguments["max_points"])
+        except (TypeError, ValueError):
+            return json.dumps({"error": "max_points must be an integer"})
+        if max_points < 1:
+            return json.dumps({"error": "max_points must be a positive integer"})
+    shard = (arguments.get("shard") or "auto").strip().lower()
+    start_ts, end_ts, step_s = _parse_timestamp(start), _parse_timestamp(end), _parse_duration(step)
+    span = end_ts - start_ts if start_ts is not None and end_ts is not None else 0.0
+    query, guarded_step, guard_info, guard_error = _apply_query_guard(
+        query, _get_guard_mode(arguments), end, span, step_s
+    )
+    if guard_error:
+        return guard_error
+    if guarded_step != step_s:
+        step_s, step = guarded_step, f"{int(guarded_step)}s"
+    shards = [(start_ts, end_ts)]
+    if start_ts is not None and end_ts is not None and step_s:
+        shards = _plan_range_shards(start_ts, end_ts, step_s, shard)
+    if len(shards) > 1:
+        text = _run_sharded_range_query(query, shards, step)
+    else:
+        data = {"query": query, "start": start, "end": end, "step": step}
+        text = _do_post("api/v1/query_range", data=data)
+    if output != "raw":
+        text = _prom_matrix.render_text(text, output, max_points)
+    return _attach_guard_info(text, guard_info)
+
+
+def _parse_batch_queries(raw: Any) -> List[Dict[str, Any]]:
+    """queries 可为 list 或 JSON 字符串；元素为 PromQL 字符串或 {id, query, time} 对象。"""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            raw = [line for line in raw.splitlines() if line.strip()]
+    if not isinstance(raw, list):
+        raise ValueError("queries must be a list")
+    items = []
+    # id -> 该 id 对应的（空白归一化后的 query, time）；同一 id 只能指向同一条查询
+    seen: Dict[str, tuple] = {}
+    for item in raw:
+        explicit = ""
+        if isinstance(item, dict):
+            query = str(item.get("query") or "").strip()
+            query_time = str(item.get("time") or "").strip()
+            explicit = str(item.get("id") or "").strip()
+        else:
+            query, query_time = str(item).strip(), ""
+        if not query:
+            raise ValueError("every query must be a non-empty string")
+        key = (" ".join(query.split()), query_time)
+        item_id = explicit or (f"{query}@{query_time}" if query_time else query)
+        if seen.get(item_id, key) != key:
+            if explicit:
+                raise ValueError(f"duplicate id {explicit!r} used for different queries")
+            n = 2
+            while seen.get(f"{item_id}#{n}", key) != key:
+                n += 1
+            item_id = f"{item_id}#{n}"
+        seen[item_id] = key
+        items.append({"id": item_id, "query": query, "time": query_time, "key": key})
+    return items
+
+
+def _run_batch_item(query: str, query_time: str, output: str) -> Dict[str, Any]:
+    t0 = time.monotonic()
+    text = _run_execute_prometheus_instant_query({"query": query, "time": query_time, "output": output})
+    elapsed_ms = round((time.monotonic() - t0) * 1000, 1)
+    try:
+        body = _prom_matrix.loads(text)
+    except json.JSONDecodeError:
+        body = {"error": text}
+    entry: Dict[str, Any] = {"query": query, "elapsed_ms": elapsed_ms}
+    if query_time:
+        entry["time"] = query_time
+    if isinstance(body, dict) and body.get("status") == "success":
+        entry["status"] = "success"
+        entry.update({k: v for k, v in body.items() if k != "status"})
+    else:
+        entry["status"] = "error"
+        entry["error"] = body.get("error", body) if isinstance(body, dict) else body
+    return entry
+
+
+def _run_execute_prometheus_batch_query(arguments: dict) -> str:
+    try:
+        items = _parse_batch_queries(arguments.get("queries"))
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+    if not items:
+        return json.dumps({"error": "queries must not be empty"})
+    max_queries = _get_int_env("PROMETHEUS_BATCH_MAX_QUERIES", 50)
+    if len(items) > max_queries:
+        return json.dumps({"error": f"too many queries ({len(items)} > {max_queries})"})
+    output = str(arguments.get("output") or "raw").strip().lower()
+    if output not in _prom_matrix.INSTANT_OUTPUT_MODES:
+        return json.dumps({"error": f"output must be one of {list(_prom_matrix.INSTANT_OUTPUT_MODES)}"})
+
+    # 按（空白归一化后的 query, time）去重，重复项指向第一次出现的 id；执行的是第一次出现时的原始文本
+    # （归一化只用作去重键，避免改写 {path="a  b"} 这类含连续空白的匹配串）
+    unique: Dict[tuple, Dict[str, str]] = {}
+    aliases: Dict[str, str] = {}
+    for item in items:
+        first = unique.setdefault(item["key"], item)
+        if item["id"] != first["id"]:
+            aliases[item["id"]] = first["id"]
+    todo = [(first["id"], first["query"], first["time"]) for first in unique.values()]
+    concurrency = max(1, _get_int_env("PROMETHEUS_BATCH_CONCURRENCY", 8))
+    coalesced_before = _inflight.stats()["coalesced"]
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(todo))) as pool:
+        entries = list(pool.map(lambda t: _run_batch_item(t[1], t[2], output), todo))
+    results: Dict[str, Any] = {first: entry for (first, _, _), entry in zip(todo, entries)}
+    for alias, first in aliases.items():
+        results.setdefault(alias, {"duplicate_of": first})
+    failed = sum(1 for e in entries if e["status"] != "success")
+    _logger.info(
+        f"[batch_query] {len(items)} 条查询（去重后 {len(todo)} 条，失败 {failed}）"
+        f"完成 ({time.monotonic() - t0:.2f}s, 并发 {concurrency})"
+    )
+    return _prom_matrix.dumps({
+        "total": len(items),
+        "executed": len(todo),
+        "failed": failed,
+        "elapsed_ms": round((time.monotonic() - t0) * 1000, 1),
+        "results": results,
+        # coalesced：本批次中合并到进行中请求的 HTTP 调用数（并发的其他调用也会计入）；totals 为进程累计
+        "singleflight": {
+            "coalesced": _inflight.stats()["coalesced"] - coalesced_before,
+            "totals": _singleflight.stats(),
+        },
+    })
 
 
 _HANDLERS: Dict[str, Callable[..., str]] = {
     "list_prometheus_rules": _run_list_prometheus_rules,
     "get_metric_names": _run_get_metric_names,
+    "search_metrics": _run_search_metrics,
     "get_label_values": _run_get_label_values,
     "get_all_labels": _run_get_all_labels,
     "get_series": _run_get_series,
     "get_metric_metadata": _run_get_metric_metadata,
     "execute_prometheus_instant_query": _run_execute_prometheus_instant_query,
     "execute_prometheus_range_query": _run_execute_prometheus_range_query,
+    "execute_prometheus_batch_query": _run_execute_prometheus_batch_query,
+    "estimate_prometheus_query_cost": _run_estimate_prometheus_query_cost,
 }
 
 
@@ -168,9 +651,27 @@ TOOLS: List[Tool] = [
     ),
     Tool(
         name="get_metric_names",
-        description="Get all metric names (label __name__ values).",
+        description="Get all metric names (label __name__ values). Prefer search_metrics to find specific metrics.",
         inputSchema={"type": "object", "properties": {}},
     ),
+    Tool(
+        name="search_metrics",
+        description=(
+            "Search metric names, label names and HELP text (e.g. 'kafka lag') in a locally cached index. "
+            "Returns only the top matches with TYPE/HELP instead of the whole catalog."
+        ),
+        inputSchema=_schema_req(
+            {
+                "query": {"type": "string", "description": "Keywords, prefix or partial metric name"},
+                "limit": {"type": "integer", "description": "Max matches (default 20)"},
+                "type": {
+                    "type": "string",
+                    "description": "Optional metric type filter: counter, gauge, histogram, summary",
+                },
+            },
+            ["query"],
+        ),
+    ),
     Tool(
         name="get_label_values",
         description="Get all values for a label.",
@@ -200,25 +701,122 @@ TOOLS: List[Tool] = [
     ),
     Tool(
         name="execute_prometheus_instant_query",
-        description="Execute instant PromQL query. Optional: time (RFC3339 or unix).",
+        description=(
+            "Execute instant PromQL query. Optional: time (RFC3339 or unix). "
+            "output=columnar factors out shared labels and timestamps for compact results."
+        ),
         inputSchema=_schema_req(
-            {"query": {"type": "string"}, "time": {"type": "string"}},
+            {
+                "query": {"type": "string"},
+                "time": {"type": "string"},
+                "output": {
+                    "type": "string",
+                    "enum": ["raw", "columnar"],
+                    "description": "raw: Prometheus JSON (default); columnar: compact column encoding",
+                },
+                "guard": {
+                    "type": "string",
+                    "enum": ["off", "report", "reject", "rewrite"],
+                    "description": "Cost pre-flight guard (default from PROMETHEUS_QUERY_GUARD)",
+                },
+            },
             ["query"],
         ),
     ),
     Tool(
         name="execute_prometheus_range_query",
-        description="Execute range PromQL query. Required: query, start, end. Optional: step (e.g. 15s).",
+        description=(
+            "Execute range PromQL query. Required: query, start, end. Optional: step (e.g. 15s). "
+            "Long ranges are split into hour/day shards, queried concurrently and merged. "
+            "Prefer output=summary or downsample for many series or long windows."
+        ),
         inputSchema=_schema_req(
             {
                 "query": {"type": "string"},
                 "start": {"type": "string"},
                 "end": {"type": "string"},
                 "step": {"type": "string"},
+                "shard": {
+                    "type": "string",
+                    "enum": ["auto", "hour", "day", "none"],
+                    "description": "Time sharding for long ranges (default: auto)",
+                },
+                "output": {
+                    "type": "string",
+                    "enum": ["raw", "summary", "downsample", "columnar"],
+                    "description": (
+                        "raw: Prometheus JSON (default); summary: per-series min/max/mean/p95/last/trend; "
+                        "downsample: LTTB-downsampled points per series; "
+                        "columnar: shared timestamp column, one value column per series, common labels factored out"
+                    ),
+                },
+                "max_points": {
+                    "type": "integer",
+                    "description": "Max points per series for output=downsample (default 100)",
+                },
+                "guard": {
+                    "type": "string",
+                    "enum": ["off", "report", "reject", "rewrite"],
+                    "description": "Cost pre-flight guard (default from PROMETHEUS_QUERY_GUARD)",
+                },
             },
             ["query", "start", "end"],
         ),
     ),
+    Tool(
+        name="execute_prometheus_batch_query",
+        description=(
+            "Execute many instant PromQL queries in one call. Identical queries are deduplicated and run "
+            "concurrently; returns results keyed by id with per-query status, elapsed_ms and error. "
+            "id defaults to the query text (query@time when time is set); explicit ids must be unique. "
+            "The singleflight field reports how many HTTP calls were coalesced with identical in-flight requests."
+        ),
+        inputSchema=_schema_req(
+            {
+                "queries": {
+                    "type": "array",
+                    "description": "PromQL strings, or objects {id, query, time}",
+                    "items": {
+                        "anyOf": [
+                            {"type": "string"},
+                            {
+                                "type": "object",
+                                "properties": {
+                                    "id": {"type": "string"},
+                                    "query": {"type": "string"},
+                                    "time": {"type": "string"},
+                                },
+                                "required": ["query"],
+                            },
+                        ]
+                    },
+                },
+                "output": {
+                    "type": "string",
+                    "enum": ["raw", "columnar"],
+                    "description": "Per-query result encoding (default: raw)",
+                },
+            },
+            ["queries"],
+        ),
+    ),
+    Tool(
+        name="estimate_prometheus_query_cost",
+        description=(
+            "Estimate result size of a PromQL query (series, points, bytes) with a cheap count() probe, "
+            "without running it. Pass start/end/step for range queries."
+        ),
+        inputSchema=_schema_req(
+            {
+                "query": {"type": "string"},
+                "time": {"type": "string"},
+                "start": {"type": "string"},
+                "end": {"type": "string"},
+                "step": {"type": "string"},
+            },
+            ["query"],
+        ),
+    ),
 ]
 
 
@@ -226,4 +824,6 @@ def call_tool(name: str, arguments: dict) -> Optional[str]:
     h = _HANDLERS.get(name)
     if not h:
         return None
-    return h(arguments)
+    if name not in _RAW_ARGUMENT_TOOLS:
+        arguments = sanitize_arguments_for_tools(arguments)
+    return h(arguments or {})
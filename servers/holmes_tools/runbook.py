@@ -1,15 +1,26 @@
 """
-runbook 工具：fetch_runbook
+runbook 工具：fetch_runbook、search_runbooks
 移植自 holmes/mcp/tools/runbook_tools.py
 根据 runbook_id（.md 文件名或路径）从配置的搜索路径读取 Runbook 内容。
 通过环境变量 RUNBOOK_SEARCH_PATH 配置多个搜索目录（逗号或冒号分隔），默认仅当前目录。
+.md 文件缓存在内存索引中（见 _runbook_index），search_runbooks 按 BM25 全文检索。索引在首次
+fetch_runbook / search_runbooks 时才建立；配置了 RUNBOOK_SEARCH_PATH 时递归发现其中的 .md 文件，
+未配置时只收录当前目录顶层的 .md 文件（不遍历整个工作目录）。工具描述中的示例文件名只列搜索目录顶层，不触发建索引。
+fetch_runbook 可只返回大纲（outline）、指定章节（section）或与 query 最相关的章节，
+减少大 runbook 的输出。
+配置：RUNBOOK_INDEX_TTL（重新扫描间隔秒数，默认 10）、RUNBOOK_MAX_FILES（默认 5000）。
 """
+import json
 import os
 import textwrap
 from typing import List, Optional
 
 from mcp.types import Tool
 
+from ._runbook_index import RunbookIndex, find_section, rank_sections, snippet
+
+_DESCRIPTION_MAX_NAMES = 50
+
 
 def _get_search_paths() -> List[str]:
     raw = os.environ.get("RUNBOOK_SEARCH_PATH", "").strip()
@@ -23,6 +34,27 @@ def _get_search_paths() -> List[str]:
     return paths if paths else [os.getcwd()]
 
 
+def _search_recursive() -> bool:
+    """只有显式配置了 runbook 目录时才递归扫描子目录。"""
+    raw = os.environ.get("RUNBOOK_SEARCH_PATH", "").strip()
+    return any(p.strip() and os.path.isdir(p.strip()) for p in raw.replace(",", ":").split(":"))
+
+
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+_index = RunbookIndex(
+    _get_search_paths,
+    lambda: _get_int_env("RUNBOOK_INDEX_TTL", 10),
+    lambda: _get_int_env("RUNBOOK_MAX_FILES", 5000),
+    _search_recursive,
+)
+
+
 def _resolve_runbook_path(runbook_id: str, search_paths: List[str]) -> Optional[str]:
     if not runbook_id or not runbook_id.strip():
         return None
@@ -41,10 +73,70 @@ def _resolve_runbook_path(runbook_id: str, search_paths: List[str]) -> Optional[
     return None
 
 
+def _wrap_runbook(content: str) -> str:
+    return textwrap.dedent(f"""\
+        <runbook>
+{textwrap.indent(content, " " * 8)}
+        </runbook>
+        Note: the above are DIRECTIONS not ACTUAL RESULTS. Follow the steps using tools and report back.
+        You must call tools yourself to execute the steps.
+        """)
+
+
+def _render_outline(entry: dict) -> str:
+    lines = [f"Outline of runbook {entry['id']} ({len(entry['content'])} chars):", ""]
+    for sec in entry["sections"]:
+        indent = "  " * max(0, sec["level"] - 1)
+        size = sec["end"] - sec["offset"]
+        lines.append(f"{indent}- {sec['title']}  [line {sec['line']}, {size} chars]")
+    lines.append("")
+    lines.append(
+        f"Fetch one part with fetch_runbook(runbook_id=\"{entry['id']}\", section=\"<heading>\") or query=\"...\"."
+    )
+    return "\n".join(lines)
+
+
+def _run_runbook_sections(entry: dict, arguments: dict) -> Optional[str]:
+    """outline / section / query 模式；均未指定时返回 None（返回全文）。"""
+    if arguments.get("outline") in (True, "true", "True", 1):
+        return _render_outline(entry)
+    content = entry["content"]
+    name = str(arguments.get("section") or "").strip()
+    if name:
+        sec = find_section(entry["sections"], name)
+        if sec is None:
+            return (
+                f"Error: no section matching '{name}' in runbook {entry['id']}. "
+                "Use outline=true to list its sections."
+            )
+        return _wrap_runbook(f"<!-- section: {sec['path']} -->\n" + content[sec["offset"]:sec["end"]].strip())
+    query = str(arguments.get("query") or "").strip()
+    if query:
+        try:
+            limit = max(1, min(int(arguments.get("max_sections") or 3), 20))
+        except (TypeError, ValueError):
+            limit = 3
+        ranked = rank_sections(entry, query, limit)
+        if not ranked:
+            return f"No section of runbook {entry['id']} matches '{query}'. Use outline=true to list its sections."
+        # 按文档顺序输出，保持步骤的先后关系
+        parts = [
+            f"<!-- section: {sec['path']} -->\n" + content[sec["offset"]:sec["body_end"]].strip()
+            for _, sec in sorted(ranked, key=lambda item: item[1]["offset"])
+        ]
+        return _wrap_runbook("\n\n".join(parts))
+    return None
+
+
 def _run_fetch_runbook(arguments: dict) -> str:
     runbook_id = (arguments.get("runbook_id") or "").strip()
     if not runbook_id:
         return "Error: runbook_id cannot be empty."
+    entry = _index.get(runbook_id)
+    if entry is not None:
+        partial = _run_runbook_sections(entry, arguments)
+        return partial if partial is not None else _wrap_runbook(entry["content"])
+    # 索引只含 .md；其他文件（或索引上限之外的文件）按原方式解析
     search_paths = _get_search_paths()
     path = _resolve_runbook_path(runbook_id, search_paths)
     if not path:
@@ -54,27 +146,52 @@ def _run_fetch_runbook(arguments: dict) -> str:
             content = f.read()
     except Exception as e:
         return f"Error reading runbook: {e}"
-    wrapped = textwrap.dedent(f"""\
-        <runbook>
-{textwrap.indent(content, " " * 8)}
-        </runbook>
-        Note: the above are DIRECTIONS not ACTUAL RESULTS. Follow the steps using tools and report back.
-        You must call tools yourself to execute the steps.
-        """)
-    return wrapped
+    return _wrap_runbook(content)
+
+
+def _run_search_runbooks(arguments: dict) -> str:
+    query = str(arguments.get("query") or "").strip()
+    try:
+        limit = max(1, min(int(arguments.get("limit") or 5), 50))
+    except (TypeError, ValueError):
+        limit = 5
+    if not query:
+        # 空查询列出全部 runbook
+        entries = _index.entries()
+        return json.dumps(
+            {
+                "runbooks": [{"runbook_id": e["id"], "title": e["title"]} for e in entries],
+                "index": _index.stats(),
+            },
+            ensure_ascii=False,
+        )
+    results = [
+        {
+            "runbook_id": entry["id"],
+            "title": entry["title"],
+            "score": round(score, 3),
+            "snippet": snippet(entry["content"], query),
+        }
+        for score, entry in _index.search(query, limit)
+    ]
+    return json.dumps({"query": query, "results": results, "index": _index.stats()}, ensure_ascii=False)
 
 
 def _runbook_list_for_description() -> str:
-    paths = _get_search_paths()
-    names: list[str] = []
-    for base in paths:
+    """搜索目录顶层的 .md 文件名（模块导入和 list_tools 时调用，不建立索引、不递归）。"""
+    names: List[str] = []
+    for base in _get_search_paths():
         try:
-            for f in os.listdir(base):
-                if f.endswith(".md"):
-                    names.append(f)
+            names.extend(f for f in os.listdir(base) if f.endswith(".md") and not f.startswith("."))
         except OSError:
             pass
-    return ", ".join(sorted(set(names))) if names else "(none found)"
+    names = sorted(set(names))
+    if not names:
+        return "(none found at top level, use search_runbooks)"
+    shown = ", ".join(names[:_DESCRIPTION_MAX_NAMES])
+    if len(names) > _DESCRIPTION_MAX_NAMES:
+        shown += f", ... ({len(names)} total, use search_runbooks)"
+    return shown
 
 
 TOOLS: List[Tool] = [
@@ -83,7 +200,8 @@ TOOLS: List[Tool] = [
         description=(
             "Get runbook content by runbook link. Use this to get troubleshooting steps for incidents. "
             "runbook_id can be a .md filename (e.g. dns_troubleshooting_instructions.md) "
-            "or path relative to RUNBOOK_SEARCH_PATH."
+            "or path relative to RUNBOOK_SEARCH_PATH. Use search_runbooks to find the right runbook. "
+            "For large runbooks, request outline=true first, then a section or the sections relevant to a query."
         ),
         inputSchema={
             "type": "object",
@@ -91,15 +209,56 @@ TOOLS: List[Tool] = [
                 "runbook_id": {
                     "type": "string",
                     "description": f"The runbook_id: a .md filename or path. Example files: {_runbook_list_for_description()}",
-                }
+                },
+                "outline": {
+                    "type": "boolean",
+                    "description": "Return only the heading outline (with line numbers and sizes)",
+                },
+                "section": {
+                    "type": "string",
+                    "description": "Return only this section (heading title or 'Parent > Child' path; substring ok)",
+                },
+                "query": {"type": "string", "description": "Return only the sections most relevant to this text"},
+                "max_sections": {
+                    "type": "integer",
+                    "description": "Number of sections returned for query (default: 3, max 20)",
+                },
             },
             "required": ["runbook_id"],
         },
     ),
+    Tool(
+        name="search_runbooks",
+        description=(
+            "Full-text search (BM25) over all runbooks in RUNBOOK_SEARCH_PATH, including subdirectories "
+            "(when RUNBOOK_SEARCH_PATH is unset, only .md files at the top level of the working directory). "
+            "Returns runbook_id, title and a matching snippet for the best matches; pass the runbook_id to "
+            "fetch_runbook. An empty query lists all runbooks."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Symptoms, component or error text, e.g. 'coredns timeout'",
+                },
+                "limit": {"type": "integer", "description": "Maximum results (default: 5, max 50)"},
+            },
+        },
+    ),
 ]
 
 
+def list_tools() -> List[Tool]:
+    """TOOLS with the runbook list in fetch_runbook's description refreshed from the index."""
+    schema = TOOLS[0].inputSchema["properties"]["runbook_id"]
+    schema["description"] = f"The runbook_id: a .md filename or path. Example files: {_runbook_list_for_description()}"
+    return TOOLS
+
+
 def call_tool(name: str, arguments: dict) -> Optional[str]:
-    if name != "fetch_runbook":
-        return None
-    return _run_fetch_runbook(arguments)
+    if name == "fetch_runbook":
+        return _run_fetch_runbook(arguments)
+    if name == "search_runbooks":
+        return _run_search_runbooks(arguments)
+    return None
@@ -2,8 +2,8 @@
 """
 Holmes 风格工具聚合 MCP Server
 
-聚合 internet（fetch_webpage）、connectivity（tcp_check）、prometheus（8 个工具），
-单端口对外暴露。不依赖 holmes 包。
+聚合 internet（fetch_webpage、read_fetched_document）、connectivity（tcp_check、tcp_check_batch、latency_probe）、
+prometheus（11 个工具），单端口对外暴露。不依赖 holmes 包。
 配置：PROMETHEUS_URL 环境变量（prometheus 查询用）。
 
 运行方式:
@@ -27,7 +27,9 @@ _MODULES = [internet, connectivity, prometheus, core_investigation, runbook]
 def _all_tools():
     tools = []
     for mod in _MODULES:
-        tools.extend(getattr(mod, "TOOLS", []))
+        # 模块可提供 list_tools() 以动态生成工具描述（如 runbook 列表）
+        getter = getattr(mod, "list_tools", None)
+        tools.extend(getter() if getter else getattr(mod, "TOOLS", []))
     return tools
 
 
@@ -60,7 +62,8 @@ async def call_tool(name: str, arguments: dict):
     log_tool_call(_SERVER, name, arguments)
     t0 = time.monotonic()
 
-    result = _call_tool(name, arguments)
+    # 在线程中执行，使并发的工具调用可以真正并行（相同请求会被 single-flight 合并）
+    result = await asyncio.to_thread(_call_tool, name, arguments)
 
     elapsed = time.monotonic() - t0
     log_tool_result(_SERVER, name, result, elapsed)
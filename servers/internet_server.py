@@ -2,7 +2,8 @@
 """
 Internet MCP Server
 
-仅暴露 fetch_webpage 工具。配置：可选 INTERNET_TIMEOUT_SECONDS。
+暴露 fetch_webpage、read_fetched_document 工具。配置：可选 INTERNET_TIMEOUT_SECONDS、INTERNET_MAX_BYTES、INTERNET_CACHE_DIR、
+INTERNET_CACHE_MAX_ENTRIES、INTERNET_PAGE_CHARS、INTERNET_DOCUMENT_HANDLES。
 
 运行方式:
     python internet_server.py
@@ -38,7 +38,8 @@ async def call_tool(name: str, arguments: dict):
     log_tool_call(_SERVER, name, arguments)
     t0 = time.monotonic()
 
-    result = kubernetes_core.call_tool(name, sanitize_arguments_for_tools(arguments))
+    # 在线程中执行，使并发的工具调用可以真正并行（相同命令会被 single-flight 合并）
+    result = await asyncio.to_thread(kubernetes_core.call_tool, name, sanitize_arguments_for_tools(arguments))
     if result is None:
         result = "未知工具: {}".format(name)
 
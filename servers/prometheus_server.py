@@ -2,7 +2,7 @@
 """
 Prometheus MCP Server
 
-仅暴露 Prometheus 查询工具（8 个）。配置：环境变量 PROMETHEUS_URL。
+仅暴露 Prometheus 查询工具（11 个）。配置：环境变量 PROMETHEUS_URL。
 
 运行方式:
     python prometheus_server.py
@@ -34,7 +34,11 @@ async def call_tool(name: str, arguments: dict):
     log_tool_call(_SERVER, name, arguments)
     t0 = time.monotonic()
     try:
-        result = prometheus.call_tool(name, sanitize_arguments_for_tools(arguments))
+        # 模块可声明 SKIP_SANITIZE = True 以接收原始参数（batch query 的 queries 为 list）
+        skip = getattr(prometheus, "SKIP_SANITIZE", False)
+        args = arguments if skip else sanitize_arguments_for_tools(arguments)
+        # 在线程中执行，使并发的工具调用可以真正并行（并可被 single-flight 合并）
+        result = await asyncio.to_thread(prometheus.call_tool, name, args)
         elapsed = time.monotonic() - t0
         if result is None:
             result = "未知工具: {}".format(name)
@@ -2,8 +2,8 @@
 """
 Runbook MCP Server
 
-仅暴露 fetch_runbook 工具（Runbook 知识库获取）。
-配置：环境变量 RUNBOOK_SEARCH_PATH（逗号或冒号分隔的搜索目录）。
+暴露 fetch_runbook、search_runbooks 工具（Runbook 知识库获取与全文检索）。
+配置：环境变量 RUNBOOK_SEARCH_PATH（逗号或冒号分隔的搜索目录），可选 RUNBOOK_INDEX_TTL、RUNBOOK_MAX_FILES。
 
 运行方式:
     python runbook_server.py
@@ -26,7 +26,8 @@ server = Server("runbook-mcp-server")
 
 @server.list_tools()
 async def list_tools():
-    return runbook.TOOLS
+    # 每次列出时刷新 runbook 列表，新增的 runbook 无需重启即可出现在描述中
+    return runbook.list_tools()
 
 
 @server.call_tool()